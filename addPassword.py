@@ -331,12 +331,12 @@ class AuthWidget(QWidget):
                         self.show_error("Неверный PIN-код")
                         return
                     # Если учетные данные верны, создаем менеджер паролей
-                    self.main_window.password_manager = PasswordManager(username, pin)
+                    self.main_window.password_manager = self.main_window.create_password_manager(username, pin)
                 else:
                     # Сохраняем учетные данные
                     self.main_window.user_credentials.save_credentials(username, pin)
                     # Создаем менеджер паролей
-                    self.main_window.password_manager = PasswordManager(username, pin)
+                    self.main_window.password_manager = self.main_window.create_password_manager(username, pin)
 
             # Эмитим сигнал успешной регистрации/изменения
             self.accepted.emit()
@@ -3,6 +3,7 @@ import time
 import shutil
 import logging
 from .crypto_manager import CryptoManagerV2
+from . import vault_format
 
 
 class BackupManager:
@@ -66,19 +67,19 @@ class BackupManager:
             }
             
             self.logger.debug("Шифрование данных")
-            encrypted = self.crypto.encrypt_data(backup_data)
+            encrypted = self.crypto.encrypt_container(backup_data)
             
             # Сначала пишем во временный файл
             backup_path = self._get_backup_path(file_path)
             temp_path = f"{backup_path}.tmp"
             
             self.logger.debug(f"Запись во временный файл: {temp_path}")
-            with open(temp_path, "w") as f:
+            with open(temp_path, "wb") as f:
                 f.write(encrypted)
             
             # Проверяем, что данные записались корректно
             self.logger.debug("Проверка записанных данных")
-            with open(temp_path, "r") as f:
+            with open(temp_path, "rb") as f:
                 content = f.read()
                 if content != encrypted:
                     self.logger.error("Ошибка проверки записанных данных")
@@ -122,11 +123,14 @@ class BackupManager:
 
             # Расшифровываем и проверяем данные
             self.logger.debug(f"Чтение файла бэкапа: {backup_path}")
-            with open(backup_path, "r") as f:
+            with open(backup_path, "rb") as f:
                 content = f.read()
                 
             self.logger.debug("Расшифровка данных")
-            decrypted = self.crypto.decrypt_data(content)
+            if vault_format.is_container(content):
+                decrypted = self.crypto.decrypt_container(memoryview(content))
+            else:
+                decrypted = self.crypto.decrypt_data(content.decode())
             if not isinstance(decrypted, dict) or "data" not in decrypted:
                 self.logger.error("Поврежденный файл бэкапа")
                 raise ValueError("Поврежденный файл бэкапа")
@@ -9,9 +9,11 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from cryptography.exceptions import InvalidSignature, InvalidTag
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import argon2
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import ctypes
+from . import vault_format
 
 
 class SecureBytes:
@@ -42,6 +44,8 @@ class SecureBytes:
 
 class CryptoManagerV2:
     VERSION = 3  # Увеличиваем версию из-за изменений в формате
+    DATA_KEY_SIZE = 64  # 32 байта на шифрование + 32 байта на HMAC
+    KEY_WRAP_AAD = b"eef:key-wrap:v4"
     
     def __init__(self, login: str, password: str):
         # Генерируем случайную соль для каждого экземпляра
@@ -52,6 +56,8 @@ class CryptoManagerV2:
         self._encrypted_secret = self._encrypt_memory(
             f"{login}::{password}".encode()
         )
+        # Длина логина в секрете: сам логин может содержать "::"
+        self._login_size = len(login.encode())
         self.backend = default_backend()
         self.kdf_config = {
             "version": self.VERSION,
@@ -62,6 +68,14 @@ class CryptoManagerV2:
             "salt_size": 32,
             "key_length": 64
         }
+        # Сессия envelope-режима: соль KEK, обернутый ключ данных и сам ключ
+        # данных, зашифрованный ключом памяти. Argon2id выполняется один раз
+        # при разблокировке, дальше все сохранения используют ключ данных.
+        self._session_salt = None
+        self._session_wrapped = None
+        self._session_key = None
+        # После clear_session() менеджер заблокирован: новую сессию он не создает
+        self._session_closed = False
 
     def _derive_memory_key(self, login: str, password: str) -> bytes:
         """Создает ключ для защиты данных в памяти"""
@@ -91,6 +105,17 @@ class CryptoManagerV2:
         """Безопасно получает секрет из памяти"""
         return self._decrypt_memory(self._encrypted_secret)
 
+    def with_login(self, login: str) -> "CryptoManagerV2":
+        """Новый менеджер с тем же паролем для другого логина (смена имени пользователя)
+
+        Сессия не переносится: ее создает или разблокирует вызывающий код.
+        """
+        secret = self._get_secret()
+        try:
+            return CryptoManagerV2(login, secret[self._login_size + 2:].decode())
+        finally:
+            del secret
+
     def _derive_keys(self, salt: bytes) -> Tuple[bytes, bytes]:
         """Метод получения ключей с Argon2"""
         ph = argon2.PasswordHasher(
@@ -108,52 +133,140 @@ class CryptoManagerV2:
         auth_key = SecureBytes(hash_part[32:64])
         return enc_key.value, auth_key.value
 
-    def encrypt_data(self, data: dict) -> str:
-        # Генерируем соль и nonce
-        salt = secrets.token_bytes(self.kdf_config["salt_size"])
+    def _wrap_data_key(self, kek: bytes, data_key: bytes) -> bytes:
+        """Оборачивает ключ данных ключом KEK"""
         nonce = secrets.token_bytes(12)
+        return nonce + AESGCM(kek).encrypt(nonce, data_key, self.KEY_WRAP_AAD)
+
+    def _unwrap_data_key(self, salt: bytes, wrapped: bytes) -> bytes:
+        """Получает KEK через Argon2id и разворачивает ключ данных"""
+        kek, _ = self._derive_keys(salt)
+        try:
+            return AESGCM(kek).decrypt(wrapped[:12], wrapped[12:], self.KEY_WRAP_AAD)
+        except InvalidTag:
+            raise ValueError("Неверный пароль или поврежденный заголовок хранилища")
+        finally:
+            del kek
+
+    def _set_session(self, salt: bytes, wrapped: bytes, data_key: bytes):
+        """Запоминает ключ данных текущей сессии"""
+        self._session_salt = salt
+        self._session_wrapped = wrapped
+        self._session_key = self._encrypt_memory(data_key)
+
+    def has_session(self) -> bool:
+        """Проверяет, разблокирован ли ключ данных"""
+        return self._session_key is not None
+
+    def _check_not_closed(self):
+        if self._session_closed:
+            raise RuntimeError("Сессия заблокирована")
+
+    def _session_data_key(self) -> bytes:
+        """Ключ данных текущей сессии; без сессии - RuntimeError"""
+        self._check_not_closed()
+        if self._session_key is None:
+            raise RuntimeError("Сессия не создана")
+        return self._decrypt_memory(self._session_key)
+
+    def unlock_session(self, salt: bytes, wrapped: bytes):
+        """Разблокирует сессию по заголовку хранилища (единственный запуск Argon2id)"""
+        self._check_not_closed()
+        self._set_session(salt, wrapped, self._unwrap_data_key(salt, wrapped))
 
-        # Получаем ключи
-        enc_key, auth_key = self._derive_keys(salt)
+    def create_session(self):
+        """Создает сессию со случайным ключом данных для нового хранилища
 
+        Вызывается явно при первом открытии или сохранении хранилища, у
+        которого еще нет обернутого ключа. Если сессия уже есть, ничего не
+        делает; после clear_session() вызывает RuntimeError.
+        """
+        self._check_not_closed()
+        if self.has_session():
+            return
+        salt = secrets.token_bytes(self.kdf_config["salt_size"])
+        kek, _ = self._derive_keys(salt)
         try:
-            # Шифруем данные
-            cipher = Cipher(
-                algorithms.AES(enc_key),
-                modes.GCM(nonce),
+            data_key = secrets.token_bytes(self.DATA_KEY_SIZE)
+            self._set_session(salt, self._wrap_data_key(kek, data_key), data_key)
+        finally:
+            del kek
+
+    def session_header(self) -> Tuple[bytes, bytes]:
+        """Возвращает соль KEK и обернутый ключ данных для заголовка хранилища"""
+        self._session_data_key()
+        return self._session_salt, self._session_wrapped
+
+    def clear_session(self):
+        """Забывает ключ данных при блокировке; новую сессию менеджер уже не создаст"""
+        self._session_closed = True
+        if self._session_key:
+            self._session_key = os.urandom(len(self._session_key))
+        self._session_salt = None
+        self._session_wrapped = None
+        self._session_key = None
+
+    def _data_keys(self, salt: bytes = None, wrapped: bytes = None) -> Tuple[bytes, bytes]:
+        """Возвращает ключи шифрования и HMAC для заголовка
+
+        Если заголовок совпадает с текущей сессией, ключ берется из памяти
+        без Argon2id. Заголовок чужой сессии (например, старый бэкап)
+        разворачивается отдельно и не заменяет текущую сессию.
+        """
+        if salt is None or (salt == self._session_salt and wrapped == self._session_wrapped):
+            data_key = self._session_data_key()
+        elif not self.has_session():
+            self.unlock_session(salt, wrapped)
+            data_key = self._session_data_key()
+        else:
+            data_key = self._unwrap_data_key(salt, wrapped)
+        return data_key[:32], data_key[32:]
+
+    def derive_subkey(self, label: bytes, length: int = 32) -> bytes:
+        """Выводит из ключа данных сессии независимый подключ (HKDF-SHA256)"""
+        data_key = self._session_data_key()
+        try:
+            return HKDF(
+                algorithm=hashes.SHA256(),
+                length=length,
+                salt=None,
+                info=b"eef:" + label,
                 backend=self.backend
-            )
-            encryptor = cipher.encryptor()
-
-            # Добавляем associated data
-            associated_data = f"v{self.VERSION}:{int(time.time())}".encode()
-            encryptor.authenticate_additional_data(associated_data)
-
-            # Шифруем данные
-            ciphertext = encryptor.update(json.dumps(data).encode()) + encryptor.finalize()
-
-            # Формируем результат
-            result = {
-                "config": self.kdf_config,
-                "salt": base64.b64encode(salt).decode(),
-                "nonce": base64.b64encode(nonce).decode(),
-                "tag": base64.b64encode(encryptor.tag).decode(),
-                "associated_data": base64.b64encode(associated_data).decode(),
-                "ciphertext": base64.b64encode(ciphertext).decode()
-            }
-
-            # Добавляем HMAC
-            h = hmac.HMAC(auth_key, hashes.SHA3_256(), backend=self.backend)
-            h.update(json.dumps(result, sort_keys=True).encode())
-            result["hmac"] = base64.b64encode(h.finalize()).decode()
-
-            return json.dumps(result)
+            ).derive(data_key)
         finally:
-            # Очищаем ключи из памяти
-            del enc_key
-            del auth_key
+            del data_key
+
+    def seal_record(self, record: dict, aad: bytes) -> str:
+        """Шифрует отдельную запись ключом записей сессии"""
+        nonce = secrets.token_bytes(12)
+        sealed = AESGCM(self.derive_subkey(b"records")).encrypt(
+            nonce, json.dumps(record, separators=(",", ":")).encode(), aad
+        )
+        return base64.b64encode(nonce + sealed).decode()
+
+    def open_record(self, token: str, aad: bytes) -> dict:
+        """Расшифровывает запись, запечатанную seal_record"""
+        return self.open_record_with(self.derive_subkey(b"records"), token, aad)
+
+    @staticmethod
+    def open_record_with(records_key: bytes, token: str, aad: bytes) -> dict:
+        """Расшифровывает запись заранее полученным подключом b"records"
+
+        Для фоновых задач: подключ берется один раз, пока хранилище открыто,
+        и расшифровка больше не обращается к сессии.
+        """
+        raw = base64.b64decode(token)
+        try:
+            plain = AESGCM(records_key).decrypt(raw[:12], raw[12:], aad)
+        except InvalidTag:
+            raise ValueError("Ошибка проверки целостности записи")
+        return json.loads(plain)
 
     def decrypt_data(self, encrypted_data: str) -> dict:
+        """Расшифровывает хранилище или бэкап в старом JSON-формате (v2-v3)
+
+        Новые данные пишутся только в бинарный контейнер (encrypt_container).
+        """
         if not encrypted_data:
             return {"passwords": [], "categories": []}
             
@@ -203,9 +316,10 @@ class CryptoManagerV2:
             except InvalidTag:
                 raise ValueError("Ошибка проверки целостности данных")
                 
+        except ValueError:
+            raise
         except Exception as e:
-            print(f"Ошибка расшифровки данных: {str(e)}")
-            return {"passwords": [], "categories": []}
+            raise ValueError(f"Ошибка расшифровки данных: {str(e)}") from e
             
         finally:
             # Очищаем ключи из памяти
@@ -217,6 +331,58 @@ class CryptoManagerV2:
             import gc
             gc.collect()
 
+    def encrypt_container(self, data: dict) -> bytes:
+        """Шифрует данные в бинарный контейнер (см. vault_format)"""
+        salt, wrapped = self.session_header()
+        nonce = secrets.token_bytes(vault_format.NONCE_SIZE)
+        enc_key, _ = self._data_keys()
+
+        try:
+            prefix = vault_format.pack_prefix(self.kdf_config, int(time.time()), salt, wrapped, nonce)
+            encryptor = Cipher(algorithms.AES(enc_key), modes.GCM(nonce), backend=self.backend).encryptor()
+            encryptor.authenticate_additional_data(prefix)
+            ciphertext = encryptor.update(json.dumps(data, separators=(",", ":")).encode())
+            ciphertext += encryptor.finalize()
+            return b"".join((prefix, encryptor.tag, ciphertext))
+        finally:
+            del enc_key
+
+    def decrypt_container(self, buf: memoryview) -> dict:
+        """Расшифровывает бинарный контейнер, читая шифротекст через memoryview
+
+        Неверный пароль, чужие параметры KDF и поврежденный контейнер
+        вызывают ValueError.
+        """
+        enc_key = None
+        try:
+            header = vault_format.unpack(buf)
+            for key in ("memory_cost", "time_cost", "parallelism"):
+                if header[key] != self.kdf_config[key]:
+                    raise ValueError(f"Неподдерживаемые параметры KDF: {key}={header[key]}")
+
+            enc_key, _ = self._data_keys(header["salt"], header["wrapped_key"])
+
+            try:
+                decryptor = Cipher(
+                    algorithms.AES(enc_key),
+                    modes.GCM(header["nonce"], header["tag"]),
+                    backend=self.backend
+                ).decryptor()
+                decryptor.authenticate_additional_data(header["aad"])
+                result = json.loads(decryptor.update(header["ciphertext"]) + decryptor.finalize())
+            except InvalidTag:
+                raise ValueError("Ошибка проверки целостности данных")
+
+            if not isinstance(result, dict):
+                raise ValueError("Невалидный формат данных")
+            if "passwords" not in result or "categories" not in result:
+                result = {"passwords": [], "categories": []}
+            return result
+
+        finally:
+            if enc_key:
+                del enc_key
+
     def __del__(self):
         """Очищаем все секретные данные при удалении объекта"""
         try:
@@ -226,6 +392,8 @@ class CryptoManagerV2:
             if hasattr(self, '_memory_key'):
                 self._memory_key.clear()
                 del self._memory_key
+            if getattr(self, '_session_key', None):
+                self.clear_session()
             if hasattr(self, '_encrypted_secret'):
                 # Перезаписываем случайными данными
                 self._encrypted_secret = os.urandom(len(self._encrypted_secret))
@@ -1,52 +1,258 @@
 import os
+import hmac
+import hashlib
+import secrets
 import json
 import time
+import uuid
 import logging
-from typing import Optional, Dict, List, Any
+import threading
+from typing import Optional, Dict, List, Any, Tuple
 from .crypto_manager import CryptoManagerV2
 from .backup_manager import BackupManager
 from .validators import DataValidator
+from . import vault_format
+from .vault_journal import VaultJournal
+from .sqlite_store import SQLiteVaultStore
+from .search_index import SearchIndex, SearchSession
+from utils.password_utils import password_strength, STRENGTH_VERSION
 
 
 class PasswordManager:
     """Основной класс для работы с паролями"""
     VAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vaults")
-
-    def __init__(self, login: str, password: str):
-        """Инициализация менеджера паролей"""
+    # Поля, которые хранятся запечатанными и расшифровываются только при открытии записи
+    SECRET_FIELDS = ("password", "notes")
+    # Служебные поля записи с запечатанными данными: пароль и отдельно от него заметки
+    SEALED_FIELDS = ("secret", "sealed_notes")
+    # Пороги сжатия журнала изменений в базовый снимок
+    JOURNAL_MAX_RECORDS = 500
+    JOURNAL_MAX_BYTES = 1024 * 1024
+
+    def __init__(self, login: str, password: str, backend: Optional[str] = None):
+        """Инициализация менеджера паролей
+
+        backend - "vault" (зашифрованный файл с журналом) или "sqlite".
+        По умолчанию выбирается SQLite, если база пользователя уже есть.
+        """
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Инициализация PasswordManager для пользователя {login}")
         
         self.login = login
         self.vault_path = self._get_vault_path(login)
         self.logger.debug(f"Путь к vault файлу: {self.vault_path}")
+        self.db_path = self._get_db_path(login)
+        self.backend = backend or ("sqlite" if os.path.exists(self.db_path) else "vault")
+        self.store = None
         
         self.crypto = CryptoManagerV2(login, password)
         self.backup = BackupManager(self.crypto)
         self.validator = DataValidator()
+        self.journal = VaultJournal(self._get_journal_path(login), self.crypto)
         self.data = {"passwords": [], "categories": ["Без категории"]}
+        self.index = SearchIndex()
+        # Счетчик поколений данных: растет при каждом изменении, сбрасывает кэши поиска
+        self.generation = 0
+        self._lock = threading.RLock()
+        # Оценки надежности: id записи -> (отпечаток пароля, оценка 0-4).
+        # Пересчитываются, только когда меняется пароль записи. Оценки,
+        # сохраненные в записях, попадают сюда без отпечатка (None)
+        self._strengths: Dict[str, Tuple[bytes, int]] = {}
+        self._strength_key = secrets.token_bytes(32)
+        self._compaction_thread = None
+        self._needs_snapshot = False
+        # Хранилище заблокировано: снимки больше не пишутся
+        self._closed = False
+        # Изменений SQLite-базы за сессию (по ним делаются резервные копии)
+        self._store_writes = 0
         
         try:
             self._ensure_vault_dir_exists()
-            self._load_data()
+            if self.backend == "sqlite":
+                self.store = SQLiteVaultStore(self.db_path, self.crypto)
+                self.store.open()
+                self._migrate_entries()
+            else:
+                self._load_data()
+            self._build_index()
         except Exception as e:
             self.logger.error(f"Ошибка инициализации: {str(e)}", exc_info=True)
             raise
 
     @property
     def passwords(self) -> list:
-        """Возвращает список паролей"""
-        return self.data.get("passwords", []).copy()  # Возвращаем копию для безопасности
+        """Возвращает список записей без секретных полей"""
+        return [self._public_entry(entry) for entry in self._iter_entries()]
+
+    def _iter_entries(self):
+        """Все записи текущего хранилища (с запечатанными секретами)"""
+        if self.store is not None:
+            return self.store.iter_entries()
+        return iter(self.data.get("passwords", []))
+
+    def _find_entry(self, field: str, value: str) -> Optional[dict]:
+        """Ищет запись по id или названию сервиса
+
+        Для файлового хранилища возвращается сама запись из self.data,
+        для SQLite - свежая копия строки, которую нужно записать обратно.
+        """
+        if self.store is not None:
+            return self.store.get(value) if field == "id" else self.store.get_by_service(value)
+        for entry in self.data["passwords"]:
+            if entry.get(field) == value:
+                return entry
+        return None
+
+    def _public_entry(self, entry: dict) -> dict:
+        """Копия записи без запечатанных секретов (с актуальной оценкой надежности)"""
+        public = {key: value for key, value in entry.items() if key not in self.SEALED_FIELDS}
+        known = self._strengths.get(entry.get("id"))
+        if known is not None:
+            public["strength"] = known[1]
+        return public
+
+    @staticmethod
+    def _password_fingerprint(password: str, key: bytes) -> bytes:
+        """Отпечаток пароля на ключе сессии: по нему видно смену пароля, но не сам пароль"""
+        return hmac.new(key, password.encode("utf-8"), hashlib.sha256).digest()[:16]
+
+    def _entry_strength(self, entry_id: str, password: str) -> int:
+        """Оценка пароля записи из таблицы; пересчитывается, только если пароль изменился"""
+        fingerprint = self._password_fingerprint(password, self._strength_key)
+        known = self._strengths.get(entry_id)
+        if known is not None and known[0] == fingerprint:
+            return known[1]
+        score = password_strength(password)
+        self._strengths[entry_id] = (fingerprint, score)
+        return score
+
+    @staticmethod
+    def _notes_aad(entry_id: str) -> bytes:
+        return f"{entry_id}:notes".encode()
+
+    @classmethod
+    def _sealed_fields(cls, crypto: CryptoManagerV2, entry_id: str, secret_data: dict) -> dict:
+        """Запечатанные поля записи: пароль в secret, заметки в sealed_notes
+
+        Заметки запечатываются отдельно, потому что поисковому индексу
+        нужны только они: разблокировка хранилища не расшифровывает пароли.
+        """
+        notes = secret_data.get("notes")
+        return {
+            "secret": crypto.seal_record(
+                {key: value for key, value in secret_data.items() if key != "notes"},
+                entry_id.encode()
+            ),
+            "sealed_notes": crypto.seal_record({"notes": notes}, cls._notes_aad(entry_id)) if notes else "",
+        }
+
+    def _seal_entry(self, entry: dict, secret_data: dict):
+        """Запечатывает секретные поля записи ключом сессии"""
+        for field in self.SECRET_FIELDS:
+            entry.pop(field, None)
+        entry["strength"] = self._entry_strength(entry["id"], secret_data.get("password", ""))
+        entry["strength_version"] = STRENGTH_VERSION
+        entry.update(self._sealed_fields(self.crypto, entry["id"], secret_data))
+
+    def _open_record(self, token: str, aad: bytes, records_key: Optional[bytes] = None) -> dict:
+        if records_key is not None:
+            return CryptoManagerV2.open_record_with(records_key, token, aad)
+        return self.crypto.open_record(token, aad)
+
+    def _open_notes(self, entry: dict, records_key: Optional[bytes] = None) -> str:
+        """Расшифровывает только заметки записи"""
+        if not entry.get("sealed_notes"):
+            return ""
+        return self._open_record(entry["sealed_notes"], self._notes_aad(entry["id"]), records_key).get("notes", "")
+
+    def _open_secrets(self, entry: dict, records_key: Optional[bytes] = None, notes: bool = True) -> dict:
+        """Расшифровывает секретные поля одной записи
+
+        records_key - подключ записей, снятый заранее (для фоновых задач).
+        notes=False оставляет заметки запечатанными, когда нужен только пароль.
+        """
+        if "secret" not in entry:
+            return {field: entry[field] for field in self.SECRET_FIELDS if field in entry}
+        opened = self._open_record(entry["secret"], entry["id"].encode(), records_key)
+        if notes and entry.get("sealed_notes"):
+            opened["notes"] = self._open_notes(entry, records_key)
+        return opened
+
+    def _build_index(self):
+        """Строит поисковый индекс с расшифрованными заметками записей
+
+        Заметки открываются один раз при разблокировке и хранятся только в
+        индексе, который очищается при блокировке; пароли при этом остаются
+        запечатанными. Для SQLite индекс тоже строится в памяти: метаданные
+        и заметки в базе зашифрованы, и SQL-запрос не может искать по ним.
+        """
+        entries = list(self._iter_entries())
+        notes = {}
+        records_key = self.crypto.derive_subkey(b"records") if entries else None
+        for entry in entries:
+            try:
+                text = self._open_notes(entry, records_key)
+            except Exception as e:
+                self.logger.error(f"Не удалось открыть заметки записи {entry.get('service')}: {str(e)}")
+                continue
+            if isinstance(text, str) and text:
+                notes[entry["id"]] = text
+        self.index.build(entries, notes)
+        self._seed_strengths(entries)
+
+    def _seed_strengths(self, entries: list):
+        """Берет в таблицу оценки, сохраненные в записях текущей версией оценки
+
+        Без отпечатка такая оценка подходит только для показа и фоновой
+        оценки: при сохранении записи пароль оценивается заново.
+        """
+        for entry in entries:
+            strength = entry.get("strength")
+            if isinstance(strength, int) and entry.get("strength_version") == STRENGTH_VERSION:
+                self._strengths.setdefault(entry["id"], (None, strength))
+
+    def _migrate_entries(self) -> bool:
+        """Приводит записи старых хранилищ к текущему формату
+
+        Присваивает записям id и запечатывает открытые секреты. Записи, где
+        заметки запечатаны вместе с паролем (нет поля sealed_notes),
+        перезапечатываются раздельно; строки SQLite переписываются сразу.
+        """
+        changed = False
+        for entry in list(self._iter_entries()):
+            if not isinstance(entry, dict):
+                continue
+            migrated = False
+            if "id" not in entry:
+                entry["id"] = uuid.uuid4().hex
+                migrated = True
+            if "secret" not in entry or "sealed_notes" not in entry:
+                self._seal_entry(entry, self._open_secrets(entry))
+                migrated = True
+            if migrated and self.store is not None:
+                self.store.upsert(entry)
+            changed = changed or migrated
+        return changed
 
     @classmethod
     def _get_vault_path(cls, login: str) -> str:
         """Получает путь к хранилищу пользователя"""
         return os.path.join(cls.VAULT_DIR, f"{login}.vault")
 
+    @classmethod
+    def _get_journal_path(cls, login: str) -> str:
+        """Получает путь к журналу изменений хранилища"""
+        return os.path.join(cls.VAULT_DIR, f"{login}.journal")
+
+    @classmethod
+    def _get_db_path(cls, login: str) -> str:
+        """Получает путь к SQLite-базе пользователя"""
+        return os.path.join(cls.VAULT_DIR, f"{login}.db")
+
     @classmethod
     def vault_exists(cls, login: str) -> bool:
         """Проверяет существование хранилища"""
-        return os.path.exists(cls._get_vault_path(login))
+        return os.path.exists(cls._get_vault_path(login)) or os.path.exists(cls._get_db_path(login))
 
     def _ensure_vault_dir_exists(self):
         """Создает директорию для хранилища если она не существует"""
@@ -92,21 +298,134 @@ class PasswordManager:
             raise
 
     def _load_data(self):
-        """Загружает данные из хранилища"""
+        """Загружает данные из хранилища
+
+        Если контейнер не расшифровывается (неверный PIN или поврежденный
+        файл), вызывает ValueError: пустые данные с новой сессией затерли
+        бы хранилище при первом же сохранении.
+        """
+        if not os.path.exists(self.vault_path):
+            # Новое хранилище: ключ данных создается при первом открытии
+            self.crypto.create_session()
+            return
+
+        with open(self.vault_path, 'rb') as f:
+            content = f.read()
         try:
-            if os.path.exists(self.vault_path):
-                with open(self.vault_path, 'r') as f:
-                    content = f.read()
-                    if content:
-                        self.data = self.crypto.decrypt_data(content)
-                    else:
-                        self.data = {"passwords": [], "categories": ["Без категории"]}
+            if not content:
+                self.data = {"passwords": [], "categories": ["Без категории"]}
+                self.crypto.create_session()
+            elif vault_format.is_container(content):
+                self.data = self.crypto.decrypt_container(memoryview(content))
+            else:
+                # Старый JSON-формат (v3 и ранее), перезапишется контейнером при сохранении
+                self.logger.info("Обнаружено хранилище в JSON-формате, миграция при следующем сохранении")
+                self.data = self.crypto.decrypt_data(content.decode())
+                # В JSON-формате нет обернутого ключа данных
+                self.crypto.create_session()
         except Exception as e:
-            print(f"Ошибка загрузки данных: {str(e)}")
+            self.logger.error(f"Ошибка загрузки данных: {str(e)}")
+            # Сессия могла открыться до проверки тега - ничего не сохраняем
+            self._closed = True
+            self.crypto.clear_session()
             self.data = {"passwords": [], "categories": ["Без категории"]}
+            raise ValueError(f"Не удалось открыть хранилище: {str(e)}") from e
+
+        self._replay_journal()
+        # После журнала: его записи тоже могут быть в старом формате
+        with self._lock:
+            if self._migrate_entries():
+                self.logger.info("Секреты записей перезапечатаны, миграция при следующем сохранении")
+                self._needs_snapshot = True
+
+    def _replay_journal(self):
+        """Применяет к загруженному снимку изменения из журнала"""
+        snapshot_id = self.data.get("snapshot_id")
+        if not snapshot_id:
+            self._needs_snapshot = True
+            return
+
+        try:
+            operations = self.journal.replay(bytes.fromhex(snapshot_id))
+        except Exception as e:
+            # Снимок остается рабочим, следующее сохранение запишет его целиком
+            self.logger.error(f"Ошибка чтения журнала: {str(e)}", exc_info=True)
+            self._needs_snapshot = True
+            return
+
+        for operation in operations:
+            self._apply_operation(operation)
+        if operations:
+            self.logger.info(f"Применено изменений из журнала: {len(operations)}")
+        if self._journal_overflow():
+            self._schedule_compaction()
+
+    def _apply_operation(self, operation: dict):
+        """Применяет одну операцию журнала к данным в памяти"""
+        if operation.get("op") == "put":
+            entry = operation["entry"]
+            for i, existing in enumerate(self.data["passwords"]):
+                if existing.get("id") == entry["id"]:
+                    self.data["passwords"][i] = entry
+                    break
+            else:
+                self.data["passwords"].append(entry)
+            category = entry.get("category")
+            if category and category not in self.data["categories"]:
+                self.data["categories"].append(category)
+        elif operation.get("op") == "category":
+            if operation["name"] not in self.data["categories"]:
+                self.data["categories"].append(operation["name"])
+        else:
+            self.logger.warning(f"Неизвестная операция журнала: {operation.get('op')}")
+
+    def _commit(self, operation: dict) -> bool:
+        """Сохраняет изменение: дописывает его в журнал или пишет полный снимок"""
+        if self._needs_snapshot or self.journal.snapshot_id is None or not os.path.exists(self.vault_path):
+            return self.save_data()
+
+        try:
+            self.journal.append(operation)
+        except Exception as e:
+            self.logger.error(f"Ошибка записи в журнал, сохраняем полный снимок: {str(e)}", exc_info=True)
+            return self.save_data()
+
+        if self._journal_overflow():
+            self._schedule_compaction()
+        return True
+
+    def _journal_overflow(self) -> bool:
+        """Проверяет, пора ли сжать журнал в снимок"""
+        return (self.journal.records >= self.JOURNAL_MAX_RECORDS or
+                self.journal.size >= self.JOURNAL_MAX_BYTES)
+
+    def _schedule_compaction(self):
+        """Запускает сжатие журнала в фоновом потоке"""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self) -> bool:
+        """Сворачивает журнал в новый базовый снимок"""
+        self.logger.info("Сжатие журнала изменений")
+        return self.save_data()
 
     def save_data(self) -> bool:
-        """Сохраняет данные в хранилище"""
+        """Сохраняет полный снимок данных в хранилище и сбрасывает журнал"""
+        with self._lock:
+            return self._save_snapshot()
+
+    def _save_snapshot(self) -> bool:
+        """Записывает снимок; вызывается под self._lock
+
+        После блокировки данные в памяти уже очищены, и их снимок затер бы
+        хранилище, поэтому запись отклоняется.
+        """
+        if self._closed or not self.crypto.has_session():
+            self.logger.warning("Хранилище заблокировано, снимок не записывается")
+            return False
+
         temp_path = None
         try:
             self.logger.info("Начало процесса сохранения данных")
@@ -131,13 +450,14 @@ class PasswordManager:
             temp_path = os.path.join(os.path.dirname(self.vault_path), f".tmp_{os.path.basename(self.vault_path)}")
             self.logger.debug(f"Создание временного файла: {temp_path}")
             
-            # Шифруем данные
+            # Шифруем данные; новый id снимка отвязывает от него старый журнал
             self.logger.debug("Шифрование данных")
-            encrypted = self.crypto.encrypt_data(self.data)
+            snapshot_id = uuid.uuid4().hex
+            encrypted = self.crypto.encrypt_container({**self.data, "snapshot_id": snapshot_id})
             
             # Записываем во временный файл
             self.logger.debug("Запись во временный файл")
-            with open(temp_path, 'w') as f:
+            with open(temp_path, 'wb') as f:
                 f.write(encrypted)
             
             # Создаем бэкап только после успешной записи во временный файл
@@ -147,22 +467,14 @@ class PasswordManager:
                 self.logger.error("Не удалось создать резервную копию")
                 raise ValueError("Не удалось создать резервную копию")
             
-            # Если файл vault существует, пытаемся его удалить
-            if os.path.exists(self.vault_path):
-                try:
-                    self.logger.debug(f"Удаление старого файла: {self.vault_path}")
-                    os.remove(self.vault_path)
-                except Exception as e:
-                    self.logger.warning(f"Не удалось удалить старый файл: {str(e)}")
-                    # Ждем немного и пробуем снова
-                    import time
-                    time.sleep(0.1)
-                    self.logger.debug("Повторная попытка удаления старого файла")
-                    os.remove(self.vault_path)
+            # Заменяем файл vault одной операцией: без окна, когда его нет на диске
+            self.logger.debug(f"Замена {self.vault_path} временным файлом {temp_path}")
+            os.replace(temp_path, self.vault_path)
+            self.data["snapshot_id"] = snapshot_id
+            self._needs_snapshot = False
             
-            # Переименовываем временный файл
-            self.logger.debug(f"Переименование временного файла {temp_path} в {self.vault_path}")
-            os.rename(temp_path, self.vault_path)
+            # Изменения журнала теперь в снимке
+            self.journal.reset(bytes.fromhex(snapshot_id))
             
             self.logger.info("Данные успешно сохранены")
             return True
@@ -203,117 +515,210 @@ class PasswordManager:
             # Добавляем timestamp
             current_time = int(time.time())
             
-            # Ищем существующую запись
-            for entry in self.data["passwords"]:
-                if entry["service"] == service:
+            # Служебные поля записи не перезаписываются извне
+            for reserved in ("id", "strength", "strength_version", *self.SEALED_FIELDS):
+                kwargs.pop(reserved, None)
+
+            # Секретные поля запечатываются отдельно от метаданных
+            new_secrets = {"password": password}
+            for field in self.SECRET_FIELDS:
+                if field in kwargs:
+                    new_secrets[field] = kwargs.pop(field)
+
+            with self._lock:
+                # Ищем существующую запись
+                entry = self._find_entry("service", service)
+                if entry is not None:
                     # Обновляем существующую запись
+                    secret_data = self._open_secrets(entry)
+                    secret_data.update(new_secrets)
                     entry.update({
-                        "password": password,
                         "category": category,
                         "modified_at": current_time,
                         **kwargs
                     })
-                    break
-            else:
-                # Создаем новую запись
-                new_entry = {
-                    "service": service,
-                    "password": password,
-                    "category": category,
-                    "created_at": current_time,
-                    "modified_at": current_time,
-                    **kwargs
-                }
-                self.data["passwords"].append(new_entry)
-
-            # Добавляем категорию, если её нет
-            if category not in self.data["categories"]:
-                self.data["categories"].append(category)
-
-            return self.save_data()
+                    self._seal_entry(entry, secret_data)
+                else:
+                    # Создаем новую запись
+                    entry = {
+                        "id": uuid.uuid4().hex,
+                        "service": service,
+                        "category": category,
+                        "created_at": current_time,
+                        "modified_at": current_time,
+                        **kwargs
+                    }
+                    secret_data = new_secrets
+                    self._seal_entry(entry, secret_data)
+                    if self.store is None:
+                        self.data["passwords"].append(entry)
+
+                if self.store is not None:
+                    # Строка и категория пишутся одной транзакцией
+                    self._backup_store()
+                    self.store.upsert(entry)
+                    self.index.add(entry, secret_data.get("notes", ""))
+                    self.generation += 1
+                    return True
+
+                # Добавляем категорию, если её нет
+                if category not in self.data["categories"]:
+                    self.data["categories"].append(category)
+
+                # Индекс обновляется только для измененной записи
+                self.index.add(entry, secret_data.get("notes", ""))
+                self.generation += 1
+
+                # Пишется только измененная запись, а не все хранилище
+                return self._commit({"op": "put", "entry": dict(entry)})
 
         except Exception as e:
             self.logger.error(f"Ошибка сохранения пароля: {str(e)}", exc_info=True)
             return False
 
+    def _open_entry(self, entry: dict) -> dict:
+        """Копия записи с расшифрованными секретными полями"""
+        opened = self._public_entry(entry)
+        opened.update(self._open_secrets(entry))
+        return opened
+
     def get_entry_by_service(self, service_name: str) -> Optional[dict]:
-        """Получает запись по названию сервиса"""
+        """Получает запись по названию сервиса, расшифровывая ее секреты"""
         try:
-            for entry in self.data["passwords"]:
-                if entry["service"] == service_name:
-                    return entry.copy()  # Возвращаем копию для безопасности
-            return None
+            entry = self._find_entry("service", service_name)
+            return self._open_entry(entry) if entry else None  # Возвращаем копию для безопасности
         except Exception as e:
             print(f"Ошибка получения записи: {str(e)}")
             return None
 
-    def filter_entries(self, search_text: str = "", category: str = "Все категории") -> List[Dict[str, Any]]:
-        """Фильтрует записи по тексту поиска и категории"""
+    def get_entry(self, entry_id: str) -> Optional[dict]:
+        """Получает запись по id, расшифровывая ее секреты"""
         try:
-            filtered = []
-            search_text = search_text.lower()
-            
-            self.logger.debug(f"Начало фильтрации. Всего паролей: {len(self.data['passwords'])}")
-            self.logger.debug(f"Поисковый запрос: '{search_text}', категория: '{category}'")
+            entry = self._find_entry("id", entry_id)
+            return self._open_entry(entry) if entry else None
+        except Exception as e:
+            print(f"Ошибка получения записи: {str(e)}")
+            return None
 
-            for i, entry in enumerate(self.data["passwords"]):
-                try:
-                    # Проверяем структуру записи
-                    if not isinstance(entry, dict):
-                        self.logger.error(f"Некорректный тип записи #{i}: {type(entry)}")
-                        continue
-                        
-                    # Проверяем обязательные поля
-                    required_fields = ["service", "password", "category"]
-                    missing_fields = [field for field in required_fields if field not in entry]
-                    if missing_fields:
-                        self.logger.error(f"В записи #{i} отсутствуют обязательные поля: {missing_fields}")
-                        continue
-
-                    # Фильтр по категории
-                    if category != "Все категории" and entry["category"] != category:
-                        self.logger.debug(f"Запись #{i} пропущена по категории")
-                        continue
-
-                    # Фильтр по тексту
-                    if search_text:
-                        service = entry["service"].lower()
-                        url = entry.get("url", "").lower()
-                        email = entry.get("email", "").lower()
-                        notes = entry.get("notes", "").lower()
-
-                        if not any([
-                            search_text in service,
-                            search_text in url,
-                            search_text in email,
-                            search_text in notes
-                        ]):
-                            self.logger.debug(f"Запись #{i} не соответствует поисковому запросу")
-                            continue
-
-                    self.logger.debug(f"Добавляем запись #{i} (сервис: {entry.get('service', 'unknown')})")
-                    filtered.append(entry.copy())  # Добавляем копию для безопасности
-                    
-                except Exception as e:
-                    self.logger.error(f"Ошибка при обработке записи #{i}: {str(e)}", exc_info=True)
-                    continue
+    def filter_entries(self, search_text: str = "", category: str = "Все категории",
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Фильтрует записи по тексту поиска и категории
 
-            self.logger.debug(f"Фильтрация завершена. Найдено записей: {len(filtered)}")
-            return filtered
+        Результаты уже отсортированы по релевантности; limit оставляет
+        только первые из них.
+        """
+        try:
+            category = None if category == "Все категории" else category
+            entries = self.index.search(search_text, category, limit)
+            self.logger.debug(f"Поиск '{search_text}' в категории '{category}': найдено {len(entries)}")
+            return [self._public_entry(entry) for entry in entries]  # Копии без секретов
 
         except Exception as e:
             self.logger.error(f"Ошибка фильтрации записей: {str(e)}", exc_info=True)
             return []
 
+    def password_hashes(self) -> List[Tuple[str, str, str]]:
+        """(id, сервис, SHA-1 пароля в hex) для всех записей с паролем
+
+        Нужен для проверки хранилища на утечки: пароли расшифровываются по
+        одному и сразу хэшируются, наружу уходят только хэши. Как и в
+        score_strengths, под блокировкой берутся только копии записей и
+        подключ записей, поэтому аудит не задерживает сохранения.
+        """
+        with self._lock:
+            if self._closed or not self.crypto.has_session():
+                return []
+            records_key = self.crypto.derive_subkey(b"records")
+            entries = [dict(entry) for entry in self._iter_entries()]
+
+        result = []
+        for entry in entries:
+            try:
+                password = self._open_secrets(entry, records_key, notes=False).get("password", "")
+            except ValueError as e:
+                self.logger.error(f"Не удалось открыть запись {entry.get('service')}: {str(e)}")
+                continue
+            if password:
+                digest = hashlib.sha1(password.encode("utf-8")).hexdigest().upper()
+                result.append((entry["id"], entry.get("service", ""), digest))
+            del password
+        return result
+
+    def score_strengths(self) -> Dict[str, int]:
+        """Оценивает надежность паролей записей (для фонового потока)
+
+        Оцениваются только записи без сохраненной оценки или с оценкой
+        прежней версии (STRENGTH_VERSION): остальные уже в таблице. Под
+        блокировкой берутся только копии записей и подключ записей сессии;
+        расшифровка и оценка идут без нее, чтобы правки не ждали всего
+        хранилища. Если хранилище заблокировали во время оценки, она
+        прекращается на следующей записи. Записи, оцененные заново за это
+        время (сменился пароль), не перезаписываются. Возвращает id ->
+        оценка для записей, чья сохраненная оценка устарела; если такие
+        есть, растет generation.
+        """
+        with self._lock:
+            if self._closed or not self.crypto.has_session():
+                return {}
+            key = self._strength_key
+            records_key = self.crypto.derive_subkey(b"records")
+            entries = [dict(entry) for entry in self._iter_entries()
+                       if entry.get("id") not in self._strengths]
+
+        scored = {}
+        for entry in entries:
+            if key is not self._strength_key:
+                return {}
+            try:
+                password = self._open_secrets(entry, records_key, notes=False).get("password", "")
+            except Exception as e:
+                self.logger.error(f"Не удалось открыть запись {entry.get('service')}: {str(e)}")
+                continue
+            scored[entry["id"]] = (self._password_fingerprint(password, key), password_strength(password))
+            del password
+
+        changed = {}
+        with self._lock:
+            # Хранилище заблокировали во время оценки - результат не нужен
+            if key is not self._strength_key:
+                return {}
+            for entry in entries:
+                known = scored.get(entry["id"])
+                if known is None or entry["id"] in self._strengths:
+                    continue
+                self._strengths[entry["id"]] = known
+                if entry.get("strength") != known[1]:
+                    changed[entry["id"]] = known[1]
+            if changed:
+                self.generation += 1
+        return changed
+
+    def search_session(self) -> SearchSession:
+        """Создает сессию поиска с кэшем и сужением результатов для строки ввода"""
+        return SearchSession(self)
+
+    def get_categories(self) -> List[str]:
+        """Возвращает список категорий"""
+        if self.store is not None:
+            return self.store.categories()
+        return list(self.data.get("categories", []))
+
     def add_category(self, name: str) -> bool:
         """Добавляет новую категорию"""
         try:
             if not self.validator.validate_category(name):
                 raise ValueError("Некорректное название категории")
 
-            if name not in self.data["categories"]:
-                self.data["categories"].append(name)
-                return self.save_data()
+            with self._lock:
+                if self.store is not None:
+                    self._backup_store()
+                    self.store.add_category(name)
+                    self.generation += 1
+                    return True
+                if name not in self.data["categories"]:
+                    self.data["categories"].append(name)
+                    self.generation += 1
+                    return self._commit({"op": "category", "name": name})
             return True
 
         except Exception as e:
@@ -323,27 +728,59 @@ class PasswordManager:
     def change_password(self, new_password: str) -> bool:
         """Меняет мастер-пароль"""
         try:
-            # Создаем новый крипто-менеджер
-            new_crypto = CryptoManagerV2(self.login, new_password)
+            with self._lock:
+                # Создаем новый крипто-менеджер
+                new_crypto = CryptoManagerV2(self.login, new_password)
+                new_crypto.create_session()
+
+                if self.store is not None:
+                    # Строки перезапечатываются и заголовок меняется одной транзакцией
+                    self._backup_store(force=True)
+                    new_data = self._resealed_data(new_crypto)
+                    self.store.crypto = new_crypto
+                    try:
+                        self.store.replace_all(new_data["passwords"], new_data["categories"])
+                    except Exception:
+                        self.store.crypto = self.crypto
+                        raise
+                    self._replace_crypto(new_crypto)
+                    self._build_index()
+                    self.generation += 1
+                    return True
             
-            # Создаем бэкап перед изменением
-            self.backup.create_backup(self.vault_path, self.data)
+                # Создаем бэкап перед изменением
+                self.backup.create_backup(self.vault_path, self.data)
             
-            # Пробуем зашифровать данные новым паролем
-            encrypted = new_crypto.encrypt_data(self.data)
+                # Перезапечатываем секреты записей ключом новой сессии
+                new_data = self._resealed_data(new_crypto)
             
-            # Проверяем, что можем расшифровать
-            test_decrypt = new_crypto.decrypt_data(encrypted)
-            if test_decrypt != self.data:
-                raise ValueError("Ошибка проверки нового пароля")
+                # Пробуем зашифровать данные новым паролем
+                encrypted = new_crypto.encrypt_container(new_data)
             
-            # Сохраняем зашифрованные данные
-            with open(self.vault_path, 'w') as f:
-                f.write(encrypted)
+                # Проверяем, что можем расшифровать
+                test_decrypt = new_crypto.decrypt_container(memoryview(encrypted))
+                if test_decrypt != new_data:
+                    raise ValueError("Ошибка проверки нового пароля")
             
-            # Обновляем текущий крипто-менеджер
-            self.crypto = new_crypto
-            return True
+                # Сохраняем зашифрованные данные через временный файл,
+                # чтобы сбой записи не оставил хранилище обрезанным
+                temp_path = os.path.join(os.path.dirname(self.vault_path), f".tmp_{os.path.basename(self.vault_path)}")
+                try:
+                    with open(temp_path, 'wb') as f:
+                        f.write(encrypted)
+                    os.replace(temp_path, self.vault_path)
+                except Exception:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            
+                # Обновляем текущий крипто-менеджер
+                self._replace_crypto(new_crypto)
+                self.data = new_data
+                self._build_index()
+                self.generation += 1
+                self.journal.reset(bytes.fromhex(new_data["snapshot_id"]))
+                return True
 
         except Exception as e:
             print(f"Ошибка смены пароля: {str(e)}")
@@ -356,38 +793,146 @@ class PasswordManager:
                 raise ValueError("Некорректное имя пользователя")
 
             new_vault_path = self._get_vault_path(new_username)
-            if os.path.exists(new_vault_path):
+            if self.vault_exists(new_username):
                 raise ValueError("Пользователь с таким именем уже существует")
 
-            # Создаем новый крипто-менеджер
-            new_crypto = CryptoManagerV2(new_username, self.crypto.combined_secret.decode().split("::")[-1])
+            with self._lock:
+                # Крипто-менеджер нового логина с тем же паролем
+                new_crypto = self.crypto.with_login(new_username)
+                new_crypto.create_session()
+
+                if self.store is not None:
+                    # Переносим строки в базу нового пользователя и удаляем старую
+                    self._backup_store(force=True)
+                    new_data = self._resealed_data(new_crypto)
+                    new_store = SQLiteVaultStore(self._get_db_path(new_username), new_crypto)
+                    new_store.open()
+                    new_store.replace_all(new_data["passwords"], new_data["categories"])
+                    self.store.remove()
+
+                    self.login = new_username
+                    self.vault_path = new_vault_path
+                    self.db_path = new_store.path
+                    self._replace_crypto(new_crypto)
+                    self.store = new_store
+                    self._build_index()
+                    self.generation += 1
+                    return True
             
-            # Создаем бэкап перед изменением
-            self.backup.create_backup(self.vault_path, self.data)
+                # Создаем бэкап перед изменением
+                self.backup.create_backup(self.vault_path, self.data)
             
-            # Шифруем данные с новым именем пользователя
-            encrypted = new_crypto.encrypt_data(self.data)
+                # Шифруем данные с новым именем пользователя
+                new_data = self._resealed_data(new_crypto)
+                encrypted = new_crypto.encrypt_container(new_data)
             
-            # Сохраняем в новый файл
-            with open(new_vault_path, 'w') as f:
-                f.write(encrypted)
+                # Сохраняем в новый файл
+                with open(new_vault_path, 'wb') as f:
+                    f.write(encrypted)
             
-            # Удаляем старый файл
-            try:
-                os.remove(self.vault_path)
-            except:
-                pass  # Игнорируем ошибки удаления
+                # Удаляем старый файл и его журнал (все изменения уже в новом снимке)
+                try:
+                    os.remove(self.vault_path)
+                except:
+                    pass  # Игнорируем ошибки удаления
+                self.journal.remove()
             
-            # Обновляем текущее состояние
-            self.login = new_username
-            self.vault_path = new_vault_path
-            self.crypto = new_crypto
-            return True
+                # Обновляем текущее состояние
+                self.login = new_username
+                self.vault_path = new_vault_path
+                self._replace_crypto(new_crypto)
+                self.data = new_data
+                self._build_index()
+                self.generation += 1
+                self.journal = VaultJournal(self._get_journal_path(new_username), new_crypto)
+                self.journal.reset(bytes.fromhex(new_data["snapshot_id"]))
+                return True
 
         except Exception as e:
             print(f"Ошибка смены имени пользователя: {str(e)}")
             return False
 
+    def _replace_crypto(self, new_crypto: CryptoManagerV2):
+        """Переключает хранилище, журнал и бэкапы на новый крипто-менеджер
+
+        Ключ данных старой сессии сразу забывается, чтобы бэкапы и журнал
+        не шифровались прежними учетными данными.
+        """
+        old_crypto = self.crypto
+        self.crypto = new_crypto
+        self.backup.crypto = new_crypto
+        self.journal.crypto = new_crypto
+        if self.store is not None:
+            self.store.crypto = new_crypto
+        old_crypto.clear_session()
+
+    def _backup_store(self, force: bool = False):
+        """Резервная копия SQLite-базы перед изменением; вызывается под self._lock
+
+        Как и снимки файлового хранилища, копия пишется перед первым
+        изменением сессии и дальше раз в JOURNAL_MAX_RECORDS изменений.
+        """
+        if force or self._store_writes % self.JOURNAL_MAX_RECORDS == 0:
+            data = {"passwords": list(self.store.iter_entries()), "categories": self.store.categories()}
+            if not self.backup.create_backup(self.vault_path, data):
+                self.logger.error("Не удалось создать резервную копию")
+                raise ValueError("Не удалось создать резервную копию")
+        self._store_writes += 1
+
+    def _resealed_data(self, new_crypto: CryptoManagerV2) -> dict:
+        """Копия данных с секретами, перезапечатанными ключом другой сессии"""
+        passwords = []
+        for entry in self._iter_entries():
+            resealed = self._public_entry(entry)
+            resealed.update(self._sealed_fields(new_crypto, entry["id"], self._open_secrets(entry)))
+            passwords.append(resealed)
+        return {
+            **self.data,
+            "passwords": passwords,
+            "categories": self.get_categories(),
+            "snapshot_id": uuid.uuid4().hex
+        }
+
+    def migrate_to_sqlite(self) -> bool:
+        """Однократно переносит файловое хранилище в SQLite-базу
+
+        Записи переносятся как есть: секреты уже запечатаны ключом данных
+        текущей сессии, а заголовок базы хранит тот же обернутый ключ.
+        Старый .vault сохраняется рядом с суффиксом .migrated.
+        """
+        if self.store is not None:
+            return True
+
+        try:
+            with self._lock:
+                if os.path.exists(self.db_path):
+                    raise ValueError("SQLite-база пользователя уже существует")
+
+                self.logger.info(f"Миграция хранилища в SQLite: {self.db_path}")
+                store = SQLiteVaultStore(self.db_path, self.crypto)
+                try:
+                    store.open()
+                    store.replace_all(self.data["passwords"], self.data["categories"])
+                except Exception:
+                    store.remove()
+                    raise
+
+                if os.path.exists(self.vault_path):
+                    os.replace(self.vault_path, f"{self.vault_path}.migrated")
+                self.journal.remove()
+
+                self.store = store
+                self.backend = "sqlite"
+                self.data = {"passwords": [], "categories": ["Без категории"]}
+                # Записи перенесены как есть, индекс остается прежним
+                self.generation += 1
+                self.logger.info("Миграция в SQLite завершена")
+                return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка миграции в SQLite: {str(e)}", exc_info=True)
+            return False
+
     def add_entry(self, data: dict) -> bool:
         """Добавляет новую запись"""
         try:
@@ -410,12 +955,27 @@ class PasswordManager:
     def clear_sensitive_data(self):
         """Очищает конфиденциальные данные из памяти"""
         try:
-            # Очищаем данные
-            self.data = {"passwords": [], "categories": ["Без категории"]}
-            
-            # Очищаем криптографические ключи
-            if hasattr(self, 'crypto'):
-                self.crypto.combined_secret = b""
+            # Дожидаемся фонового сжатия журнала, чтобы не оборвать запись снимка
+            thread = self._compaction_thread
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+            with self._lock:
+                # Сжатие, запущенное после этой точки, увидит флаг и ничего не запишет
+                self._closed = True
+
+                # Очищаем данные
+                self.data = {"passwords": [], "categories": ["Без категории"]}
+                self.index.clear()
+                self.generation += 1
+                self._strengths = {}
+                self._strength_key = secrets.token_bytes(32)
+                
+                # Очищаем криптографические ключи
+                if hasattr(self, 'crypto'):
+                    self.crypto.clear_session()
+
+                if self.store is not None:
+                    self.store.close()
             
             # Принудительно вызываем сборщик мусора
             import gc
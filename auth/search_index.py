@@ -0,0 +1,438 @@
+import re
+import time
+import heapq
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, List, Set, Optional, Tuple, Iterable
+
+
+def _osa_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Дамерау-Левенштейна (перестановка соседних символов - одна правка)
+
+    Возвращает limit + 1, как только расстояние гарантированно превышает limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """Инвертированный индекс открытых метаданных записей
+
+    Каждое поле разбивается на токены в нижнем регистре, а каждый токен -
+    на все его префиксы и триграммы. Поиск пересекает множества id для
+    токенов запроса, поэтому его стоимость зависит от числа совпадений, а не
+    от размера хранилища. Триграммы дают кандидатов для поиска по подстроке
+    ("hub" находит GitHub) и для нечеткого поиска с опечатками. Пароль не
+    индексируется; заметки запечатаны в записи, поэтому их открытый текст
+    передается отдельно и живет только в индексе до блокировки хранилища.
+    """
+    # Вес совпадения по полю: попадание в название сервиса важнее остальных
+    FIELD_WEIGHTS = {"service": 3.0, "login": 1.5, "email": 1.5, "url": 1.0, "notes": 0.5}
+    FIELDS = tuple(FIELD_WEIGHTS)
+    REQUIRED_FIELDS = ("id", "service", "category", "secret")
+    TOKEN_SPLIT = re.compile(r"[\W_]+")
+    # Качество совпадения токена запроса с токеном записи
+    EXACT_SCORE = 1.0
+    PREFIX_SCORE = 0.8
+    INFIX_SCORE = 0.7
+    FUZZY_SCORE = 0.6
+    # Нечеткий поиск включается для токенов от FUZZY_MIN_LENGTH символов,
+    # если точных и префиксных совпадений нет; расстояние правки считается
+    # только для FUZZY_CANDIDATES токенов с наибольшим числом общих триграмм
+    FUZZY_MIN_LENGTH = 3
+    FUZZY_CANDIDATES = 200
+    # Бонус свежести: RECENCY_WEIGHT для только что измененной записи,
+    # вдвое меньше каждые RECENCY_HALF_LIFE дней
+    RECENCY_WEIGHT = 1.0
+    RECENCY_HALF_LIFE = 30 * 24 * 3600
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.clear()
+
+    def clear(self):
+        """Очищает индекс"""
+        self._entries: Dict[str, dict] = {}
+        self._order: Dict[str, int] = {}
+        # Токены и категория на момент индексации: запись может быть
+        # изменена на месте до переиндексации
+        self._entry_tokens: Dict[str, Dict[str, float]] = {}
+        self._entry_category: Dict[str, str] = {}
+        # Токен -> {id записи: вес лучшего поля, в котором он встретился}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._categories: Dict[str, Set[str]] = {}
+        self._next_order = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Нормализует строку в список токенов"""
+        return [token for token in cls.TOKEN_SPLIT.split(text.lower()) if token]
+
+    @staticmethod
+    def trigrams(token: str, closed: bool = True) -> Set[str]:
+        """Триграммы токена с пробелом в начале (и в конце, если closed)
+
+        Для токена запроса конец открыт: пользователь может еще не дописать слово.
+        """
+        padded = f" {token} " if closed else f" {token}"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def max_typos(token: str) -> int:
+        """Допустимое число опечаток для токена запроса"""
+        return 1 if len(token) <= 5 else 2
+
+    def build(self, entries: List[dict], notes: Optional[Dict[str, str]] = None):
+        """Строит индекс заново по списку записей
+
+        notes - расшифрованные заметки записей по id.
+        """
+        self.clear()
+        notes = notes or {}
+        for entry in entries:
+            self.add(entry, notes.get(entry.get("id"), "") if isinstance(entry, dict) else "")
+        self.logger.debug(f"Поисковый индекс построен: {len(self._entries)} записей, {len(self._postings)} токенов")
+
+    def add(self, entry: dict, notes: str = ""):
+        """Добавляет запись в индекс или переиндексирует существующую
+
+        notes - расшифрованные заметки записи; в саму запись они не попадают.
+        """
+        if not isinstance(entry, dict):
+            self.logger.error(f"Некорректный тип записи: {type(entry)}")
+            return
+        missing_fields = [field for field in self.REQUIRED_FIELDS if field not in entry]
+        if missing_fields:
+            self.logger.error(f"В записи отсутствуют обязательные поля: {missing_fields}")
+            return
+
+        entry_id = entry["id"]
+        if entry_id in self._entries:
+            self.remove(entry_id)
+        else:
+            self._order[entry_id] = self._next_order
+            self._next_order += 1
+
+        tokens = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            value = notes if field == "notes" else entry.get(field)
+            if isinstance(value, str):
+                for token in self.tokenize(value):
+                    tokens[token] = max(tokens.get(token, 0.0), weight)
+
+        for token, weight in tokens.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                for length in range(1, len(token) + 1):
+                    self._prefixes.setdefault(token[:length], set()).add(token)
+                for trigram in self.trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+            self._postings[token][entry_id] = weight
+
+        self._entries[entry_id] = entry
+        self._entry_tokens[entry_id] = tokens
+        self._entry_category[entry_id] = entry["category"]
+        self._categories.setdefault(entry["category"], set()).add(entry_id)
+
+    def remove(self, entry_id: str):
+        """Удаляет запись из индекса (порядок записи сохраняется)"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+
+        for token in self._entry_tokens.pop(entry_id, ()):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.pop(entry_id, None)
+            if not ids:
+                # Токен больше не встречается - убираем его из префиксов и триграмм
+                del self._postings[token]
+                for length in range(1, len(token) + 1):
+                    self._discard(self._prefixes, token[:length], token)
+                for trigram in self.trigrams(token):
+                    self._discard(self._trigrams, trigram, token)
+
+        category = self._entry_category.pop(entry_id, None)
+        category_ids = self._categories.get(category)
+        if category_ids is not None:
+            category_ids.discard(entry_id)
+            if not category_ids:
+                del self._categories[category]
+
+    @staticmethod
+    def _discard(mapping: Dict[str, Set[str]], key: str, token: str):
+        tokens = mapping.get(key)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del mapping[key]
+
+    def _infix_tokens(self, query_token: str) -> List[str]:
+        """Токены индекса, содержащие query_token не с начала
+
+        Кандидаты - токены со всеми триграммами запроса; короткие запросы
+        (меньше триграммы) проверяются по всем токенам.
+        """
+        if len(query_token) < 3:
+            candidates = self._postings
+        else:
+            sets = sorted(
+                (self._trigrams.get(query_token[i:i + 3], set()) for i in range(len(query_token) - 2)),
+                key=len
+            )
+            candidates = sets[0].intersection(*sets[1:])
+        return [token for token in candidates if query_token in token and not token.startswith(query_token)]
+
+    def _match_quality(self, query_token: str, token: str) -> float:
+        """Качество совпадения без опечаток: точное, префикс, подстрока или 0"""
+        if token == query_token:
+            return self.EXACT_SCORE
+        if token.startswith(query_token):
+            return self.PREFIX_SCORE
+        if query_token in token:
+            return self.INFIX_SCORE
+        return 0.0
+
+    def _match_token(self, query_token: str) -> Tuple[Dict[str, float], bool]:
+        """Оценки записей для одного токена запроса и признак нечеткого поиска
+
+        Точное совпадение и префикс берутся из индекса префиксов, подстрока -
+        из кандидатов по триграммам, опечатки - из кандидатов по общим
+        триграммам с проверкой расстоянием правки.
+        """
+        matches = {}
+        fuzzy = False
+        for token in self._prefixes.get(query_token, ()):
+            quality = self.EXACT_SCORE if token == query_token else self.PREFIX_SCORE
+            self._merge(matches, token, quality)
+        for token in self._infix_tokens(query_token):
+            self._merge(matches, token, self.INFIX_SCORE)
+
+        if not matches and len(query_token) >= self.FUZZY_MIN_LENGTH:
+            fuzzy = True
+            limit = self.max_typos(query_token)
+            shared = Counter()
+            for trigram in self.trigrams(query_token, closed=False):
+                shared.update(self._trigrams.get(trigram, ()))
+            for token, _ in shared.most_common(self.FUZZY_CANDIDATES):
+                # Сравниваем и с целым токеном, и с его началом той же длины
+                distance = min(
+                    _osa_distance(query_token, token, limit),
+                    _osa_distance(query_token, token[:len(query_token)], limit)
+                )
+                if distance <= limit:
+                    quality = self.FUZZY_SCORE * (1 - distance / (len(query_token) + 1))
+                    self._merge(matches, token, quality)
+        return matches, fuzzy
+
+    def _merge(self, matches: Dict[str, float], token: str, quality: float):
+        for entry_id, weight in self._postings[token].items():
+            score = quality * weight
+            if score > matches.get(entry_id, 0.0):
+                matches[entry_id] = score
+
+    def _recency(self, entry: dict, now: float) -> float:
+        """Бонус за недавнее изменение записи"""
+        modified_at = entry.get("modified_at") or entry.get("created_at") or 0
+        age = max(0.0, now - modified_at)
+        return self.RECENCY_WEIGHT * 0.5 ** (age / self.RECENCY_HALF_LIFE)
+
+    def _match_candidates(self, query_tokens: List[str], candidates: Iterable[str]) -> Dict[str, float]:
+        """Оценки только для заданных записей, без нечеткого поиска
+
+        Используется для сужения предыдущего результата: перебираются
+        токены самих кандидатов, а не весь индекс.
+        """
+        scores = {}
+        for entry_id in candidates:
+            tokens = self._entry_tokens.get(entry_id)
+            if tokens is None:
+                continue
+            total = 0.0
+            for query_token in query_tokens:
+                best = 0.0
+                for token, weight in tokens.items():
+                    best = max(best, self._match_quality(query_token, token) * weight)
+                if not best:
+                    break
+                total += best
+            else:
+                scores[entry_id] = total
+        return scores
+
+    def rank(self, text: str = "", category: Optional[str] = None, limit: Optional[int] = None,
+             candidates: Optional[Iterable[str]] = None) -> Tuple[List[str], bool]:
+        """id записей по убыванию релевантности и признак нечеткого совпадения
+
+        Токен запроса совпадает с токеном записи точно, как префикс, как
+        подстрока или с опечатками. Оценка - сумма лучших совпадений по токенам с учетом
+        веса поля плюс бонус свежести. Без текста записи идут в порядке
+        добавления в хранилище. limit ограничивает число результатов.
+
+        candidates - результат предыдущего запроса без опечаток, который
+        текущий запрос продолжает: ищется только среди них. Если среди
+        кандидатов ничего нет, выполняется полный поиск.
+        """
+        query_tokens = list(dict.fromkeys(self.tokenize(text)))
+        allowed = self._categories.get(category, set()) if category is not None else None
+
+        if not query_tokens:
+            ids = self._entries.keys() if allowed is None else allowed
+            ordered = sorted(ids, key=self._order.__getitem__)
+            if limit is not None:
+                ordered = ordered[:limit]
+            return ordered, False
+
+        fuzzy = False
+        scores = self._match_candidates(query_tokens, candidates) if candidates is not None else None
+        if not scores:
+            # Начинаем с самого редкого токена, остальные только сужают набор
+            token_matches = []
+            for token in query_tokens:
+                matches, token_fuzzy = self._match_token(token)
+                token_matches.append(matches)
+                fuzzy = fuzzy or token_fuzzy
+            token_matches.sort(key=len)
+            scores = dict(token_matches[0])
+            for matches in token_matches[1:]:
+                if not scores:
+                    break
+                scores = {entry_id: score + matches[entry_id]
+                          for entry_id, score in scores.items() if entry_id in matches}
+        if allowed is not None:
+            scores = {entry_id: score for entry_id, score in scores.items() if entry_id in allowed}
+
+        now = time.time()
+        ranked = [
+            (-(score + self._recency(self._entries[entry_id], now)), self._order[entry_id], entry_id)
+            for entry_id, score in scores.items()
+        ]
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, ranked)
+        else:
+            ranked.sort()
+        return [entry_id for _, _, entry_id in ranked], fuzzy
+
+    def search(self, text: str = "", category: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Записи, подходящие под каждый токен запроса, по убыванию релевантности (см. rank)"""
+        ids, _ = self.rank(text, category, limit)
+        return [self._entries[entry_id] for entry_id in ids]
+
+    def entry(self, entry_id: str) -> Optional[dict]:
+        """Проиндексированная запись по id"""
+        return self._entries.get(entry_id)
+
+
+class SearchSession:
+    """Сессия поиска по строке ввода
+
+    Запоминает результат предыдущего запроса и, если новый запрос его
+    продолжает ("git" -> "gith"), ищет только среди прежних совпадений.
+    Последние запросы хранятся в LRU-кэше, поэтому возврат по Backspace не
+    требует нового поиска. Кэш сбрасывается, когда меняется счетчик
+    поколений хранилища (его увеличивает каждое изменение данных).
+
+    Поиск выполняется без блокировки хранилища, чтобы сохранение и удаление
+    записей в потоке интерфейса не ждали ранжирования. Под блокировкой
+    берутся только кэш и номер поколения; если за время поиска данные
+    изменились, результат не кэшируется и поиск повторяется.
+    """
+    CACHE_SIZE = 32
+    # Попыток поиска без блокировки, после них поиск идет под блокировкой
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, password_manager):
+        self.password_manager = password_manager
+        self._generation = None
+        self._cache = OrderedDict()
+        self._previous = None  # (текст, категория, id результатов) запроса без опечаток
+
+    def invalidate(self):
+        """Сбрасывает кэш и предыдущий результат"""
+        self._cache.clear()
+        self._previous = None
+
+    def _sync_generation(self) -> int:
+        """Сбрасывает кэш, если данные изменились; вызывается под блокировкой"""
+        generation = self.password_manager.generation
+        if generation != self._generation:
+            self.invalidate()
+            self._generation = generation
+        return generation
+
+    def _store(self, key: tuple, results: List[dict], previous):
+        """Кладет результат в кэш; вызывается под блокировкой"""
+        self._previous = previous
+        self._cache[key] = results
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def search(self, text: str = "", category: str = "Все категории",
+               limit: Optional[int] = None) -> List[dict]:
+        """Результаты запроса, отсортированные по релевантности"""
+        manager = self.password_manager
+        text = text.lower().strip()
+        key = (text, category)
+
+        for _ in range(self.MAX_ATTEMPTS):
+            with manager._lock:
+                generation = self._sync_generation()
+                results = self._cache.get(key)
+                if results is not None:
+                    self._cache.move_to_end(key)
+                    return results if limit is None else results[:limit]
+                previous = self._previous
+
+            try:
+                results, previous = self._run(text, category, previous)
+            except (RuntimeError, KeyError):
+                # Индекс изменили во время чтения - повторяем с новым поколением
+                continue
+
+            with manager._lock:
+                if manager.generation == generation:
+                    self._store(key, results, previous)
+                    return results if limit is None else results[:limit]
+
+        # Данные меняются быстрее, чем идет поиск: ищем под блокировкой
+        with manager._lock:
+            self._sync_generation()
+            results, previous = self._run(text, category, self._previous)
+            self._store(key, results, previous)
+        return results if limit is None else results[:limit]
+
+    def _run(self, text: str, category: str, previous) -> Tuple[List[dict], Optional[tuple]]:
+        """Выполняет запрос, по возможности сужая предыдущий результат
+
+        Возвращает результаты и новое значение предыдущего запроса.
+        """
+        manager = self.password_manager
+        candidates = None
+        if previous and previous[0] and text.startswith(previous[0]) and previous[1] == category:
+            candidates = previous[2]
+
+        ids, fuzzy = manager.index.rank(
+            text, None if category == "Все категории" else category, candidates=candidates
+        )
+        entries = (manager.index.entry(entry_id) for entry_id in ids)
+        results = [manager._public_entry(entry) for entry in entries if entry is not None]
+        return results, None if fuzzy else (text, category, ids)
@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import logging
+import threading
+from typing import Optional, List, Iterator
+from .crypto_manager import CryptoManagerV2
+
+
+class SQLiteVaultStore:
+    """Хранилище записей в SQLite
+
+    Каждая запись - строка таблицы. Открытыми остаются только id, сервис,
+    категория и время создания и изменения. Остальные метаданные (логин,
+    URL, email, телефон, оценка надежности, отдельно запечатанные заметки)
+    лежат в колонке details, а пароль - в колонке secret. Обе запечатаны
+    ключом сессии, как и записи в .vault. Поиск идет по индексу в памяти
+    (SearchIndex), поэтому других индексов, кроме уникального по сервису,
+    в базе нет.
+
+    Название сервиса уникально с учетом регистра, как и в файловом
+    хранилище: "GitHub" и "github" - разные записи. Запись с уже занятым
+    названием не заменяет существующую, а вызывает sqlite3.IntegrityError.
+    """
+    SCHEMA_VERSION = 1
+    # Колонки, которые хранятся открыто; все остальное уходит в details
+    COLUMNS = ("id", "service", "category", "created_at", "modified_at", "secret")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            id TEXT PRIMARY KEY,
+            service TEXT NOT NULL,
+            category TEXT NOT NULL,
+            created_at INTEGER,
+            modified_at INTEGER NOT NULL DEFAULT 0,
+            details TEXT NOT NULL,
+            secret TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_service ON entries(service COLLATE BINARY);
+        CREATE TABLE IF NOT EXISTS categories (
+            name TEXT PRIMARY KEY
+        );
+    """
+
+    def __init__(self, path: str, crypto: CryptoManagerV2):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.crypto = crypto
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def open(self):
+        """Открывает базу и разблокирует ключ данных по ее заголовку"""
+        with self._lock:
+            self.logger.info(f"Открытие SQLite-хранилища: {self.path}")
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+
+            meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+            if "kek_salt" in meta and "wrapped_key" in meta:
+                try:
+                    self.crypto.unlock_session(bytes(meta["kek_salt"]), bytes(meta["wrapped_key"]))
+                except ValueError:
+                    self.close()
+                    raise
+            else:
+                # Новая база: сессия создается здесь, если хранилище не переносится из .vault
+                self.crypto.create_session()
+                with self._conn:
+                    self._write_header()
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _write_header(self):
+        """Сохраняет соль KEK и обернутый ключ данных текущей сессии"""
+        salt, wrapped = self.crypto.session_header()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("kek_salt", salt), ("wrapped_key", wrapped), ("schema_version", self.SCHEMA_VERSION)]
+        )
+
+    def _details_aad(self, entry_id: str) -> bytes:
+        return f"{entry_id}:details".encode()
+
+    def _row_to_entry(self, row: sqlite3.Row) -> dict:
+        """Собирает запись из строки, расшифровывая открытые метаданные"""
+        entry = {column: row[column] for column in self.COLUMNS if row[column] is not None}
+        entry.update(self.crypto.open_record(row["details"], self._details_aad(row["id"])))
+        return entry
+
+    def _entry_params(self, entry: dict) -> tuple:
+        """Параметры INSERT для записи"""
+        details = {key: value for key, value in entry.items() if key not in self.COLUMNS}
+        return (
+            entry["id"],
+            entry["service"],
+            entry["category"],
+            entry.get("created_at"),
+            entry.get("modified_at", 0),
+            self.crypto.seal_record(details, self._details_aad(entry["id"])),
+            entry["secret"]
+        )
+
+    def _insert(self, entry: dict):
+        self._conn.execute(
+            "INSERT INTO entries "
+            "(id, service, category, created_at, modified_at, details, secret) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._entry_params(entry)
+        )
+        self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (entry["category"],))
+
+    def upsert(self, entry: dict):
+        """Добавляет или обновляет одну запись
+
+        Строка обновляется по id; если ее нет, вставляется новая. Занятое
+        другой записью название сервиса вызывает sqlite3.IntegrityError.
+        """
+        with self._lock, self._conn:
+            entry_id, *values = self._entry_params(entry)
+            cursor = self._conn.execute(
+                "UPDATE entries SET service = ?, category = ?, created_at = ?, "
+                "modified_at = ?, details = ?, secret = ? WHERE id = ?",
+                (*values, entry_id)
+            )
+            if cursor.rowcount == 0:
+                self._insert(entry)
+            else:
+                self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (entry["category"],))
+
+    def get(self, entry_id: str) -> Optional[dict]:
+        """Запись по id"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_by_service(self, service: str) -> Optional[dict]:
+        """Запись по названию сервиса (индекс idx_entries_service)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM entries WHERE service = ? COLLATE BINARY", (service,)
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def iter_entries(self) -> Iterator[dict]:
+        """Все записи хранилища"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM entries").fetchall()
+        for row in rows:
+            yield self._row_to_entry(row)
+
+    def categories(self) -> List[str]:
+        """Список категорий"""
+        with self._lock:
+            return [row["name"] for row in self._conn.execute("SELECT name FROM categories ORDER BY rowid")]
+
+    def add_category(self, name: str):
+        """Добавляет категорию"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+
+    def replace_all(self, entries: List[dict], categories: List[str]):
+        """Заменяет содержимое базы одной транзакцией (миграция, смена пароля)
+
+        Заголовок перезаписывается из текущей сессии self.crypto, поэтому
+        секреты записей должны быть запечатаны ключом этой же сессии.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM categories")
+            self._write_header()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                [(name,) for name in categories]
+            )
+            for entry in entries:
+                self._insert(entry)
+        self.logger.info(f"В SQLite-хранилище записано записей: {len(entries)}")
+
+    def remove(self):
+        """Закрывает и удаляет файлы базы"""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+            except OSError as e:
+                self.logger.warning(f"Не удалось удалить {self.path + suffix}: {str(e)}")
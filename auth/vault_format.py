@@ -0,0 +1,69 @@
+"""
+Бинарный контейнер хранилища (формат EEFV)
+
+Фиксированный заголовок с сырыми солью KEK, обернутым ключом данных,
+nonce и тегом GCM, за которым сразу идет сырой шифротекст. Все поля
+заголовка до тега передаются в GCM как associated data, поэтому
+отдельный HMAC не нужен.
+"""
+import struct
+
+MAGIC = b"EEFV"
+FORMAT_VERSION = 1
+
+SALT_SIZE = 32
+WRAPPED_KEY_SIZE = 12 + 64 + 16  # nonce + ключ данных + тег
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+# magic, версия, флаги, memory_cost, time_cost, parallelism, время создания,
+# соль KEK, обернутый ключ, nonce
+HEADER_PREFIX = struct.Struct(f">4sBBIHHQ{SALT_SIZE}s{WRAPPED_KEY_SIZE}s{NONCE_SIZE}s")
+HEADER_SIZE = HEADER_PREFIX.size + TAG_SIZE
+
+
+def is_container(buf) -> bool:
+    """Проверяет, что буфер начинается с заголовка бинарного контейнера"""
+    return len(buf) >= HEADER_SIZE and bytes(buf[:len(MAGIC)]) == MAGIC
+
+
+def pack_prefix(kdf_config: dict, created_at: int, salt: bytes, wrapped: bytes, nonce: bytes) -> bytes:
+    """Собирает аутентифицируемую часть заголовка (все до тега)"""
+    return HEADER_PREFIX.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        kdf_config["memory_cost"],
+        kdf_config["time_cost"],
+        kdf_config["parallelism"],
+        created_at,
+        salt,
+        wrapped,
+        nonce
+    )
+
+
+def unpack(buf: memoryview) -> dict:
+    """Разбирает контейнер без копирования шифротекста"""
+    if not is_container(buf):
+        raise ValueError("Неизвестный формат контейнера")
+
+    (magic, version, flags, memory_cost, time_cost, parallelism,
+     created_at, salt, wrapped, nonce) = HEADER_PREFIX.unpack_from(buf, 0)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия контейнера: {version}")
+
+    return {
+        "version": version,
+        "flags": flags,
+        "memory_cost": memory_cost,
+        "time_cost": time_cost,
+        "parallelism": parallelism,
+        "created_at": created_at,
+        "salt": salt,
+        "wrapped_key": wrapped,
+        "nonce": nonce,
+        "aad": buf[:HEADER_PREFIX.size],
+        "tag": bytes(buf[HEADER_PREFIX.size:HEADER_SIZE]),
+        "ciphertext": buf[HEADER_SIZE:]
+    }
@@ -0,0 +1,140 @@
+import os
+import json
+import struct
+import secrets
+import logging
+from typing import List
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from .crypto_manager import CryptoManagerV2
+
+
+class VaultJournal:
+    """Журнал изменений хранилища, дописываемый только в конец
+
+    Каждая мутация (добавление/изменение записи, новая категория) шифруется
+    отдельной записью и дописывается в файл рядом с .vault. Журнал привязан
+    к id базового снимка: после сжатия снимок получает новый id, и старый
+    журнал перестает применяться, даже если его не успели очистить.
+    """
+    MAGIC = b"EEFJ"
+    VERSION = 1
+    HEADER = struct.Struct(">4sB16s")  # magic, версия, id снимка
+    RECORD = struct.Struct(">I")  # длина nonce + шифротекста
+    NONCE_SIZE = 12
+
+    def __init__(self, path: str, crypto: CryptoManagerV2):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.crypto = crypto
+        self.snapshot_id = None
+        self.records = 0
+        self.size = 0
+
+    def _aad(self, seq: int) -> bytes:
+        """Associated data записи: id снимка и порядковый номер"""
+        return self.snapshot_id + seq.to_bytes(8, "big")
+
+    def replay(self, snapshot_id: bytes) -> List[dict]:
+        """Читает операции журнала, относящиеся к снимку snapshot_id
+
+        Чтение останавливается на первой недочитанной или поврежденной
+        записи (например, после сбоя во время записи), а хвост файла
+        обрезается, чтобы следующие записи легли сразу за последней целой.
+        """
+        self.snapshot_id = snapshot_id
+        self.records = 0
+        self.size = 0
+        operations = []
+
+        if not os.path.exists(self.path):
+            # Без заголовка следующие записи сочли бы чужим журналом
+            self.reset(snapshot_id)
+            return operations
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+
+        if len(content) < self.HEADER.size:
+            self.logger.warning("Журнал поврежден: нет заголовка")
+            self.reset(snapshot_id)
+            return operations
+
+        magic, version, journal_snapshot = self.HEADER.unpack_from(content, 0)
+        if magic != self.MAGIC or version != self.VERSION or journal_snapshot != snapshot_id:
+            # Журнал от другого снимка: его изменения уже есть в снимке
+            self.logger.info("Журнал относится к другому снимку и будет сброшен")
+            self.reset(snapshot_id)
+            return operations
+
+        key = AESGCM(self.crypto.derive_subkey(b"journal"))
+        view = memoryview(content)
+        offset = self.HEADER.size
+        while offset + self.RECORD.size <= len(content):
+            (length,) = self.RECORD.unpack_from(content, offset)
+            start = offset + self.RECORD.size
+            end = start + length
+            if length <= self.NONCE_SIZE or end > len(content):
+                break
+            try:
+                plain = key.decrypt(
+                    bytes(view[start:start + self.NONCE_SIZE]),
+                    bytes(view[start + self.NONCE_SIZE:end]),
+                    self._aad(self.records)
+                )
+                operations.append(json.loads(plain))
+            except (InvalidTag, ValueError):
+                break
+            self.records += 1
+            offset = end
+
+        if offset != len(content):
+            self.logger.warning(f"Обрезка поврежденного хвоста журнала: {len(content) - offset} байт")
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        self.size = offset
+        return operations
+
+    def append(self, operation: dict):
+        """Дописывает одну операцию в журнал и сбрасывает ее на диск"""
+        if self.snapshot_id is None:
+            raise ValueError("Журнал не привязан к снимку")
+
+        nonce = secrets.token_bytes(self.NONCE_SIZE)
+        sealed = AESGCM(self.crypto.derive_subkey(b"journal")).encrypt(
+            nonce,
+            json.dumps(operation, separators=(",", ":")).encode(),
+            self._aad(self.records)
+        )
+        record = self.RECORD.pack(len(nonce) + len(sealed)) + nonce + sealed
+
+        with open(self.path, "ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.records += 1
+        self.size += len(record)
+
+    def reset(self, snapshot_id: bytes):
+        """Начинает пустой журнал для нового снимка"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, snapshot_id))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.snapshot_id = snapshot_id
+        self.records = 0
+        self.size = self.HEADER.size
+
+    def remove(self):
+        """Удаляет файл журнала"""
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            self.logger.warning(f"Не удалось удалить журнал: {str(e)}")
+        self.snapshot_id = None
+        self.records = 0
+        self.size = 0
@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import (
     QCheckBox, QPushButton, QLineEdit, QMessageBox, QProgressBar, QWidget
 )
 from PyQt6.QtCore import Qt
+from utils.password_utils import password_strength, strength_percent, STRENGTH_SEVERITY
 from styles import PASSWORD_GENERATOR_STYLES, DIALOG_TITLE_BAR_STYLES, APP_STYLES
 
 
@@ -121,15 +122,14 @@ class PasswordGeneratorDialog(QDialog):
             password = ''.join(secrets.choice(chars) for _ in range(length))
             self.preview.setText(password)
 
-            strength = self.evaluate_strength(password)
-            self.strength_bar.setValue(strength)
+            self.strength_bar.setValue(self.evaluate_strength(password))
 
-            if strength < 40:
-                color = "#d32f2f"  # красный
-            elif strength < 70:
-                color = "#fbc02d"  # жёлтый
-            else:
-                color = "#00c853"  # зелёный
+            # Цвет по той же оценке, что у индикатора чипа и статуса пароля
+            color = {
+                'danger': "#d32f2f",  # красный
+                'warning': "#fbc02d",  # жёлтый
+                'safe': "#00c853"  # зелёный
+            }[STRENGTH_SEVERITY[password_strength(password)]]
 
             self.strength_bar.setStyleSheet(f"""
                 QProgressBar {{
@@ -146,17 +146,8 @@ class PasswordGeneratorDialog(QDialog):
             QMessageBox.critical(self, "Ошибка", f"Не удалось сгенерировать пароль: {str(e)}")
 
     def evaluate_strength(self, password: str) -> int:
-        length_score = min(len(password), 20) * 5
-        variety_score = 0
-        if any(c.islower() for c in password):
-            variety_score += 1
-        if any(c.isupper() for c in password):
-            variety_score += 1
-        if any(c.isdigit() for c in password):
-            variety_score += 1
-        if any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?~" for c in password):
-            variety_score += 1
-        return min(length_score + variety_score * 5, 100)
+        """Заполнение шкалы надежности в процентах (по энтропии подбора)"""
+        return strength_percent(password)
 
     def get_password(self):
         return self.preview.text()
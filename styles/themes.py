@@ -20,6 +20,7 @@ from .components import (
 from .widgets import (
     CHIP_WIDGET_STYLES as DEFAULT_CHIP_WIDGET_STYLES,
     CHIP_LABEL_STYLES as DEFAULT_CHIP_LABEL_STYLES,
+    CHIP_DELEGATE_STYLES as DEFAULT_CHIP_DELEGATE_STYLES,
     PASSWORD_STRENGTH_COLORS as DEFAULT_PASSWORD_STRENGTH_COLORS,
     ADD_BUTTON_STYLES as DEFAULT_ADD_BUTTON_STYLES,
     SKIP_BUTTON_STYLES as DEFAULT_SKIP_BUTTON_STYLES,
@@ -67,6 +68,7 @@ THEMES = {
         "OVERLAY_MESSAGE_STYLES": DEFAULT_OVERLAY_MESSAGE_STYLES["default"],
         "CHIP_WIDGET_STYLES": DEFAULT_CHIP_WIDGET_STYLES["default"],
         "CHIP_LABEL_STYLES": DEFAULT_CHIP_LABEL_STYLES["default"],
+        "CHIP_DELEGATE_STYLES": DEFAULT_CHIP_DELEGATE_STYLES["default"],
         "PASSWORD_STRENGTH_COLORS": DEFAULT_PASSWORD_STRENGTH_COLORS["default"],
         "ADD_BUTTON_STYLES": DEFAULT_ADD_BUTTON_STYLES,
         "SKIP_BUTTON_STYLES": DEFAULT_SKIP_BUTTON_STYLES,
@@ -90,6 +92,7 @@ THEMES = {
         "OVERLAY_MESSAGE_STYLES": DEFAULT_OVERLAY_MESSAGE_STYLES["cyberpunk"],
         "CHIP_WIDGET_STYLES": DEFAULT_CHIP_WIDGET_STYLES["cyberpunk"],
         "CHIP_LABEL_STYLES": DEFAULT_CHIP_LABEL_STYLES["cyberpunk"],
+        "CHIP_DELEGATE_STYLES": DEFAULT_CHIP_DELEGATE_STYLES["cyberpunk"],
         "PASSWORD_STRENGTH_COLORS": DEFAULT_PASSWORD_STRENGTH_COLORS["cyberpunk"],
         "ADD_BUTTON_STYLES": CYBERPUNK_ADD_BUTTON_STYLES,
         "SKIP_BUTTON_STYLES": CYBERPUNK_SKIP_BUTTON_STYLES,
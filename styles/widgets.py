@@ -263,6 +263,38 @@ CHIP_LABEL_STYLES = {
     }
 }
 
+# Цвета и изображения для отрисовки чипов делегатом виртуального списка
+CHIP_DELEGATE_STYLES = {
+    "default": {
+        "login": "#FFFFFF",
+        "service": "#FFFFFF",
+        "url": "#707070",
+        "letter": "#FFFFFF",
+        "font_family": "",
+        "hover_background": "#505050",
+        "selected_background": "#2A2A2A",
+        "selected_border": "#444444",
+        "radius": 5,
+        "background_image": None,
+        "hover_image": None,
+        "selected_image": None
+    },
+    "cyberpunk": {
+        "login": "#FFFFFF",
+        "service": "#00F0FF",
+        "url": "#FF3B33",
+        "letter": "#00F0FF",
+        "font_family": "Rajdhani Medium",
+        "hover_background": None,
+        "selected_background": None,
+        "selected_border": None,
+        "radius": 0,
+        "background_image": "styles/images/cyberpunk/CHIP.png",
+        "hover_image": "styles/images/cyberpunk/CHIPHOVER.png",
+        "selected_image": "styles/images/cyberpunk/CHIPPRESSED.png"
+    }
+}
+
 THEME_COMBOBOX_STYLES = {
     "default": """
         QComboBox {
@@ -0,0 +1,82 @@
+import os
+import random
+import shutil
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import breach_db
+from utils.breach_db import BreachDatabase, import_dump
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest().upper()
+
+
+class BreachDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.dump_path = os.path.join(self.tmp, "dump.txt")
+        self.db_path = os.path.join(self.tmp, "breaches.bin")
+
+        rng = random.Random(7)
+        self.counts = {_sha1(f"password{i}"): rng.randint(1, 1000) for i in range(200)}
+        # Два хэша с общим двухбайтовым префиксом попадают в одну корзину
+        self.counts["ABCD" + "0" * 36] = 5
+        self.counts["ABCD" + "F" * 36] = 6
+
+    def _write_dump(self, lines):
+        with open(self.dump_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _open(self):
+        database = BreachDatabase(self.db_path)
+        self.addCleanup(database.close)
+        return database
+
+    def _assert_counts(self, database, counts):
+        for digest, count in counts.items():
+            self.assertEqual(database.count(digest), count, digest)
+        self.assertEqual(database.count(_sha1("not breached")), 0)
+        self.assertEqual(database.count("ABCD" + "8" * 36), 0)
+
+    def test_unsorted_dump_with_many_runs(self):
+        lines = [f"{digest}:{count}" for digest, count in self.counts.items()]
+        random.Random(1).shuffle(lines)
+        # Повтор хэша в другой порции: числа складываются
+        duplicate = lines[0].split(":")[0]
+        lines.append(f"{duplicate}:10")
+        lines.append("not a hash line")
+        self._write_dump(lines)
+
+        # 203 записи по 4 - 51 порция, по 3 за проход - несколько проходов слияния
+        with mock.patch.object(breach_db, "MERGE_FAN_IN", 3):
+            total = import_dump(self.dump_path, self.db_path, chunk_records=4)
+
+        expected = dict(self.counts)
+        expected[duplicate] += 10
+        self.assertEqual(total, len(expected))
+        database = self._open()
+        self.assertEqual(database.record_count, len(expected))
+        self._assert_counts(database, expected)
+        # Временные файлы сортировки удалены
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["breaches.bin", "dump.txt"])
+
+    def test_sorted_dump(self):
+        self._write_dump([f"{digest}:{count}" for digest, count in sorted(self.counts.items())])
+        self.assertEqual(import_dump(self.dump_path, self.db_path, chunk_records=16), len(self.counts))
+        self._assert_counts(self._open(), self.counts)
+
+    def test_truncated_file_is_rejected(self):
+        self._write_dump([f"{digest}:{count}" for digest, count in self.counts.items()])
+        import_dump(self.dump_path, self.db_path)
+        with open(self.db_path, "r+b") as f:
+            f.truncate(os.path.getsize(self.db_path) - 1)
+        with self.assertRaises(ValueError):
+            BreachDatabase(self.db_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+
+from auth import password_manager
+from auth.password_manager import PasswordManager
+from vault_helpers import VaultTestCase
+
+
+class _ManualThread:
+    """Поток сжатия, который запускается вручную (после блокировки)"""
+    created = []
+
+    def __init__(self, target, daemon=None):
+        self.target = target
+        _ManualThread.created.append(self)
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class CompactionAfterLockTest(VaultTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(mock.patch.object(PasswordManager, "JOURNAL_MAX_RECORDS", 3))
+        self.patch(mock.patch.object(password_manager.threading, "Thread", _ManualThread))
+        _ManualThread.created = []
+
+    def test_compaction_after_lock_keeps_vault(self):
+        manager = PasswordManager("lock-test", "secret", backend="vault")
+        for index in range(4):
+            self.assertTrue(manager.save_password(f"service{index}", "Passw0rd!"))
+        self.assertEqual(len(_ManualThread.created), 1)
+
+        with open(manager.vault_path, "rb") as f:
+            vault_before = f.read()
+        with open(manager.journal.path, "rb") as f:
+            journal_before = f.read()
+
+        manager.clear_sensitive_data()
+        self.assertFalse(manager.compact())
+        _ManualThread.created[0].target()
+
+        with open(manager.vault_path, "rb") as f:
+            self.assertEqual(f.read(), vault_before)
+        with open(manager.journal.path, "rb") as f:
+            self.assertEqual(f.read(), journal_before)
+
+        reopened = PasswordManager("lock-test", "secret", backend="vault")
+        self.assertEqual(sorted(entry["service"] for entry in reopened.passwords),
+                         [f"service{index}" for index in range(4)])
+
+
+if __name__ == "__main__":
+    unittest.main()
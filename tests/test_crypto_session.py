@@ -0,0 +1,49 @@
+import unittest
+
+from auth.crypto_manager import CryptoManagerV2
+
+
+class CryptoSessionTest(unittest.TestCase):
+    def test_no_implicit_session(self):
+        crypto = CryptoManagerV2("session-test", "secret")
+        with self.assertRaises(RuntimeError):
+            crypto.derive_subkey(b"records")
+        with self.assertRaises(RuntimeError):
+            crypto.session_header()
+
+    def test_cleared_session_stays_locked(self):
+        crypto = CryptoManagerV2("session-test", "secret")
+        crypto.create_session()
+        token = crypto.seal_record({"password": "x"}, b"id")
+        self.assertEqual(crypto.open_record(token, b"id"), {"password": "x"})
+
+        crypto.clear_session()
+        self.assertFalse(crypto.has_session())
+        for call in (lambda: crypto.derive_subkey(b"records"),
+                     crypto.session_header,
+                     crypto.create_session,
+                     lambda: crypto.open_record(token, b"id")):
+            with self.assertRaises(RuntimeError):
+                call()
+        self.assertFalse(crypto.has_session())
+
+    def test_unlock_reopens_existing_key(self):
+        crypto = CryptoManagerV2("session-test", "secret")
+        crypto.create_session()
+        salt, wrapped = crypto.session_header()
+        token = crypto.seal_record({"password": "x"}, b"id")
+
+        other = CryptoManagerV2("session-test", "secret")
+        other.unlock_session(salt, wrapped)
+        self.assertEqual(other.open_record(token, b"id"), {"password": "x"})
+
+    def test_with_login_keeps_password(self):
+        # И логин, и пароль могут содержать разделитель "::" из секрета
+        crypto = CryptoManagerV2("old::user", "pin::1")
+        renamed = crypto.with_login("new-user")
+        self.assertFalse(renamed.has_session())
+        self.assertEqual(renamed._get_secret(), CryptoManagerV2("new-user", "pin::1")._get_secret())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from PyQt6.QtCore import QCoreApplication
+
+from utils.cache_manager import FaviconIndex
+from utils.favicon_atlas import FaviconAtlas
+from utils.favicon_service import FaviconService
+from utils.pixmap_cache import PixmapCache
+
+
+class FaviconAtlasTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def _atlas(self):
+        atlas = FaviconAtlas(self.tmp)
+        self.addCleanup(atlas.close)
+        return atlas
+
+    def test_pack_and_lookup(self):
+        atlas = self._atlas()
+        atlas.add("a.png", b"icon-a")
+        atlas.add("b.png", b"icon-b")
+        self.assertEqual(atlas.get("a.png"), b"icon-a")  # еще не записана
+        atlas.flush()
+        atlas.add("c.png", b"icon-c")
+        atlas.discard("a.png")
+        atlas.close()
+
+        reopened = self._atlas()
+        self.assertEqual(sorted(reopened.names()), ["b.png", "c.png"])
+        self.assertEqual(reopened.get("b.png"), b"icon-b")
+        self.assertEqual(reopened.get("c.png"), b"icon-c")
+        self.assertIsNone(reopened.get("a.png"))
+
+    def test_replaced_icons_are_compacted(self):
+        atlas = self._atlas()
+        atlas.add("a.png", b"x" * 100)
+        atlas.flush()
+        for version in range(3):
+            atlas.add("a.png", bytes([version]) * 100)
+            atlas.flush()
+        self.assertEqual(atlas.get("a.png"), b"\x02" * 100)
+        # Замененные копии не копятся: атлас переписывается, когда их больше половины
+        self.assertLess(os.path.getsize(atlas.path), 300)
+
+    def test_unreadable_atlas_is_recreated(self):
+        with open(os.path.join(self.tmp, FaviconAtlas.FILENAME), "wb") as f:
+            f.write(b"garbage" * 10)
+        atlas = self._atlas()
+        self.assertEqual(atlas.count, 0)
+        atlas.add("a.png", b"icon-a")
+        atlas.flush()
+        self.assertEqual(self._atlas().get("a.png"), b"icon-a")
+
+
+class FaviconCacheClearTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.service = FaviconService(cache_dir=self.tmp)
+        self.addCleanup(self.service.shutdown)
+
+    def test_atlas_is_closed_before_clear(self):
+        self.service.enable_atlas()
+        self.service.atlas.add(FaviconIndex.file_name("example.com"), b"icon")
+        self.service.atlas.flush()
+        self.service._results["example.com"] = self.service.cache_path("example.com")
+        atlas_path = self.service.atlas.path
+
+        def clear_files():
+            self.assertIsNone(self.service.atlas)
+            self.assertFalse(os.path.exists(atlas_path))
+
+        with mock.patch.object(PixmapCache.instance(), "clear") as clear_pixmaps:
+            self.service.clear_cache(clear_files)
+        clear_pixmaps.assert_called_once_with()
+
+        self.assertIsNotNone(self.service.atlas)
+        self.assertEqual(self.service.atlas.count, 0)
+        self.assertNotIn("example.com", self.service._results)
+        self.assertIsNone(self.service.atlas.get(FaviconIndex.file_name("example.com")))
+
+
+if __name__ == "__main__":
+    unittest.main()
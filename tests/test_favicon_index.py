@@ -0,0 +1,40 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+from utils.cache_manager import FaviconIndex
+from utils.hash_utils import md5_hash
+
+
+class FaviconIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.index_path = os.path.join(self.tmp, FaviconIndex.FILENAME)
+
+    def _saved(self) -> str:
+        with open(self.index_path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_domains_are_stored_hashed(self):
+        index = FaviconIndex(self.tmp)
+        index.record("example.com", 100, '"etag"')
+        index.record_failure("missing.example.org", 3600, 7 * 86400)
+        index.save()
+
+        saved = self._saved()
+        self.assertNotIn("example", saved)
+        self.assertIn(md5_hash("example.com") + ".png", json.loads(saved)["entries"])
+        self.assertEqual(index.path_for("example.com"), os.path.join(self.tmp, md5_hash("example.com") + ".png"))
+
+        reopened = FaviconIndex(self.tmp)
+        self.assertIn("example.com", reopened)
+        self.assertEqual(reopened.peek("example.com")["etag"], '"etag"')
+        self.assertGreater(reopened.retry_at("missing.example.org"), time.time())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from PyQt6.QtCore import QCoreApplication
+
+from utils.favicon_service import FaviconService
+
+ICON = b"\x89PNG\r\n\x1a\nicon"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class _IconHandler(BaseHTTPRequestHandler):
+    """Сервис иконок: good.test отдает иконку с ETag, остальные домены - 404"""
+    requests = []
+
+    def do_GET(self):
+        _IconHandler.requests.append((self.path, dict(self.headers)))
+        if "domain=good.test" not in self.path:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(ICON)))
+        self.end_headers()
+        self.wfile.write(ICON)
+
+    def log_message(self, *args):
+        pass
+
+
+class FaviconRevalidationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _IconHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_port}/icon?domain={{domain}}&sz={{size}}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        _IconHandler.requests = []
+        self.service = FaviconService(cache_dir=self.tmp, endpoint=self.endpoint, ttl=3600)
+        self.addCleanup(self.service.shutdown)
+
+    def test_fresh_icon_is_not_requested_again(self):
+        path, changed = self.service._fetch("good.test")
+        self.assertTrue(changed)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), ICON)
+
+        self.assertEqual(self.service._fetch("good.test"), (path, False))
+        self.assertEqual(len(_IconHandler.requests), 1)
+
+    def test_stale_icon_is_revalidated_with_etag(self):
+        path, _ = self.service._fetch("good.test")
+        fetched_at = self.service.index.peek("good.test")["fetched_at"]
+
+        with mock.patch("time.time", return_value=fetched_at + 3601):
+            self.assertEqual(self.service._fetch("good.test"), (path, False))
+
+        self.assertEqual(len(_IconHandler.requests), 2)
+        headers = _IconHandler.requests[1][1]
+        self.assertEqual(headers.get("If-None-Match"), ETAG)
+        self.assertEqual(headers.get("If-Modified-Since"), LAST_MODIFIED)
+        self.assertEqual(self.service.index.peek("good.test")["fetched_at"], fetched_at + 3601)
+
+    def test_missing_icon_backs_off(self):
+        start = time.time()
+        self.assertEqual(self.service._fetch("missing.test"), ("", False))
+        retry_at = self.service.index.retry_at("missing.test")
+        self.assertAlmostEqual(retry_at - start, FaviconService.NEGATIVE_DELAY, delta=5)
+
+        # До конца паузы домен не запрашивается ни загрузкой, ни request()
+        self.assertEqual(self.service._fetch("missing.test"), ("", False))
+        self.assertEqual(self.service.request("https://missing.test/login"), "")
+        self.assertEqual(len(_IconHandler.requests), 1)
+
+        with mock.patch("time.time", return_value=retry_at + 1):
+            self.service._fetch("missing.test")
+        self.assertEqual(len(_IconHandler.requests), 2)
+        self.assertAlmostEqual(self.service.index.retry_at("missing.test") - (retry_at + 1),
+                               2 * FaviconService.NEGATIVE_DELAY, delta=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.hibp_cache import HIBPRangeCache
+
+RANGE = "0018A45C4D1DEF81644B54AB7F969B88D65:10\r\n00D4F6E8FA6EECAD2A3AA415EEC418D38EC:2\r\nbad line\r\n"
+SUFFIX = "00D4F6E8FA6EECAD2A3AA415EEC418D38EC"
+
+
+class HIBPRangeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, "hibp.db")
+        self.key = b"k" * 32
+
+    def _cache(self, key=None, **kwargs):
+        cache = HIBPRangeCache(self.path, key or self.key, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_round_trip(self):
+        records = HIBPRangeCache.parse_range(RANGE)
+        self.assertEqual(len(records), 2)
+        blob = self._cache().put("21BD1", records)
+        self.assertEqual(HIBPRangeCache.search(blob, SUFFIX), 2)
+
+        cached = self._cache().get("21bd1")
+        self.assertEqual(cached, blob)
+        self.assertEqual(HIBPRangeCache.search(cached, "0018A45C4D1DEF81644B54AB7F969B88D65"), 10)
+        self.assertEqual(HIBPRangeCache.search(cached, "F" * 35), 0)
+
+    def test_file_is_encrypted(self):
+        cache = self._cache()
+        cache.put("21BD1", HIBPRangeCache.parse_range(RANGE))
+        cache.close()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertNotIn(b"21BD1", data)
+        self.assertNotIn(bytes.fromhex("0" + SUFFIX), data)
+
+        # Чужой ключ не находит и не расшифровывает диапазон
+        self.assertIsNone(self._cache(key=b"x" * 32).get("21BD1"))
+
+    def test_expired_range_is_dropped(self):
+        self._cache(ttl=60).put("21BD1", HIBPRangeCache.parse_range(RANGE))
+        later = time.time() + 61
+        with mock.patch("time.time", return_value=later):
+            self.assertIsNone(self._cache(ttl=60).get("21BD1"))
+        # Истекшие диапазоны удаляются при открытии
+        self.assertIsNone(self._cache(ttl=3600).get("21BD1"))
+
+    def test_oldest_ranges_are_evicted(self):
+        cache = self._cache(max_ranges=2)
+        records = HIBPRangeCache.parse_range(RANGE)
+        for offset, prefix in enumerate(("00000", "11111", "22222")):
+            with mock.patch("time.time", return_value=1000.0 + offset):
+                cache.put(prefix, records)
+        with mock.patch("time.time", return_value=1010.0):
+            self.assertIsNone(cache.get("00000"))
+            self.assertIsNotNone(cache.get("11111"))
+            self.assertIsNotNone(cache.get("22222"))
+
+
+if __name__ == "__main__":
+    unittest.main()
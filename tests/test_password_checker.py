@@ -0,0 +1,175 @@
+import time
+import asyncio
+import hashlib
+import threading
+import unittest
+from concurrent.futures import CancelledError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from PyQt6.QtCore import QCoreApplication
+
+from utils.password_checker import BreachCountCache, HIBPChecker, TokenBucket
+
+
+def _sha1(password: str) -> str:
+    return hashlib.sha1(password.encode()).hexdigest().upper()
+
+
+class BreachCountCacheTest(unittest.TestCase):
+    def test_least_recent_entry_is_evicted(self):
+        cache = BreachCountCache(2)
+        cache.put(_sha1("one"), 1)
+        cache.put(_sha1("two"), 2)
+        self.assertEqual(cache.get(_sha1("one")), 1)  # "two" становится самым старым
+        cache.put(_sha1("three"), 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(_sha1("two")))
+        self.assertEqual(cache.get(_sha1("one")), 1)
+        self.assertEqual(cache.get(_sha1("three")), 3)
+
+        cache.put(_sha1("one"), 10)
+        self.assertEqual(cache.get(_sha1("one")), 10)
+        self.assertEqual(len(cache), 2)
+
+    def test_keys_are_session_hmacs(self):
+        digest = _sha1("hunter2")
+        first, second = BreachCountCache(4), BreachCountCache(4)
+        first.put(digest, 7)
+        second.put(digest, 7)
+
+        tag = next(iter(first._index))
+        self.assertEqual(len(tag), BreachCountCache.TAG_SIZE)
+        self.assertNotIn(tag, hashlib.sha1(b"hunter2").digest() + b"hunter2")
+        self.assertNotEqual(tag, next(iter(second._index)))
+
+    def test_clear_forgets_results(self):
+        cache = BreachCountCache(4)
+        cache.put(_sha1("hunter2"), 7)
+        old_key = cache._key
+        cache.clear()
+        self.assertNotEqual(cache._key, old_key)
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get(_sha1("hunter2")))
+
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        async def acquire_all():
+            bucket = TokenBucket(rate=20, capacity=2)
+            times = []
+            for _ in range(4):
+                await bucket.acquire()
+                times.append(time.monotonic())
+            return times
+
+        times = asyncio.run(acquire_all())
+        # Два жетона сразу, дальше по одному в 1/20 с
+        self.assertLess(times[1] - times[0], 0.02)
+        self.assertGreaterEqual(times[3] - times[1], 0.09)
+
+    def test_cancelled_wait_returns_token(self):
+        async def cancel_wait():
+            bucket = TokenBucket(rate=1, capacity=1)
+            await bucket.acquire()
+            waiter = asyncio.ensure_future(bucket.acquire())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            return bucket._tokens
+
+        self.assertAlmostEqual(asyncio.run(cancel_wait()), 0, delta=0.1)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Диапазоны HIBP: хэш пароля "hunter2" найден 7 раз, ответ с задержкой"""
+    requests = []
+    delay = 0.0
+
+    def do_GET(self):
+        prefix = self.path.rsplit("/", 1)[-1]
+        _RangeHandler.requests.append((prefix, time.monotonic()))
+        time.sleep(_RangeHandler.delay)
+        digest = _sha1("hunter2")
+        body = f"{digest[5:]}:7\r\n" if digest.startswith(prefix) else ""
+        body += "0" * 35 + ":1\r\n"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class HIBPCheckerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_port}/range/{{prefix}}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _RangeHandler.requests = []
+        _RangeHandler.delay = 0.0
+
+    def _checker(self, interval=0.0, burst=3):
+        with mock.patch.object(HIBPChecker, "MIN_REQUEST_INTERVAL", interval), \
+                mock.patch.object(HIBPChecker, "REQUEST_BURST", burst):
+            checker = HIBPChecker(range_endpoint=self.endpoint)
+        self.addCleanup(checker.cleanup)
+        return checker
+
+    def test_same_prefix_is_requested_once(self):
+        _RangeHandler.delay = 0.2
+        checker = self._checker()
+        digest = _sha1("hunter2")
+        futures = [checker.submit_breach_counts(digest[:5], [digest[5:]]),
+                   checker.submit_breach_counts(digest[:5], ["F" * 35])]
+
+        self.assertEqual(futures[0].result(timeout=5), {digest[5:]: 7})
+        self.assertEqual(futures[1].result(timeout=5), {"F" * 35: 0})
+        self.assertEqual([prefix for prefix, _ in _RangeHandler.requests], [digest[:5]])
+
+    def test_bucket_spaces_requests(self):
+        checker = self._checker(interval=0.2, burst=1)
+        futures = [checker.submit_breach_counts(prefix, ["0" * 35]) for prefix in ("AAAAA", "BBBBB", "CCCCC")]
+        for future in futures:
+            self.assertEqual(future.result(timeout=5), {"0" * 35: 1})
+
+        times = sorted(when for _, when in _RangeHandler.requests)
+        self.assertEqual(len(times), 3)
+        for earlier, later in zip(times, times[1:]):
+            self.assertGreaterEqual(later - earlier, 0.15)
+
+    def test_cancel_stops_waiting_lookup(self):
+        checker = self._checker(interval=60, burst=1)
+        self.assertEqual(checker.submit_breach_counts("AAAAA", ["0" * 35]).result(timeout=5), {"0" * 35: 1})
+
+        # Жетонов нет: запрос ждет минуту и отменяется до обращения к сети
+        future = checker.submit_breach_counts("BBBBB", ["0" * 35])
+        time.sleep(0.1)
+        future.cancel()
+        with self.assertRaises(CancelledError):
+            future.result(timeout=5)
+        time.sleep(0.1)
+
+        self.assertEqual([prefix for prefix, _ in _RangeHandler.requests], ["AAAAA"])
+        self.assertEqual(asyncio.run_coroutine_threadsafe(self._inflight(checker), checker._loop).result(5), {})
+
+    @staticmethod
+    async def _inflight(checker):
+        return dict(checker._inflight)
+
+
+if __name__ == "__main__":
+    unittest.main()
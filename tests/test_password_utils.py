@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+from utils import password_utils
+from utils.password_utils import (analyze_password, clear_strength_cache, password_strength,
+                                  strength_percent, SCORE_THRESHOLDS)
+
+
+class AnalyzePasswordTest(unittest.TestCase):
+    def setUp(self):
+        clear_strength_cache()
+        self.addCleanup(clear_strength_cache)
+
+    def test_score_bands(self):
+        for password, score in (("", 0), ("kx9m2", 0), ("kx9m2q", 1), ("kx9m2q7", 2),
+                                ("Kx9m2q7w!", 3), ("Kx9m2q7w!zR3", 4)):
+            entropy, actual, _ = analyze_password(password)
+            self.assertEqual(actual, score, password)
+            self.assertEqual(actual, sum(entropy >= threshold for threshold in SCORE_THRESHOLDS))
+            self.assertEqual(password_strength(password), score)
+        self.assertEqual(strength_percent("Kx9m2q7w!zR3xK9#mQ2$"), 100)
+
+    def test_patterns_are_weak(self):
+        for password, pattern in (("P@ssw0rd", "dictionary"), ("abcdefgh", "sequence"),
+                                  ("aaaaaaaaaa", "repeat"), ("19.05.1990", "date")):
+            _, score, actual = analyze_password(password)
+            self.assertEqual((score, actual), (0, pattern), password)
+
+    def test_results_are_memoized(self):
+        with mock.patch.object(password_utils, "_min_entropy", wraps=password_utils._min_entropy) as compute:
+            first = analyze_password("Kx9m2q7w!")
+            self.assertEqual(analyze_password("Kx9m2q7w!"), first)
+            self.assertEqual(compute.call_count, 1)
+            # Пароль не хранится в ключах кэша
+            self.assertTrue(all(b"Kx9m2q7w" not in key for key in password_utils._memo))
+
+            clear_strength_cache()
+            self.assertEqual(analyze_password("Kx9m2q7w!"), first)
+            self.assertEqual(compute.call_count, 2)
+
+    def test_memo_is_bounded(self):
+        with mock.patch.object(password_utils, "STRENGTH_CACHE_SIZE", 2):
+            for password in ("kx9m2", "kx9m2q", "kx9m2q7"):
+                analyze_password(password)
+            self.assertEqual(len(password_utils._memo), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
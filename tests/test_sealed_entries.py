@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+from auth.crypto_manager import CryptoManagerV2
+from auth.password_manager import PasswordManager
+from vault_helpers import VaultTestCase
+
+
+class SealedEntriesTest(VaultTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = PasswordManager("sealed-test", "secret", backend="vault")
+        self.assertTrue(self.manager.save_password("Bank", "Passw0rd!", notes="routing number",
+                                                   login="owner"))
+
+    def _assert_sealed(self, entries):
+        self.assertEqual([entry["service"] for entry in entries], ["Bank"])
+        for field in ("password", "notes", *PasswordManager.SEALED_FIELDS):
+            self.assertNotIn(field, entries[0])
+
+    def test_list_and_search_do_not_decrypt(self):
+        with mock.patch.object(CryptoManagerV2, "open_record_with") as open_record:
+            self._assert_sealed(self.manager.passwords)
+            self._assert_sealed(self.manager.filter_entries("routing"))
+            self._assert_sealed(self.manager.filter_entries("bank", "Без категории"))
+        open_record.assert_not_called()
+
+        stored = self.manager.data["passwords"][0]
+        self.assertIn("secret", stored)
+        self.assertNotIn("password", stored)
+
+    def test_edit_keeps_other_sealed_fields(self):
+        self.assertTrue(self.manager.save_password("Bank", "N3w-Passw0rd!"))
+
+        entry = self.manager.get_entry_by_service("Bank")
+        self.assertEqual(entry["password"], "N3w-Passw0rd!")
+        self.assertEqual(entry["notes"], "routing number")
+        self.assertEqual(entry["login"], "owner")
+
+        reopened = PasswordManager("sealed-test", "secret", backend="vault")
+        self.assertEqual(reopened.get_entry_by_service("Bank")["notes"], "routing number")
+
+
+if __name__ == "__main__":
+    unittest.main()
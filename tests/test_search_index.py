@@ -0,0 +1,176 @@
+import threading
+import unittest
+from unittest import mock
+
+from auth.crypto_manager import CryptoManagerV2
+from auth.password_manager import PasswordManager
+from auth.search_index import SearchIndex, SearchSession
+from vault_helpers import VaultTestCase
+
+
+def _entry(entry_id, service, category="Work", **fields):
+    return {"id": entry_id, "service": service, "category": category,
+            "secret": "", "modified_at": 0, **fields}
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.build([
+            _entry("github", "GitHub", url="https://github.com"),
+            _entry("git", "Git"),
+            _entry("mail", "Mail", "Personal", login="github-bot"),
+            _entry("bank", "Bank", "Personal"),
+        ], {"bank": "routing number"})
+
+    def _ids(self, text, category=None):
+        return self.index.rank(text, category)[0]
+
+    def test_exact_and_prefix_rank_by_field(self):
+        # Точное совпадение выше префикса, название сервиса выше логина
+        self.assertEqual(self._ids("git"), ["git", "github", "mail"])
+        self.assertEqual(self._ids("gith"), ["github", "mail"])
+
+    def test_substring_uses_trigrams(self):
+        self.assertEqual(self._ids("hub"), ["github", "mail"])
+
+    def test_typo_is_fuzzy(self):
+        ids, fuzzy = self.index.rank("githbu")
+        self.assertEqual(ids[0], "github")
+        self.assertTrue(fuzzy)
+        self.assertFalse(self.index.rank("github")[1])
+
+    def test_notes_and_category(self):
+        self.assertEqual(self._ids("routing"), ["bank"])
+        self.assertEqual(self._ids("git", "Personal"), ["mail"])
+        self.assertEqual(self._ids("", "Personal"), ["mail", "bank"])
+
+    def test_reindex_drops_old_tokens(self):
+        self.index.add(_entry("github", "GitLab"))
+        self.assertEqual(self._ids("com"), [])
+        self.assertEqual(self._ids("gitl"), ["github"])
+        self.index.remove("mail")
+        self.assertEqual(self._ids("bot"), [])
+        self.assertEqual(self._ids("", "Personal"), ["bank"])
+
+
+class _Manager:
+    """Минимальный менеджер паролей для SearchSession"""
+
+    def __init__(self, entries):
+        self._lock = threading.RLock()
+        self.generation = 0
+        self.index = SearchIndex()
+        self.index.build(entries)
+
+    def _public_entry(self, entry):
+        return dict(entry)
+
+
+class SearchSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = _Manager([_entry("github", "GitHub"), _entry("gitlab", "GitLab"),
+                                 _entry("mail", "Mail")])
+        self.session = SearchSession(self.manager)
+        self.rank = mock.patch.object(self.manager.index, "rank", wraps=self.manager.index.rank).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _services(self, text):
+        return [entry["service"] for entry in self.session.search(text)]
+
+    def test_longer_query_narrows_previous_result(self):
+        self.assertEqual(self._services("git"), ["GitHub", "GitLab"])
+        self.assertEqual(self._services("gitl"), ["GitLab"])
+        self.assertEqual(set(self.rank.call_args.kwargs["candidates"]), {"github", "gitlab"})
+
+    def test_fuzzy_result_is_not_narrowed(self):
+        self.assertEqual(self._services("gitjub")[0], "GitHub")
+        self._services("gitjubx")
+        self.assertIsNone(self.rank.call_args.kwargs["candidates"])
+
+    def test_cache_is_dropped_on_new_generation(self):
+        self.assertEqual(self._services("git"), ["GitHub", "GitLab"])
+        self._services("git")
+        self.assertEqual(self.rank.call_count, 1)
+
+        self.manager.index.add(_entry("gitea", "Gitea"))
+        self.manager.generation += 1
+        self.assertEqual(self._services("git"), ["GitHub", "GitLab", "Gitea"])
+        self.assertEqual(self.rank.call_count, 2)
+
+    def test_result_of_stale_generation_is_retried(self):
+        def rank(*args, **kwargs):
+            if self.rank.call_count == 1:
+                # Запись изменена, пока шел первый поиск без блокировки
+                self.manager.generation += 1
+            return SearchIndex.rank(self.manager.index, *args, **kwargs)
+
+        self.rank.side_effect = rank
+        self.assertEqual(self._services("mail"), ["Mail"])
+        self.assertEqual(self.rank.call_count, 2)
+        self._services("mail")
+        self.assertEqual(self.rank.call_count, 2)
+
+    def test_search_falls_back_to_lock_when_data_keeps_changing(self):
+        def rank(*args, **kwargs):
+            if not self.manager._lock._is_owned():
+                self.manager.generation += 1
+            return SearchIndex.rank(self.manager.index, *args, **kwargs)
+
+        self.rank.side_effect = rank
+        self.assertEqual(self._services("mail"), ["Mail"])
+        self.assertEqual(self.rank.call_count, SearchSession.MAX_ATTEMPTS + 1)
+        self._services("mail")
+        self.assertEqual(self.rank.call_count, SearchSession.MAX_ATTEMPTS + 1)
+
+    def test_least_recent_query_is_evicted(self):
+        with mock.patch.object(SearchSession, "CACHE_SIZE", 2):
+            for text in ("github", "mail", "gitlab", "mail"):
+                self._services(text)
+            self.assertEqual(self.rank.call_count, 3)
+            self._services("github")
+            self.assertEqual(self.rank.call_count, 4)
+
+
+class NotesSearchTest(VaultTestCase):
+    def test_decrypted_notes_are_searchable_after_reopen(self):
+        manager = PasswordManager("search-test", "secret", backend="vault")
+        self.assertTrue(manager.save_password("Bank", "Passw0rd!", notes="routing number"))
+        self.assertEqual([entry["service"] for entry in manager.filter_entries("routing")], ["Bank"])
+
+        reopened = PasswordManager("search-test", "secret", backend="vault")
+        results = reopened.filter_entries("routing")
+        self.assertEqual([entry["service"] for entry in results], ["Bank"])
+        self.assertNotIn("notes", results[0])
+
+    def test_unlock_opens_notes_but_not_passwords(self):
+        manager = PasswordManager("search-test", "secret", backend="vault")
+        self.assertTrue(manager.save_password("Bank", "Passw0rd!", notes="routing number"))
+        entry_id = manager.passwords[0]["id"]
+
+        with mock.patch.object(CryptoManagerV2, "open_record_with",
+                               wraps=CryptoManagerV2.open_record_with) as open_record:
+            reopened = PasswordManager("search-test", "secret", backend="vault")
+        self.assertEqual([call.args[2] for call in open_record.call_args_list], [f"{entry_id}:notes".encode()])
+        self.assertEqual(reopened.get_entry(entry_id)["password"], "Passw0rd!")
+
+    def test_notes_sealed_with_password_are_resealed(self):
+        manager = PasswordManager("search-test", "secret", backend="vault")
+        self.assertTrue(manager.save_password("Bank", "Passw0rd!"))
+        # Формат до разделения: заметки запечатаны в secret вместе с паролем
+        entry = manager.data["passwords"][0]
+        entry["secret"] = manager.crypto.seal_record({"password": "Passw0rd!", "notes": "routing number"},
+                                                     entry["id"].encode())
+        del entry["sealed_notes"]
+        self.assertTrue(manager.save_data())
+
+        reopened = PasswordManager("search-test", "secret", backend="vault")
+        self.assertEqual([entry["service"] for entry in reopened.filter_entries("routing")], ["Bank"])
+        entry = reopened.data["passwords"][0]
+        self.assertEqual(reopened.crypto.open_record(entry["secret"], entry["id"].encode()),
+                         {"password": "Passw0rd!"})
+        self.assertEqual(reopened.get_entry(entry["id"])["notes"], "routing number")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from auth.crypto_manager import CryptoManagerV2
+from auth.password_manager import PasswordManager
+from auth.sqlite_store import SQLiteVaultStore
+from vault_helpers import VaultTestCase
+
+
+class SQLiteVaultStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.crypto = CryptoManagerV2("sqlite-test", "secret")
+        cls.crypto.create_session()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "user.db")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def _entry(self):
+        return {
+            "id": "a" * 32, "service": "GitHub", "category": "Work", "modified_at": 1,
+            "url": "https://github.com/login",
+            "secret": self.crypto.seal_record({"password": "x"}, b"a" * 32),
+        }
+
+    def test_new_store_keeps_url_sealed(self):
+        store = SQLiteVaultStore(self.path, self.crypto)
+        store.open()
+        self.addCleanup(store.close)
+        store.upsert(self._entry())
+        self.assertEqual(store.get("a" * 32)["url"], "https://github.com/login")
+        store.close()
+
+        for suffix in ("", "-wal"):
+            if os.path.exists(self.path + suffix):
+                with open(self.path + suffix, "rb") as f:
+                    self.assertNotIn(b"github.com", f.read())
+
+
+
+class SQLiteChangeUsernameTest(VaultTestCase):
+    def test_rows_move_to_new_user(self):
+        manager = PasswordManager("old-user", "secret", backend="sqlite")
+        self.assertTrue(manager.save_password("GitHub", "Passw0rd!", notes="2fa codes"))
+        old_db_path = manager.db_path
+
+        self.assertTrue(manager.change_username("new-user"))
+        self.assertFalse(os.path.exists(old_db_path))
+        self.assertEqual(manager.db_path, PasswordManager._get_db_path("new-user"))
+        self.assertTrue(manager.save_password("GitLab", "Passw0rd!"))
+        manager.clear_sensitive_data()
+
+        reopened = PasswordManager("new-user", "secret")
+        self.addCleanup(reopened.clear_sensitive_data)
+        self.assertEqual(reopened.backend, "sqlite")
+        self.assertEqual(sorted(entry["service"] for entry in reopened.passwords), ["GitHub", "GitLab"])
+        entry = reopened.get_entry_by_service("GitHub")
+        self.assertEqual((entry["password"], entry["notes"]), ("Passw0rd!", "2fa codes"))
+
+
+if __name__ == "__main__":
+    unittest.main()
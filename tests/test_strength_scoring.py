@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+
+from auth import password_manager
+from auth.password_manager import PasswordManager
+from vault_helpers import VaultTestCase
+
+
+class StrengthScoringTest(VaultTestCase):
+    def setUp(self):
+        super().setUp()
+        manager = PasswordManager("strength-test", "secret", backend="vault")
+        self.assertTrue(manager.save_password("weak", "password"))
+        self.assertTrue(manager.save_password("strong", "Kx9m2q7w!zR3xK9#mQ2$"))
+        self.scores = {entry["id"]: entry["strength"] for entry in manager.passwords}
+
+    def _reopen(self):
+        manager = PasswordManager("strength-test", "secret", backend="vault")
+        scorer = mock.patch.object(password_manager, "password_strength",
+                                   wraps=password_manager.password_strength)
+        return manager, self.patch(scorer)
+
+    def test_stored_scores_are_not_recomputed(self):
+        manager, scorer = self._reopen()
+        self.assertEqual(manager.score_strengths(), {})
+        scorer.assert_not_called()
+        self.assertEqual({entry["id"]: entry["strength"] for entry in manager.passwords}, self.scores)
+
+    def test_scores_of_old_version_are_recomputed(self):
+        with mock.patch.object(password_manager, "STRENGTH_VERSION", password_manager.STRENGTH_VERSION + 1):
+            manager, scorer = self._reopen()
+            generation = manager.generation
+            self.assertEqual(manager.score_strengths(), {})
+        self.assertEqual(scorer.call_count, 2)
+        # Оценки не изменились: список перестраивать не нужно
+        self.assertEqual(manager.generation, generation)
+
+    def test_edit_rescores_seeded_entry(self):
+        manager, scorer = self._reopen()
+        self.assertTrue(manager.save_password("weak", "Kx9m2q7w!zR3xK9#mQ2$-weak"))
+        scorer.assert_called_once_with("Kx9m2q7w!zR3xK9#mQ2$-weak")
+        entry = manager.get_entry_by_service("weak")
+        self.assertEqual(entry["strength"], 4)
+        self.assertEqual(entry["strength_version"], password_manager.STRENGTH_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import time
+import threading
+import unittest
+from concurrent.futures import Future
+
+from PyQt6.QtCore import QCoreApplication
+
+from utils.password_checker import HIBPChecker
+from utils.vault_audit import VaultAudit
+
+SHARED = "AAAAA"
+COUNTS = {SHARED + "1" * 35: 20, SHARED + "2" * 35: 0, "BBBBB" + "3" * 35: 3}
+
+
+class _Checker:
+    """HIBPChecker без сети: считает запросы диапазонов"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def submit_breach_counts(self, prefix, suffixes):
+        with self._lock:
+            self.calls.append((prefix, sorted(suffixes)))
+        future = Future()
+        future.set_result({suffix: COUNTS.get(prefix + suffix, 0) for suffix in suffixes})
+        return future
+
+    status_for_count = staticmethod(HIBPChecker.status_for_count)
+
+
+class _Manager:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def password_hashes(self):
+        return list(self.rows)
+
+
+class VaultAuditTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.checker = _Checker()
+        self.audit = VaultAudit(self.checker)
+        self.addCleanup(self.audit.shutdown)
+        self.statuses = {}
+        self.summaries = []
+        self.audit.entry_checked.connect(lambda entry_id, status: self.statuses.__setitem__(entry_id, status))
+        self.audit.finished.connect(self.summaries.append)
+
+    def _run(self, rows):
+        self.audit.start(_Manager(rows))
+        deadline = time.monotonic() + 5
+        while not self.summaries and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.assertEqual(len(self.summaries), 1)
+        return self.summaries[0]
+
+    def test_one_request_per_prefix(self):
+        summary = self._run([
+            ("mail", "Mail", SHARED + "1" * 35),
+            ("bank", "Bank", SHARED + "2" * 35),
+            ("shop", "Shop", SHARED + "2" * 35),  # тот же пароль, что у bank
+            ("work", "Work", "BBBBB" + "3" * 35),
+        ])
+
+        self.assertEqual(sorted(self.checker.calls), [
+            (SHARED, ["1" * 35, "2" * 35]),
+            ("BBBBB", ["3" * 35]),
+        ])
+        self.assertEqual(summary["ranges"], 2)
+        self.assertEqual((summary["compromised"], summary["warning"], summary["reused"]), (1, 1, 2))
+        self.assertEqual(self.statuses["mail"]["severity"], "danger")
+        self.assertEqual(self.statuses["shop"]["status"], "Reused")
+        self.assertEqual(self.statuses["work"]["count"], 3)
+
+    def test_empty_vault_finishes_without_requests(self):
+        self.assertEqual(self._run([])["total"], 0)
+        self.assertEqual(self.checker.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from auth.crypto_manager import CryptoManagerV2
+from auth.vault_journal import VaultJournal
+
+
+class VaultJournalTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.crypto = CryptoManagerV2("journal-test", "secret")
+        cls.crypto.create_session()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "user.journal")
+        self.snapshot_id = uuid.uuid4().bytes
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_replay_returns_appended_operations(self):
+        journal = VaultJournal(self.path, self.crypto)
+        journal.reset(self.snapshot_id)
+        journal.append({"op": "category", "name": "Work"})
+
+        operations = VaultJournal(self.path, self.crypto).replay(self.snapshot_id)
+        self.assertEqual(operations, [{"op": "category", "name": "Work"}])
+
+    def test_append_after_missing_journal_survives_reload(self):
+        # Журнал удален после сжатия: записи, дописанные после открытия,
+        # не должны теряться как журнал чужого снимка
+        journal = VaultJournal(self.path, self.crypto)
+        self.assertEqual(journal.replay(self.snapshot_id), [])
+        journal.append({"op": "category", "name": "bitbucket"})
+
+        operations = VaultJournal(self.path, self.crypto).replay(self.snapshot_id)
+        self.assertEqual(operations, [{"op": "category", "name": "bitbucket"}])
+
+    def test_foreign_snapshot_is_discarded(self):
+        journal = VaultJournal(self.path, self.crypto)
+        journal.reset(self.snapshot_id)
+        journal.append({"op": "category", "name": "Work"})
+
+        other = VaultJournal(self.path, self.crypto)
+        self.assertEqual(other.replay(uuid.uuid4().bytes), [])
+        self.assertEqual(other.records, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
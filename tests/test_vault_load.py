@@ -0,0 +1,110 @@
+import json
+import time
+import base64
+import secrets
+import unittest
+
+from cryptography.hazmat.primitives import hashes, hmac
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from auth import vault_format
+from auth.crypto_manager import CryptoManagerV2
+from auth.password_manager import PasswordManager
+from vault_helpers import VaultTestCase
+
+
+def _legacy_vault(crypto: CryptoManagerV2, data: dict) -> str:
+    """Хранилище в JSON-формате v3, как его писал прежний encrypt_data"""
+    salt = secrets.token_bytes(crypto.kdf_config["salt_size"])
+    nonce = secrets.token_bytes(12)
+    enc_key, auth_key = crypto._derive_keys(salt)
+    associated_data = f"v3:{int(time.time())}".encode()
+    sealed = AESGCM(enc_key).encrypt(nonce, json.dumps(data).encode(), associated_data)
+    result = {
+        "config": {**crypto.kdf_config, "version": 3},
+        "salt": base64.b64encode(salt).decode(),
+        "nonce": base64.b64encode(nonce).decode(),
+        "tag": base64.b64encode(sealed[-16:]).decode(),
+        "associated_data": base64.b64encode(associated_data).decode(),
+        "ciphertext": base64.b64encode(sealed[:-16]).decode()
+    }
+    h = hmac.HMAC(auth_key, hashes.SHA3_256())
+    h.update(json.dumps(result, sort_keys=True).encode())
+    result["hmac"] = base64.b64encode(h.finalize()).decode()
+    return json.dumps(result)
+
+
+class VaultLoadTest(VaultTestCase):
+    def setUp(self):
+        super().setUp()
+        manager = PasswordManager("load-test", "secret", backend="vault")
+        self.assertTrue(manager.save_password("github", "Passw0rd!"))
+        self.vault_path = manager.vault_path
+        with open(self.vault_path, "rb") as f:
+            self.vault = f.read()
+
+    def _assert_vault_kept(self):
+        with open(self.vault_path, "rb") as f:
+            self.assertEqual(f.read(), self.vault)
+
+    def test_corrupted_container_is_not_overwritten(self):
+        corrupted = bytearray(self.vault)
+        corrupted[-1] ^= 0xFF
+        with open(self.vault_path, "wb") as f:
+            f.write(corrupted)
+        self.vault = bytes(corrupted)
+
+        with self.assertRaises(ValueError):
+            PasswordManager("load-test", "secret", backend="vault")
+        self._assert_vault_kept()
+
+    def test_wrong_pin_is_not_overwritten(self):
+        with self.assertRaises(ValueError):
+            PasswordManager("load-test", "wrong", backend="vault")
+        self._assert_vault_kept()
+
+        reopened = PasswordManager("load-test", "secret", backend="vault")
+        self.assertEqual([entry["service"] for entry in reopened.passwords], ["github"])
+
+    def test_change_password_rebinds_backups(self):
+        manager = PasswordManager("load-test", "secret", backend="vault")
+        old_crypto = manager.crypto
+        self.assertTrue(manager.change_password("new-secret"))
+
+        self.assertIs(manager.backup.crypto, manager.crypto)
+        self.assertIs(manager.journal.crypto, manager.crypto)
+        self.assertFalse(old_crypto.has_session())
+        self.assertTrue(manager.save_password("gitlab", "Passw0rd!"))
+
+        reopened = PasswordManager("load-test", "new-secret", backend="vault")
+        self.assertEqual(sorted(entry["service"] for entry in reopened.passwords), ["github", "gitlab"])
+
+
+
+class LegacyVaultTest(VaultTestCase):
+    def test_json_vault_is_rewritten_as_container(self):
+        vault_path = PasswordManager._get_vault_path("legacy-test")
+        with open(vault_path, "w") as f:
+            f.write(_legacy_vault(CryptoManagerV2("legacy-test", "secret"), {
+                "passwords": [{"service": "github", "password": "Passw0rd!", "category": "Work",
+                               "notes": "old notes", "created_at": 1, "modified_at": 1}],
+                "categories": ["Без категории", "Work"],
+            }))
+
+        manager = PasswordManager("legacy-test", "secret", backend="vault")
+        self.assertEqual([entry["service"] for entry in manager.passwords], ["github"])
+        entry = manager.get_entry_by_service("github")
+        self.assertEqual((entry["password"], entry["notes"]), ("Passw0rd!", "old notes"))
+
+        # Первое изменение пишет полный снимок в бинарном контейнере
+        self.assertTrue(manager.save_password("gitlab", "Passw0rd!"))
+        with open(vault_path, "rb") as f:
+            self.assertTrue(vault_format.is_container(f.read()))
+
+        reopened = PasswordManager("legacy-test", "secret", backend="vault")
+        self.assertEqual(sorted(entry["service"] for entry in reopened.passwords), ["github", "gitlab"])
+        self.assertEqual(reopened.get_entry_by_service("github")["password"], "Passw0rd!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from auth import backup_manager
+from auth.password_manager import PasswordManager
+
+
+def _msvcrt_stub():
+    # Проверка блокировки файла в _save_snapshot есть только в Windows
+    stub = types.ModuleType("msvcrt")
+    stub.LK_NBLCK, stub.LK_UNLCK = 1, 0
+    stub.locking = lambda *args: None
+    return stub
+
+
+class VaultTestCase(unittest.TestCase):
+    """Тесты PasswordManager с хранилищами и бэкапами во временном каталоге"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.patch(mock.patch.object(PasswordManager, "VAULT_DIR", os.path.join(self.tmp, "vaults")))
+        self.patch(mock.patch.object(backup_manager.BackupManager, "BACKUP_DIR", os.path.join(self.tmp, "backups")))
+        if sys.platform != "win32":
+            self.patch(mock.patch.dict(sys.modules, {"msvcrt": _msvcrt_stub()}))
+        os.makedirs(PasswordManager.VAULT_DIR)
+
+    def patch(self, patcher):
+        """Включает патч до конца теста и возвращает подмененный объект"""
+        patched = patcher.start()
+        self.addCleanup(patcher.stop)
+        return patched
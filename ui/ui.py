@@ -3,103 +3,53 @@ from PyQt6.QtWidgets import (
     QLabel, QLineEdit, QPushButton, QListWidget,
     QInputDialog, QProgressBar, QComboBox, QFileDialog,
     QMessageBox, QDialog, QSpinBox, QStackedWidget, QGroupBox, QTextEdit,
-    QSplitter, QLayout, QLayoutItem, QSizePolicy, QScrollArea, QToolButton, QRadioButton, QSpacerItem, QTreeWidget, QListWidgetItem,
+    QSplitter, QLayoutItem, QSizePolicy, QScrollArea, QToolButton, QRadioButton, QSpacerItem, QTreeWidget, QListWidgetItem,
     QApplication
 )
 from PyQt6.QtGui import QMouseEvent, QPixmap, QDrag, QColor, QPainter, QPen, QBrush, QIcon, QFontDatabase
 from PyQt6.QtCore import (
-    Qt, QPoint, QMimeData, pyqtSignal, QRect, QSize, QTimer,
+    Qt, QPoint, QMimeData, pyqtSignal, QSize, QTimer,
     QPropertyAnimation, QEasingCurve, pyqtProperty, QEvent, QProcess
 )
 import sys
 import utils
-import os
 import json
 from password_generator import PasswordGeneratorDialog
 from auth.password_manager import PasswordManager
 from auth.user_credentials import UserCredentials
 from addPassword import AuthWidget
-from utils.url_utils import extract_domain
-from utils.hash_utils import md5_hash
-import requests
 import time
 from widgets.animated_stack import AnimatedStackedWidget
 from widgets.password_status import PasswordStatusWidget
 from utils.password_checker import HIBPChecker
+from utils.password_utils import clear_strength_cache
+from utils.hibp_cache import HIBPRangeCache
+from utils.breach_db import BreachDatabase
+from utils.vault_audit import VaultAudit
+from utils.strength_scorer import StrengthScorer
 from utils.settings_manager import SettingsManager
 from utils.cache_manager import CacheManager
+from utils.search_worker import SearchWorker
+from utils.favicon_service import FaviconService
 from widgets.base_widgets import ToolbarWidget, DraggablePanel
 from widgets.password_widgets import TagsContainer, ChipWidget
+from widgets.password_list_view import PasswordListView
 from widgets.animated_panel import AnimatedPanel
 from widgets.overlay_message import OverlayMessage
 from styles.themes import THEMES
 
 
-class VerticalFlowLayout(QLayout):
-    def __init__(self, parent=None, margin=0, spacing=0, column_count=1):
-        super().__init__(parent)
-        self._items = []
-        self.column_count = column_count
-        self.spacing = spacing
-        self.setContentsMargins(margin, margin, margin, margin)
-
-    def addItem(self, item):
-        self._items.append(item)
-
-    def count(self):
-        return len(self._items)
-
-    def itemAt(self, index):
-        return self._items[index] if 0 <= index < len(self._items) else None
-
-    def takeAt(self, index):
-        return self._items.pop(index) if 0 <= index < len(self._items) else None
-
-    def sizeHint(self):
-        return self._calculate_size()
-
-    def minimumSize(self):
-        return self._calculate_size()
-
-    def setGeometry(self, rect):
-        super().setGeometry(rect)
-        self._arrange(rect)
-
-    def _calculate_size(self):
-        total_height = 0
-        max_width = 0
-        for item in self._items:
-            size = item.sizeHint()
-            total_height += size.height() + self.spacing
-            max_width = max(max_width, size.width())
-        return QSize(max_width * self.column_count, total_height)
-
-    def _arrange(self, rect):
-        column_width = (rect.width() - (self.column_count - 1) * self.spacing) // max(1, self.column_count)
-        columns = [[] for _ in range(self.column_count)]
-        column_heights = [0] * self.column_count
-
-        for item in self._items:
-            min_col = column_heights.index(min(column_heights))
-            columns[min_col].append(item)
-            column_heights[min_col] += item.sizeHint().height() + self.spacing
-
-        for col_index, col in enumerate(columns):
-            x = rect.x() + col_index * (column_width + self.spacing)
-            y = rect.y()
-            for item in col:
-                item_geom = QRect(x, y, column_width, item.sizeHint().height())
-                item.setGeometry(item_geom)
-                y += item.sizeHint().height() + self.spacing
-
-
 class PasswordManagerUI(QMainWindow):
+    # Сколько лучших результатов поиска показывать в списке
+    SEARCH_RESULTS_LIMIT = 200
+
     def __init__(self, styles):
         super().__init__()
         self.current_theme = "default"
         self.theme_styles = THEMES[self.current_theme]
         self.window_control_styles = self.theme_styles["WINDOW_CONTROL_STYLES"]
         self.password_manager = None
+        self.search_session = None
         self.passwords = []
         self.user_credentials = UserCredentials()
         self.normal_geometry = None
@@ -111,15 +61,31 @@ class PasswordManagerUI(QMainWindow):
         # Инициализируем менеджер кэша
         self.cache_manager = CacheManager(self.settings_manager)
         
-        # Кэш для favicon'ок
-        self.favicon_cache = {}
-        # Обновленный путь к кэшу
-        self.favicon_cache_dir = os.path.join(os.path.dirname(__file__), "app_cache", "favicons")
-        os.makedirs(self.favicon_cache_dir, exist_ok=True)
+        # Лимиты кэша фавиконок соблюдаются в потоке загрузки, а не здесь
+        FaviconService.instance().set_cleanup(self.cache_manager.cleanup_favicons)
+        # Атлас позволяет отрисовать все известные иконки в первом кадре
+        FaviconService.instance().enable_atlas(self.settings_manager.get_setting("interface", "favicon_atlas"))
+        FaviconService.instance().configure(endpoint=self.settings_manager.get_setting("interface", "favicon_endpoint"))
         
+        # Поиск по хранилищу выполняется вне потока интерфейса
+        self.search_worker = SearchWorker(self)
+        self.search_worker.results_ready.connect(self._show_search_results)
+
         # Инициализируем чекер паролей
-        self.hibp_checker = HIBPChecker()
+        self.hibp_checker = HIBPChecker(self.settings_manager.get_setting("security", "hibp_range_endpoint"))
         self.hibp_checker.status_ready.connect(self._update_password_status)
+        self._open_breach_db()
+
+        # Аудит хранилища на утечки выполняется в фоне
+        self.vault_audit = VaultAudit(self.hibp_checker, self)
+        self.vault_audit.progress.connect(self._on_audit_progress)
+        self.vault_audit.entry_checked.connect(self._on_audit_entry)
+        self.vault_audit.finished.connect(self._on_audit_finished)
+        self.audit_results = {}  # id записи -> статус последнего аудита
+
+        # Надежность паролей оценивается один раз после открытия хранилища
+        self.strength_scorer = StrengthScorer(self)
+        self.strength_scorer.finished.connect(self._on_strengths_scored)
         
         # Инициализация стека для переключения между интерфейсами
         self.main_stack = AnimatedStackedWidget(self)
@@ -442,8 +408,11 @@ class PasswordManagerUI(QMainWindow):
         # Сохраняем ссылку на центральную панель
         self.center_panel = center_panel
 
-        # Список паролей
-        self.tags_container = TagsContainer()
+        # Список паролей: виртуальный список с делегатом или чипы-виджеты
+        if self.settings_manager.get_setting("interface", "virtual_list", True):
+            self.tags_container = PasswordListView()
+        else:
+            self.tags_container = TagsContainer()
         print("Tags container created")  # Отладка
         center_layout.addWidget(self.tags_container)
 
@@ -615,6 +584,12 @@ class PasswordManagerUI(QMainWindow):
         autolock_layout.addWidget(autolock_label)
         autolock_layout.addWidget(self.autolock_spin)
         settings_group_layout.addLayout(autolock_layout)
+        self.audit_btn = QPushButton("Audit vault")
+        self.audit_label = QLabel("")
+        self.audit_label.setWordWrap(True)
+        self.audit_label.setStyleSheet("font-size: 12px;")
+        settings_group_layout.addWidget(self.audit_btn)
+        settings_group_layout.addWidget(self.audit_label)
 
         # Data секция
         data_label = QLabel("Data")
@@ -783,7 +758,7 @@ class PasswordManagerUI(QMainWindow):
         print("Connecting signals...")  # Отладка
         
         # Основные сигналы
-        self.search_input.textChanged.connect(self.update_list)
+        self.search_input.textChanged.connect(self._on_search_text_changed)
         self.add_btn.clicked.connect(self.save_password)
         self.generate_btn.clicked.connect(self.show_password_generator)
         self.master_password_btn.clicked.connect(self.show_password_change)
@@ -802,6 +777,7 @@ class PasswordManagerUI(QMainWindow):
         self.mac_style_radio.toggled.connect(self._on_button_style_changed)
         self.win_style_radio.toggled.connect(self._on_button_style_changed)
         self.autolock_spin.valueChanged.connect(self._on_autolock_changed)
+        self.audit_btn.clicked.connect(self.start_vault_audit)
 
         # Добавляем проверку пароля при изменении
         self.password_input.textChanged.connect(self.check_password_security)
@@ -818,6 +794,37 @@ class PasswordManagerUI(QMainWindow):
         # Подключаем сигналы для тем
         self.theme_combo.currentTextChanged.connect(lambda text: self.set_theme(text))
 
+    def start_vault_audit(self):
+        """Запускает проверку всех паролей хранилища на утечки"""
+        if not self.password_manager:
+            self.show_temporary_message("Хранилище не открыто", message_type='warning')
+            return
+        self.audit_results = {}
+        self.audit_label.setText("Подготовка проверки...")
+        self.vault_audit.start(self.password_manager)
+
+    def _on_audit_progress(self, done: int, total: int):
+        self.audit_label.setText(f"Проверено {done} из {total}")
+
+    def _on_audit_entry(self, entry_id: str, status: dict):
+        self.audit_results[entry_id] = status
+
+    def _on_audit_finished(self, summary: dict):
+        """Показывает итог аудита"""
+        compromised = [status['service'] for status in self.audit_results.values()
+                       if status.get('severity') == 'danger']
+        text = (f"Проверено: {summary['total']}, в утечках: {summary['compromised'] + summary['warning']}, "
+                f"повторяются: {summary['reused']}")
+        if summary['failed']:
+            text += f", не проверено: {summary['failed']}"
+        if compromised:
+            text += "\nСменить: " + ", ".join(sorted(compromised)[:10])
+        self.audit_label.setText(text)
+        self.show_temporary_message(
+            "Проверка хранилища завершена",
+            message_type='warning' if summary['compromised'] or summary['warning'] else 'success'
+        )
+
     def eventFilter(self, obj, event):
         """Фильтр событий для отслеживания активности пользователя"""
         if event.type() in [QEvent.Type.MouseButtonPress, QEvent.Type.KeyPress]:
@@ -1035,10 +1042,26 @@ class PasswordManagerUI(QMainWindow):
                 self.passwords.clear()
                 self.passwords = []
             
+            # Останавливаем поиск и сбрасываем кэш результатов
+            self.search_worker.set_session(None)
+            if self.search_session is not None:
+                self.search_session.invalidate()
+                self.search_session = None
+
             # Очищаем теги
             if hasattr(self, 'tags_container'):
                 self.tags_container.clear()
             
+            # Кэш HIBP закрывается вместе с ключом хранилища
+            self.vault_audit.cancel()
+            self.strength_scorer.cancel()
+            self.audit_results = {}
+            if hasattr(self, 'audit_label'):
+                self.audit_label.setText("")
+            self.hibp_checker.set_range_cache(None)
+            self.hibp_checker.clear_cache()
+            clear_strength_cache()
+
             # Очищаем менеджер паролей
             if self.password_manager:
                 self.password_manager.clear_sensitive_data()  # Предполагается, что такой метод существует
@@ -1058,6 +1081,43 @@ class PasswordManagerUI(QMainWindow):
             if self.password_manager:
                 self.password_manager = None
 
+    def create_password_manager(self, username: str, pin: str) -> PasswordManager:
+        """Открывает хранилище пользователя, при необходимости переводя его в SQLite"""
+        password_manager = PasswordManager(username, pin)
+        if (self.settings_manager.get_setting("security", "storage_backend") == "sqlite"
+                and password_manager.backend == "vault"):
+            if not password_manager.migrate_to_sqlite():
+                print("Не удалось перенести хранилище в SQLite, используется файл .vault")
+        self._open_hibp_cache(password_manager)
+        self.strength_scorer.start(password_manager)
+        return password_manager
+
+    def _on_strengths_scored(self, changed: dict):
+        """Показывает обновленные оценки надежности без повторной оценки паролей"""
+        if changed and self.password_manager:
+            self.update_list()
+
+    def _open_breach_db(self):
+        """Подключает локальную базу утечек, если она указана в настройках"""
+        path = self.settings_manager.get_setting("security", "breach_db_path")
+        if not path:
+            return
+        try:
+            self.hibp_checker.set_breach_db(BreachDatabase(path))
+        except (OSError, ValueError) as e:
+            print(f"Локальная база утечек недоступна: {str(e)}")
+
+    def _open_hibp_cache(self, password_manager: PasswordManager):
+        """Подключает кэш диапазонов HIBP, зашифрованный ключом хранилища"""
+        try:
+            self.hibp_checker.set_range_cache(HIBPRangeCache(
+                self.cache_manager.hibp_cache_path(password_manager.login),
+                password_manager.crypto.derive_subkey(b"hibp-range")
+            ))
+        except Exception as e:
+            print(f"Кэш HIBP недоступен: {str(e)}")
+            self.hibp_checker.set_range_cache(None)
+
     def handle_pin_entry(self):
         """Обработчик повторного входа после блокировки"""
         try:
@@ -1070,7 +1130,7 @@ class PasswordManagerUI(QMainWindow):
                 return
             
             # Создаем новый менеджер паролей
-            self.password_manager = PasswordManager(username, pin)
+            self.password_manager = self.create_password_manager(username, pin)
             
             # Удаляем виджет аутентификации из стека
             self.main_stack.removeWidget(self.auth_widget)
@@ -1123,6 +1183,10 @@ class PasswordManagerUI(QMainWindow):
         """Обработчик клика по тегу"""
         print("on_tag_clicked called")  # Отладка
         
+        # Секреты записи расшифровываются только сейчас, при открытии
+        if self.password_manager and entry_data.get('id'):
+            entry_data = self.password_manager.get_entry(entry_data['id']) or entry_data
+        
         # Заполняем все возможные поля из entry_data
         fields_mapping = {
             'service': self.service_input,
@@ -1158,34 +1222,53 @@ class PasswordManagerUI(QMainWindow):
         self.left_stack.setCurrentWidget(self.left_panel_widget)
         self.settings_btn.show()
 
+    def _prepare_search(self) -> bool:
+        """Привязывает фоновый поиск к сессии текущего менеджера паролей"""
+        if not self.password_manager:
+            print("Password manager not initialized")  # Отладка
+            self.search_worker.cancel()
+            self.tags_container.clear()
+            return False
+
+        if self.search_session is None or self.search_session.password_manager is not self.password_manager:
+            self.search_session = self.password_manager.search_session()
+        self.search_worker.set_session(self.search_session)
+        return True
+
+    def _search_limit(self, search_text):
+        """Сколько результатов запрашивать для строки поиска"""
+        return self.SEARCH_RESULTS_LIMIT if search_text else None
+
+    def _on_search_text_changed(self, text):
+        """Откладывает поиск до паузы во вводе"""
+        if not self._prepare_search():
+            return
+        search_text = text.lower().strip()
+        self.search_worker.search(search_text, self._search_limit(search_text))
+
     def update_list(self, filtered_passwords=None):
-        """Обновляет список паролей с учетом фильтров"""
+        """Обновляет список паролей с учетом фильтров
+
+        Поиск выполняется в фоне, список перестраивается в _show_search_results.
+        """
         print("Updating password list")  # Отладка
-        
-        # Очищаем предыдущие теги
-        self.tags_container.clear()
 
-        # Если менеджер паролей не инициализирован, выходим
-        if not self.password_manager:
-            print("Password manager not initialized")  # Отладка
+        if not self._prepare_search():
             return
 
         search_text = self.search_input.text().lower().strip()
-        
-        # Получаем отфильтрованные пароли
-        passwords = self.password_manager.filter_entries(search_text=search_text)
+        self.search_worker.search_now(search_text, self._search_limit(search_text))
+
+    def _show_search_results(self, search_text, passwords):
+        """Отображает результаты поиска, уже отсортированные по релевантности"""
+        # Результат мог прийти уже после блокировки приложения
+        if not self.password_manager:
+            return
+
         print(f"Found {len(passwords)} passwords")  # Отладка
-        
-        # Создаем все чипы сразу
-        for entry in passwords:
-            # Проверяем что entry является словарем
-            if not isinstance(entry, dict):
-                print(f"Invalid entry type: {type(entry)}")  # Отладка
-                continue
-                
-            # Создаем чип
-            print(f"Adding chip for {entry.get('service', 'unknown')}")  # Отладка
-            self.tags_container.add_tag(entry)
+
+        # Отбрасываем некорректные записи и передаем список целиком
+        self.tags_container.set_entries([entry for entry in passwords if isinstance(entry, dict)])
 
     def check_password_security(self):
         """Запускает проверку безопасности пароля"""
@@ -1425,7 +1508,7 @@ class PasswordManagerUI(QMainWindow):
             self.user_credentials.save_credentials(username, pin)
             
             # Создаем менеджер паролей
-            self.password_manager = PasswordManager(username, pin)
+            self.password_manager = self.create_password_manager(username, pin)
             
             # Переключаемся на основной интерфейс
             self.main_stack.setCurrentIndex(0)  # Индекс 0 - это основной интерфейс
@@ -1490,69 +1573,15 @@ class PasswordManagerUI(QMainWindow):
         
         main_layout.addWidget(content)
 
-    def get_favicon(self, url):
-        """Получает favicon с кэшированием в памяти и на диске"""
-        try:
-            if not url:
-                return ""
-                
-            # Проверяем кэш в памяти
-            if url in self.favicon_cache:
-                return self.favicon_cache[url]
-
-            domain = extract_domain(url)
-            if not domain:
-                return ""
-
-            hash_name = md5_hash(domain)
-            cache_path = os.path.join(self.favicon_cache_dir, f"{hash_name}.png")
-
-            # Проверяем кэш на диске
-            if os.path.exists(cache_path):
-                self.favicon_cache[url] = cache_path
-                # Очищаем кэш если превышен лимит
-                self.cache_manager.cleanup_favicons()
-                return cache_path
-
-            try:
-                response = requests.get(
-                    f"https://www.google.com/s2/favicons?domain={domain}&sz=32",
-                    timeout=3,
-                    verify=True  # Проверяем SSL сертификат
-                )
-                response.raise_for_status()  # Проверяем статус ответа
-                
-                if response.content:
-                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-                    with open(cache_path, 'wb') as f:
-                        f.write(response.content)
-                    self.favicon_cache[url] = cache_path
-                    # Очищаем кэш если превышен лимит
-                    self.cache_manager.cleanup_favicons()
-                    return cache_path
-                else:
-                    raise ValueError("Пустой ответ от сервера")
-                    
-            except requests.Timeout:
-                print(f"Timeout loading favicon for {domain}")
-            except requests.RequestException as e:
-                print(f"Network error loading favicon: {str(e)}")
-            except (IOError, OSError) as e:
-                print(f"File system error saving favicon: {str(e)}")
-            except Exception as e:
-                print(f"Unexpected error loading favicon: {str(e)}")
-                
-            # Кэшируем отсутствие иконки
-            self.favicon_cache[url] = ""
-            
-        except Exception as e:
-            print(f"Critical error in get_favicon: {str(e)}")
-            
-        return ""
-
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
         # Очищаем ресурсы
+        self.search_worker.shutdown()
+        if hasattr(self.tags_container, 'cleanup'):
+            self.tags_container.cleanup()
+        FaviconService.instance().shutdown()
+        self.vault_audit.shutdown()
+        self.strength_scorer.shutdown()
         self.hibp_checker.cleanup()
         # Очищаем кэш при выходе
         self.cache_manager.cleanup_all()
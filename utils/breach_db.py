@@ -0,0 +1,256 @@
+import os
+import sys
+import mmap
+import shutil
+import heapq
+import struct
+import tempfile
+import argparse
+from itertools import chain, islice
+from typing import Callable, Iterator, List, Optional
+
+
+class BreachDatabase:
+    """Локальная база утекших паролей (Pwned Passwords) для работы без сети
+
+    Формат файла:
+        заголовок   MAGIC, версия (uint16), биты префикса (uint16),
+                    число записей (uint64)
+        таблица     2^16 + 1 индексов (uint64): с какой записи начинается
+                    каждый двухбайтовый префикс SHA-1
+        записи      отсортированные остатки хэша (18 байт) и число утечек
+                    (uint32)
+
+    Файл отображается в память, поэтому поиск - чтение двух индексов из
+    таблицы и двоичный поиск внутри одного префикса, без сети и без
+    загрузки файла в память. Файл строится функцией import_dump.
+    """
+    MAGIC = b"EEFB"
+    VERSION = 1
+    PREFIX_BITS = 16
+    HEADER = struct.Struct("<4sHHQ")
+    OFFSET = struct.Struct("<Q")
+    RECORD = struct.Struct(">18sI")
+    BUCKETS = 1 << PREFIX_BITS
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, prefix_bits, self.record_count = self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or version != self.VERSION or prefix_bits != self.PREFIX_BITS:
+                raise ValueError("Неверный формат базы утечек")
+            self._records_offset = self.HEADER.size + (self.BUCKETS + 1) * self.OFFSET.size
+            expected = self._records_offset + self.record_count * self.RECORD.size
+            if len(self._map) < expected:
+                raise ValueError("Файл базы утечек обрезан")
+        except Exception:
+            self.close()
+            raise
+
+    def _bucket(self, bucket: int):
+        start = self.OFFSET.unpack_from(self._map, self.HEADER.size + bucket * self.OFFSET.size)[0]
+        end = self.OFFSET.unpack_from(self._map, self.HEADER.size + (bucket + 1) * self.OFFSET.size)[0]
+        return start, end
+
+    def count(self, sha1_hex: str) -> int:
+        """Число утечек для SHA-1 пароля (40 hex-символов); 0, если не найден"""
+        digest = bytes.fromhex(sha1_hex)
+        start, end = self._bucket((digest[0] << 8) | digest[1])
+        target = digest[2:]
+        size = self.RECORD.size
+        base = self._records_offset
+        low, high = start, end
+        while low < high:
+            middle = (low + high) // 2
+            position = base + middle * size
+            if self._map[position:position + 18] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < end:
+            position = base + low * size
+            key, count = self.RECORD.unpack_from(self._map, position)
+            if key == target:
+                return count
+        return 0
+
+    def close(self):
+        """Освобождает отображение файла"""
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Запись во временных файлах сортировки: полный SHA-1 и число (big-endian,
+# чтобы побайтовое сравнение совпадало с порядком хэшей)
+_RUN_RECORD = struct.Struct(">20sI")
+# Сколько временных файлов сливается за один проход и буфер чтения каждого:
+# память и число открытых файлов при слиянии не зависят от размера дампа
+MERGE_FAN_IN = 64
+RUN_BUFFER_SIZE = 64 * 1024
+
+
+def _parse_lines(source) -> Iterator[bytes]:
+    """Записи _RUN_RECORD из строк дампа вида SHA1:COUNT"""
+    for line in source:
+        digest, _, count = line.strip().partition(b":")
+        if len(digest) != 40:
+            continue
+        try:
+            yield _RUN_RECORD.pack(bytes.fromhex(digest.decode("ascii")), int(count or 0))
+        except ValueError:
+            continue
+
+
+def _read_run(path: str) -> Iterator[bytes]:
+    size = _RUN_RECORD.size
+    with open(path, "rb", buffering=RUN_BUFFER_SIZE) as f:
+        while True:
+            record = f.read(size)
+            if len(record) < size:
+                return
+            yield record
+
+
+def _write_run(records: Iterator[bytes], path: str):
+    with open(path, "wb") as run:
+        while True:
+            block = b"".join(islice(records, RUN_BUFFER_SIZE // _RUN_RECORD.size))
+            if not block:
+                return
+            run.write(block)
+
+
+def _merge_runs(runs: List[str], temp_dir: str) -> List[str]:
+    """Сливает временные файлы проходами по MERGE_FAN_IN, пока их не станет не больше MERGE_FAN_IN"""
+    generation = 0
+    while len(runs) > MERGE_FAN_IN:
+        merged_runs = []
+        for start in range(0, len(runs), MERGE_FAN_IN):
+            group = runs[start:start + MERGE_FAN_IN]
+            if len(group) == 1:
+                merged_runs.append(group[0])
+                continue
+            run_path = os.path.join(temp_dir, f"merge{generation}_{len(merged_runs)}.bin")
+            _write_run(heapq.merge(*(_read_run(path) for path in group)), run_path)
+            merged_runs.append(run_path)
+            for path in group:
+                os.remove(path)
+        runs = merged_runs
+        generation += 1
+    return runs
+
+
+def import_dump(source_path: str, target_path: str, chunk_records: int = 1_000_000,
+                progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Строит файл BreachDatabase из текстового дампа Pwned Passwords (SHA-1)
+
+    Дамп читается потоком. Если он не отсортирован по хэшу, записи
+    сортируются внешней сортировкой: порции по chunk_records записей
+    сортируются в памяти, а временные файлы сливаются проходами не больше
+    чем по MERGE_FAN_IN с буфером RUN_BUFFER_SIZE на файл, поэтому ни
+    память, ни число открытых файлов не зависят от размера дампа. progress(прочитано байт, всего байт)
+    вызывается после каждой порции. Возвращает число записей.
+    """
+    total_bytes = os.path.getsize(source_path)
+    temp_dir = tempfile.mkdtemp(prefix="breach_import_", dir=os.path.dirname(os.path.abspath(target_path)))
+    runs: List[str] = []
+    presorted = True
+    last = b""
+    try:
+        with open(source_path, "rb", buffering=1024 * 1024) as source:
+            records = _parse_lines(source)
+            while True:
+                chunk = [record for _, record in zip(range(chunk_records), records)]
+                if not chunk:
+                    break
+                if presorted and (chunk[0] < last or any(a > b for a, b in zip(chunk, chunk[1:]))):
+                    presorted = False
+                chunk.sort()
+                last = chunk[-1]
+                run_path = os.path.join(temp_dir, f"run{len(runs)}.bin")
+                _write_run(iter(chunk), run_path)
+                runs.append(run_path)
+                del chunk
+                if progress:
+                    progress(source.tell(), total_bytes)
+
+        if presorted:
+            # Файлы читаются по очереди: открыт всегда только один
+            merged = chain.from_iterable(_read_run(path) for path in runs)
+        else:
+            runs = _merge_runs(runs, temp_dir)
+            merged = heapq.merge(*(_read_run(path) for path in runs))
+        return _write_database(merged, target_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _write_database(records: Iterator[bytes], target_path: str) -> int:
+    """Записывает отсортированные записи в формате BreachDatabase"""
+    buckets = BreachDatabase.BUCKETS
+    counts = [0] * buckets
+    table_size = (buckets + 1) * BreachDatabase.OFFSET.size
+    tmp_path = target_path + ".tmp"
+    total = 0
+    with open(tmp_path, "wb") as out:
+        out.write(BreachDatabase.HEADER.pack(BreachDatabase.MAGIC, BreachDatabase.VERSION,
+                                             BreachDatabase.PREFIX_BITS, 0))
+        out.write(b"\0" * table_size)
+
+        buffer = bytearray()
+        previous = None
+        pending_count = 0
+        for record in chain(records, [None]):
+            digest = record[:20] if record is not None else None
+            if previous is not None and digest != previous:
+                # Одинаковые хэши из разных частей дампа объединяются
+                buffer += BreachDatabase.RECORD.pack(previous[2:], min(pending_count, 0xFFFFFFFF))
+                counts[(previous[0] << 8) | previous[1]] += 1
+                total += 1
+                pending_count = 0
+                if len(buffer) >= 1024 * 1024:
+                    out.write(buffer)
+                    buffer.clear()
+            if record is None:
+                break
+            previous = digest
+            pending_count += _RUN_RECORD.unpack(record)[1]
+        out.write(buffer)
+
+        # Таблица префиксов: индекс первой записи каждого префикса
+        offsets = []
+        position = 0
+        for count in counts:
+            offsets.append(position)
+            position += count
+        offsets.append(position)
+        out.seek(0)
+        out.write(BreachDatabase.HEADER.pack(BreachDatabase.MAGIC, BreachDatabase.VERSION,
+                                             BreachDatabase.PREFIX_BITS, total))
+        out.write(struct.pack(f"<{buckets + 1}Q", *offsets))
+    os.replace(tmp_path, target_path)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт дампа Pwned Passwords (SHA-1) в локальную базу утечек")
+    parser.add_argument("source", help="текстовый дамп со строками SHA1:COUNT")
+    parser.add_argument("target", help="путь к создаваемому файлу базы")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="записей в порции сортировки")
+    args = parser.parse_args(argv)
+
+    def report(done, total):
+        print(f"\rПрочитано {done * 100 // max(total, 1)}%", end="", file=sys.stderr)
+
+    total = import_dump(args.source, args.target, args.chunk, report)
+    print(f"\nЗаписей в базе: {total}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,256 @@
 import os
+import json
 import time
 import shutil
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Optional, List
 from datetime import datetime, timedelta
+from utils.hash_utils import md5_hash
+from utils.favicon_atlas import FaviconAtlas
+
+
+class FaviconIndex:
+    """Индекс кэша фавиконок
+
+    Для каждого файла хранит размер, время последнего обращения, время
+    загрузки, ETag и Last-Modified. Отдельно хранится отрицательный кэш:
+    домены без иконки и время, до которого их не стоит запрашивать. Обе
+    части ключуются именем файла (хэш домена): сами домены - это список
+    сайтов хранилища, и открытым текстом на диск они не попадают.
+    Индекс читается с диска один раз, поэтому проверка наличия
+    иконки - поиск в словаре, а не обращение к файловой системе. Записи
+    упорядочены от давно не использованных к недавним, так что очистка
+    удаляет первые k записей без сканирования и сортировки директории.
+    Потокобезопасен: индекс используют и интерфейс, и потоки загрузки.
+    """
+    FILENAME = "index.json"
+    VERSION = 1
+    NEGATIVE_RETENTION = 30 * 86400
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_directory(cls, directory: str) -> "FaviconIndex":
+        """Общий индекс директории (один на процесс)"""
+        directory = os.path.abspath(directory)
+        with cls._instances_lock:
+            if directory not in cls._instances:
+                cls._instances[directory] = cls(directory)
+            return cls._instances[directory]
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILENAME)
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # имя файла -> {"size", "atime", "fetched_at", "etag", ...}
+        self._negative = {}  # имя файла -> {"failures": число неудач подряд, "retry_at": время}
+        self._total_bytes = 0
+        self._dirty = False
+        self._touched = False  # были обращения, не записанные на диск
+        self._load()
+
+    @staticmethod
+    def file_name(domain: str) -> str:
+        return f"{md5_hash(domain)}.png"
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                raise ValueError("неизвестная версия индекса")
+            entries = sorted(data["entries"].items(), key=lambda item: item[1].get("atime", 0))
+            self._entries = OrderedDict(entries)
+            self._negative = dict(data.get("negative", {}))
+        except FileNotFoundError:
+            self._rebuild()
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"Индекс кэша фавиконок поврежден, строим заново: {e}")
+            self._rebuild()
+        self._total_bytes = sum(entry.get("size", 0) for entry in self._entries.values())
+
+    def _rebuild(self):
+        """Строит индекс по файлам директории (только при первом запуске)"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.is_file() and item.name.endswith(".png"):
+                        stat = item.stat()
+                        entries.append((item.name, {
+                            "size": stat.st_size, "atime": stat.st_mtime,
+                            "fetched_at": stat.st_mtime, "etag": None
+                        }))
+        except OSError as e:
+            print(f"Ошибка при чтении кэша фавиконок: {e}")
+        entries.sort(key=lambda item: item[1]["atime"])
+        self._entries = OrderedDict(entries)
+        self._dirty = True
+
+    def get(self, domain: str) -> Optional[dict]:
+        """Запись домена с отметкой обращения или None
+
+        Отметка меняет только порядок в памяти и не делает индекс
+        измененным: иначе каждое попадание в кэш переписывало бы весь файл.
+        Время обращения попадет на диск со следующим добавлением, удалением
+        или истечением записи либо при save(touched=True) на выходе.
+        """
+        name = self.file_name(domain)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            entry["atime"] = time.time()
+            self._entries.move_to_end(name)
+            self._touched = True
+            return dict(entry)
+
+    def __contains__(self, domain: str) -> bool:
+        with self._lock:
+            return self.file_name(domain) in self._entries
+
+    def names(self) -> set:
+        """Имена файлов всех иконок индекса"""
+        with self._lock:
+            return set(self._entries)
+
+    def peek(self, domain: str) -> Optional[dict]:
+        """Запись домена без отметки обращения или None"""
+        with self._lock:
+            entry = self._entries.get(self.file_name(domain))
+            return dict(entry) if entry is not None else None
+
+    def path_for(self, domain: str) -> Optional[str]:
+        """Путь к иконке домена, если она есть в кэше"""
+        if self.get(domain) is None:
+            return None
+        return os.path.join(self.directory, self.file_name(domain))
+
+    def record(self, domain: str, size: int, etag: Optional[str] = None,
+               last_modified: Optional[str] = None):
+        """Отмечает записанный на диск файл иконки"""
+        name = self.file_name(domain)
+        now = time.time()
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._total_bytes -= old.get("size", 0)
+            self._entries[name] = {
+                "size": size, "atime": now, "fetched_at": now,
+                "etag": etag, "last_modified": last_modified
+            }
+            self._total_bytes += size
+            self._negative.pop(name, None)
+            self._dirty = True
+
+    def mark_fetched(self, domain: str):
+        """Отмечает, что иконка подтверждена сервером (ответ 304)"""
+        with self._lock:
+            name = self.file_name(domain)
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry["fetched_at"] = time.time()
+                self._negative.pop(name, None)
+                self._dirty = True
+
+    def retry_at(self, domain: str) -> float:
+        """Время, раньше которого домен не стоит запрашивать (0 - можно сейчас)"""
+        with self._lock:
+            failure = self._negative.get(self.file_name(domain))
+            return failure["retry_at"] if failure else 0
+
+    def record_failure(self, domain: str, base_delay: float, max_delay: float) -> float:
+        """Отмечает неудачную загрузку; пауза растет вдвое с каждой неудачей"""
+        name = self.file_name(domain)
+        with self._lock:
+            failures = self._negative.get(name, {}).get("failures", 0) + 1
+            retry_at = time.time() + min(base_delay * 2 ** (failures - 1), max_delay)
+            self._negative[name] = {"failures": failures, "retry_at": retry_at}
+            self._dirty = True
+            return retry_at
+
+    def remove(self, domain: str):
+        """Убирает домен из индекса и удаляет файл"""
+        self._remove_names([self.file_name(domain)])
+
+    def _remove_names(self, names: List[str]):
+        with self._lock:
+            for name in names:
+                entry = self._entries.pop(name, None)
+                if entry is not None:
+                    self._total_bytes -= entry.get("size", 0)
+                    self._dirty = True
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except PermissionError as e:
+                print(f"Ошибка при удалении {name}: {e}")
+
+    def evict(self, max_bytes: float, max_count: int) -> int:
+        """Удаляет давно не использованные иконки сверх лимитов
+
+        Возвращает число удаленных файлов.
+        """
+        with self._lock:
+            names = []
+            total = self._total_bytes
+            count = len(self._entries)
+            for name, entry in self._entries.items():
+                if total <= max_bytes and count <= max_count:
+                    break
+                names.append(name)
+                total -= entry.get("size", 0)
+                count -= 1
+        if names:
+            self._remove_names(names)
+        return len(names)
+
+    def save(self, touched: bool = False):
+        """Сохраняет индекс, если он менялся
+
+        touched=True сохраняет и одни только отметки обращений (при выходе).
+        """
+        with self._lock:
+            if not (self._dirty or touched and self._touched):
+                return
+            now = time.time()
+            # Давние неудачи забываются, чтобы отрицательный кэш не рос бесконечно
+            negative = {name: failure for name, failure in self._negative.items()
+                        if now - failure["retry_at"] < self.NEGATIVE_RETENTION}
+            data = {"version": self.VERSION, "entries": dict(self._entries), "negative": negative}
+            snapshot = json.dumps(data, ensure_ascii=False)
+            self._dirty = False
+            self._touched = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            with self._lock:
+                self._dirty = True
+            print(f"Ошибка при сохранении индекса кэша фавиконок: {e}")
+
+    def clear(self):
+        """Забывает все записи (файлы удаляет вызывающий)"""
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+            self._total_bytes = 0
+            self._dirty = True
+
+    @property
+    def count(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
 
 class CacheManager:
     # Значения по умолчанию для настроек кэша
@@ -19,11 +267,18 @@ class CacheManager:
         self.favicons_dir = os.path.join(self.base_cache_dir, "favicons")
         self.temp_dir = os.path.join(self.base_cache_dir, "temp")
         self.updates_dir = os.path.join(self.base_cache_dir, "updates")
+        self.hibp_dir = os.path.join(self.base_cache_dir, "hibp")
         
         # Создаем директории если они не существуют
-        for directory in [self.base_cache_dir, self.favicons_dir, self.temp_dir, self.updates_dir]:
+        for directory in [self.base_cache_dir, self.favicons_dir, self.temp_dir, self.updates_dir, self.hibp_dir]:
             os.makedirs(directory, exist_ok=True)
 
+        self.favicon_index = FaviconIndex.for_directory(self.favicons_dir)
+
+    def hibp_cache_path(self, login: str) -> str:
+        """Путь к зашифрованному кэшу диапазонов HIBP пользователя"""
+        return os.path.join(self.hibp_dir, f"{md5_hash(login)}.db")
+
     def get_setting(self, key: str) -> any:
         """Получает настройку кэша с поддержкой значений по умолчанию"""
         try:
@@ -79,24 +334,14 @@ class CacheManager:
                 break
 
     def cleanup_favicons(self) -> None:
-        """Очищает кэш фавиконок"""
+        """Очищает кэш фавиконок по индексу, без сканирования директории"""
         max_size = self.get_setting("max_favicon_size_mb")
         max_count = self.get_setting("max_favicons")
-        
-        # Удаляем по размеру
-        self.cleanup_by_size(self.favicons_dir, max_size)
-        
-        # Удаляем по количеству
+
         try:
-            files = sorted(os.listdir(self.favicons_dir), 
-                          key=lambda x: os.path.getmtime(os.path.join(self.favicons_dir, x)))
-            if len(files) > max_count:
-                for f in files[:-max_count]:  # Оставляем только max_count самых новых файлов
-                    try:
-                        os.remove(os.path.join(self.favicons_dir, f))
-                    except (PermissionError, FileNotFoundError):
-                        continue
-        except (OSError, FileNotFoundError) as e:
+            self.favicon_index.evict(max_size * 1024 * 1024, max_count)
+            self.favicon_index.save()
+        except Exception as e:
             print(f"Ошибка при очистке фавиконок: {e}")
 
     def cleanup_temp(self) -> None:
@@ -116,10 +361,18 @@ class CacheManager:
             print(f"Ошибка при очистке кэша: {e}")
 
     def clear_all_cache(self) -> None:
-        """Полностью очищает все кэши"""
+        """Полностью очищает все кэши на диске
+
+        Файл атласа фавиконок не удаляется: он отображен в память, и удалить
+        его можно только закрытым. Атлас вместе с иконками в памяти очищает
+        FaviconService.clear_cache(), которому этот метод передается как
+        clear_files.
+        """
         for directory in [self.favicons_dir, self.temp_dir, self.updates_dir]:
             try:
                 for filename in os.listdir(directory):
+                    if directory == self.favicons_dir and filename == FaviconAtlas.FILENAME:
+                        continue
                     filepath = os.path.join(directory, filename)
                     try:
                         if os.path.isfile(filepath):
@@ -128,15 +381,16 @@ class CacheManager:
                         print(f"Ошибка при удалении {filepath}: {e}")
             except (OSError, FileNotFoundError) as e:
                 print(f"Ошибка при очистке директории {directory}: {e}")
+        self.favicon_index.clear()
 
     def get_cache_stats(self) -> dict:
         """Возвращает статистику использования кэша"""
         try:
             return {
-                "favicons_size_mb": self.get_directory_size(self.favicons_dir),
+                "favicons_size_mb": self.favicon_index.total_bytes / (1024 * 1024),
                 "temp_size_mb": self.get_directory_size(self.temp_dir),
                 "updates_size_mb": self.get_directory_size(self.updates_dir),
-                "favicons_count": len(os.listdir(self.favicons_dir)),
+                "favicons_count": self.favicon_index.count,
                 "temp_count": len(os.listdir(self.temp_dir)),
                 "updates_count": len(os.listdir(self.updates_dir))
             }
@@ -0,0 +1,216 @@
+import os
+import mmap
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class FaviconAtlas:
+    """Атлас фавиконок: все иконки кэша в одном файле
+
+    Формат файла:
+        заголовок   MAGIC (4 байта), версия (uint16)
+        данные      PNG-файлы иконок подряд
+        таблица     для каждой иконки: длина имени (uint16), имя файла
+                    иконки в UTF-8, смещение (uint64), длина (uint32)
+        окончание   смещение таблицы (uint64), число записей (uint32), MAGIC
+
+    Файл отображается в память (mmap) при открытии, и иконка читается
+    срезом по смещению из таблицы без открытия отдельного файла. Новые
+    иконки дописываются на место старой таблицы, после чего таблица
+    пишется заново, поэтому обновление стоит O(новые данные + таблица).
+    Замененные и удаленные иконки остаются в файле, пока их доля не
+    превысит половину, после чего атлас переписывается целиком.
+
+    Иконки ключуются тем же именем файла, что и PNG в кэше
+    (FaviconIndex.file_name - хэш домена), поэтому список сайтов
+    хранилища не лежит в атласе открытым текстом.
+    """
+    MAGIC = b"EEFA"
+    VERSION = 2
+    HEADER = struct.Struct("<4sH")
+    FOOTER = struct.Struct("<QI4s")
+    ENTRY = struct.Struct("<QI")
+    FILENAME = "atlas.bin"
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, self.FILENAME)
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._table: Dict[str, Tuple[int, int]] = {}  # имя файла -> (смещение, длина)
+        self._table_offset = self.HEADER.size
+        self._dead_bytes = 0
+        self._pending: Dict[str, Optional[bytes]] = {}  # None - удалить
+        self._open()
+
+    def _open(self):
+        """Отображает файл в память и читает таблицу"""
+        self._close_map()
+        self._table = {}
+        self._table_offset = self.HEADER.size
+        self._dead_bytes = 0
+        if not os.path.exists(self.path):
+            return
+        try:
+            self._file = open(self.path, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+            if size < self.HEADER.size + self.FOOTER.size:
+                raise ValueError("файл атласа слишком мал")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version = self.HEADER.unpack_from(self._map, 0)
+            table_offset, count, end_magic = self.FOOTER.unpack_from(self._map, size - self.FOOTER.size)
+            if magic != self.MAGIC or end_magic != self.MAGIC or version != self.VERSION:
+                raise ValueError("неверный формат атласа")
+
+            position = table_offset
+            live_bytes = 0
+            for _ in range(count):
+                (name_length,) = struct.unpack_from("<H", self._map, position)
+                position += 2
+                name = bytes(self._map[position:position + name_length]).decode("utf-8")
+                position += name_length
+                offset, length = self.ENTRY.unpack_from(self._map, position)
+                position += self.ENTRY.size
+                self._table[name] = (offset, length)
+                live_bytes += length
+            self._table_offset = table_offset
+            self._dead_bytes = table_offset - self.HEADER.size - live_bytes
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"Атлас фавиконок не прочитан, будет создан заново: {e}")
+            self._close_map()
+            self._table = {}
+            self._table_offset = self.HEADER.size
+            # Нечитаемый атлас удаляется: в том числе атлас версии 1, где
+            # иконки ключевались доменами открытым текстом
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get(self, name: str) -> Optional[bytes]:
+        """PNG-данные иконки по имени файла или None"""
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name]
+            location = self._table.get(name)
+            if location is None or self._map is None:
+                return None
+            offset, length = location
+            return self._map[offset:offset + length]
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name] is not None
+            return name in self._table
+
+    def names(self) -> list:
+        """Имена файлов иконок, которые есть в атласе"""
+        with self._lock:
+            names = set(self._table)
+            for name, data in self._pending.items():
+                if data is None:
+                    names.discard(name)
+                else:
+                    names.add(name)
+            return list(names)
+
+    def add(self, name: str, data: bytes):
+        """Добавляет или заменяет иконку (запишется при flush)"""
+        if data:
+            with self._lock:
+                self._pending[name] = bytes(data)
+
+    def discard(self, name: str):
+        """Удаляет иконку из атласа (запишется при flush)"""
+        with self._lock:
+            if name in self._table or name in self._pending:
+                self._pending[name] = None
+
+    def flush(self):
+        """Записывает накопленные изменения в файл"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                table = dict(self._table)
+                for name in pending:
+                    if name in table:
+                        self._dead_bytes += table[name][1]
+                live_bytes = self._table_offset - self.HEADER.size - self._dead_bytes
+                if self._dead_bytes > max(live_bytes, 0):
+                    self._rewrite(table, pending)
+                else:
+                    self._append(table, pending)
+            except OSError as e:
+                print(f"Ошибка при записи атласа фавиконок: {e}")
+            self._open()
+
+    def _append(self, table: Dict[str, Tuple[int, int]], pending: Dict[str, Optional[bytes]]):
+        """Дописывает новые иконки на место таблицы и пишет таблицу заново"""
+        # Нечитаемый или отсутствующий файл создается заново
+        valid = self._map is not None
+        self._close_map()
+        with open(self.path, "r+b" if valid else "w+b") as f:
+            if not valid:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            offset = self._table_offset
+            f.seek(offset)
+            for name, data in pending.items():
+                if data is None:
+                    table.pop(name, None)
+                    continue
+                f.write(data)
+                table[name] = (offset, len(data))
+                offset += len(data)
+            self._write_table(f, table, offset)
+            f.truncate()
+
+    def _rewrite(self, table: Dict[str, Tuple[int, int]], pending: Dict[str, Optional[bytes]]):
+        """Переписывает атлас без замененных и удаленных иконок"""
+        blobs = {name: self._map[offset:offset + length]
+                 for name, (offset, length) in table.items()
+                 if name not in pending and self._map is not None}
+        blobs.update({name: data for name, data in pending.items() if data is not None})
+        self._close_map()
+
+        tmp_path = self.path + ".tmp"
+        new_table = {}
+        with open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            offset = self.HEADER.size
+            for name, data in blobs.items():
+                f.write(data)
+                new_table[name] = (offset, len(data))
+                offset += len(data)
+            self._write_table(f, new_table, offset)
+        os.replace(tmp_path, self.path)
+
+    def _write_table(self, f, table: Dict[str, Tuple[int, int]], table_offset: int):
+        parts = []
+        for name, (offset, length) in table.items():
+            encoded = name.encode("utf-8")
+            parts.append(struct.pack("<H", len(encoded)) + encoded + self.ENTRY.pack(offset, length))
+        f.write(b"".join(parts))
+        f.write(self.FOOTER.pack(table_offset, len(table), self.MAGIC))
+
+    def close(self):
+        """Записывает изменения и освобождает отображение файла"""
+        self.flush()
+        with self._lock:
+            self._close_map()
+
+    @property
+    def count(self) -> int:
+        return len(self._table)
@@ -0,0 +1,394 @@
+import os
+import time
+import heapq
+import weakref
+import threading
+from typing import Callable, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from utils.url_utils import extract_domain
+from utils.cache_manager import FaviconIndex
+from utils.favicon_atlas import FaviconAtlas
+from utils.pixmap_cache import PixmapCache
+
+
+class _FaviconWorker(QRunnable):
+    """Поток пула: забирает домены из очереди сервиса, пока она не опустеет"""
+
+    def __init__(self, service: "FaviconService"):
+        super().__init__()
+        self.service = service
+
+    def run(self):
+        while True:
+            domain = self.service._next_domain()
+            if domain is None:
+                break
+            path, changed = self.service._fetch(domain)
+            self.service._fetched.emit(domain, path, changed)
+        self.service._after_batch()
+
+
+class FaviconService(QObject):
+    """Загрузка фавиконок общим пулом потоков
+
+    Один сервис на процесс (instance()). Загрузку выполняют не более
+    MAX_WORKERS потоков через одну requests.Session, так что соединения
+    переиспользуются. Повторный запрос домена, который уже в очереди или
+    загружается, не создает новой загрузки: результат получат все
+    ожидающие. Видимые иконки идут в очереди раньше остальных.
+    Результаты доставляются в поток интерфейса.
+
+    Иконка в кэше считается свежей TTL секунд. Устаревшая показывается
+    сразу, а в фоне перепроверяется условным запросом (If-None-Match,
+    If-Modified-Since). Домены, для которых сервер не отдал иконку,
+    попадают в сохраняемый отрицательный кэш с паузой, которая растет
+    вдвое с каждой неудачей.
+    """
+    icon_ready = pyqtSignal(str, str)  # домен, путь к файлу ("" - иконки нет)
+    _fetched = pyqtSignal(str, str, bool)  # домен, путь, файл изменился
+
+    MAX_WORKERS = 4
+    ICON_SIZE = 40
+    TIMEOUT = 3
+    ENDPOINT = "https://www.google.com/s2/favicons?domain={domain}&sz={size}"
+    TTL = 7 * 86400
+    # Пауза перед повторным запросом домена без иконки: 1 час, 2, 4... до недели
+    NEGATIVE_DELAY = 3600
+    NEGATIVE_MAX_DELAY = 7 * 86400
+
+    # Приоритеты очереди
+    BACKGROUND = 0
+    VISIBLE = 1
+
+    _instance = None
+
+    @classmethod
+    def instance(cls) -> "FaviconService":
+        """Общий сервис процесса (создается в потоке интерфейса)"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, cache_dir: Optional[str] = None, endpoint: Optional[str] = None,
+                 ttl: Optional[float] = None, parent=None):
+        super().__init__(parent)
+        self.endpoint = endpoint or self.ENDPOINT
+        self.ttl = self.TTL if ttl is None else ttl
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "app_cache", "favicons"
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = FaviconIndex.for_directory(self.cache_dir)
+        self.atlas = None  # FaviconAtlas, если включен enable_atlas()
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.MAX_WORKERS, pool_maxsize=self.MAX_WORKERS)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.MAX_WORKERS)
+        self._lock = threading.Lock()
+        self._heap = []  # (-приоритет, порядковый номер, домен)
+        self._queued = {}  # домен -> приоритет в очереди
+        self._loading = set()  # домены, которые загружаются сейчас
+        self._seq = 0
+        self._running = 0
+        self._closed = False
+        self._downloads = 0  # новых файлов с последней очистки кэша
+        self._cleanup = None
+        self._cleaning = False
+
+        self._waiters = {}  # домен -> ожидающие обработчики
+        self._results = {}  # домен -> путь, загруженные в этой сессии
+        self._fetched.connect(self._on_fetched)
+
+    def set_cleanup(self, cleanup: Optional[Callable[[], None]]):
+        """Задает очистку кэша, которая выполняется в потоке пула
+
+        Вызывается, когда очередь опустела и с прошлой очистки на диск
+        были записаны новые иконки.
+        """
+        self._cleanup = cleanup
+
+    def configure(self, endpoint: Optional[str] = None, ttl: Optional[float] = None):
+        """Меняет адрес сервиса иконок ({domain}, {size}) и срок свежести"""
+        if endpoint:
+            self.endpoint = endpoint
+        if ttl is not None:
+            self.ttl = ttl
+
+    def enable_atlas(self, enabled: bool = True):
+        """Включает чтение иконок из общего файла-атласа вместо PNG-файлов"""
+        if enabled and self.atlas is None:
+            self.atlas = FaviconAtlas(self.cache_dir)
+        elif not enabled and self.atlas is not None:
+            self.atlas.close()
+            self.atlas = None
+
+    def clear_cache(self, clear_files: Callable[[], None]):
+        """Очищает кэш иконок на диске и в памяти (в потоке интерфейса)
+
+        clear_files удаляет остальные файлы (CacheManager.clear_all_cache).
+        Атлас отображен в память, поэтому сначала закрывается, его файл
+        удаляется здесь, а после очистки атлас открывается заново пустым.
+        Пути, известные с этой сессии, и готовые QPixmap сбрасываются, чтобы
+        старые иконки не пережили очистку.
+        """
+        atlas_enabled = self.atlas is not None
+        self.enable_atlas(False)
+        try:
+            atlas_path = os.path.join(self.cache_dir, FaviconAtlas.FILENAME)
+            if os.path.exists(atlas_path):
+                os.remove(atlas_path)
+            clear_files()
+        finally:
+            self._results.clear()
+            PixmapCache.instance().clear()
+            self.enable_atlas(atlas_enabled)
+
+    def pixmap(self, domain: str, path: str, size: int, dpr: float = 1.0):
+        """Готовая иконка из PixmapCache, атласа или файла; None, если не читается
+
+        Вызывается только из потока интерфейса. Иконка, прочитанная из
+        файла, добавляется в атлас, чтобы при следующем запуске отрисоваться
+        без открытия файла.
+        """
+        cache = PixmapCache.instance()
+        pixmap = cache.get(domain, size, dpr)
+        if pixmap is not None or self.atlas is None:
+            return pixmap if pixmap is not None else cache.load(domain, path, size, dpr)
+
+        name = FaviconIndex.file_name(domain)
+        data = self.atlas.get(name)
+        if data is None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+            self.atlas.add(name, data)
+        return cache.load(domain, path, size, dpr, data=data)
+
+    def cache_path(self, domain: str) -> str:
+        """Путь к файлу иконки домена в кэше"""
+        return os.path.join(self.cache_dir, FaviconIndex.file_name(domain))
+
+    def cached_path(self, url: str, callback: Optional[Callable[[str, str], None]] = None) -> Optional[str]:
+        """Путь к иконке из индекса кэша без обращения к диску или None
+
+        Устаревшая иконка тоже возвращается, но ставится в очередь на
+        перепроверку; после нее callback получит путь, как в request().
+        """
+        domain = extract_domain(url) if url else ""
+        path = self.index.path_for(domain) if domain else None
+        if path and domain not in self._results and self._is_stale(domain):
+            self._add_waiter(domain, callback)
+            self._enqueue(domain, self.BACKGROUND)
+        return path
+
+    def _is_stale(self, domain: str) -> bool:
+        """Иконку пора перепроверить (и домен не на паузе после неудачи)"""
+        entry = self.index.peek(domain)
+        if entry is None:
+            return False
+        now = time.time()
+        return now - entry.get("fetched_at", entry.get("atime", 0)) > self.ttl and self.index.retry_at(domain) <= now
+
+    def forget(self, domain: str):
+        """Забывает иконку домена (файл оказался поврежден или удален)"""
+        self._results.pop(domain, None)
+        self.index.remove(domain)
+        if self.atlas is not None:
+            self.atlas.discard(FaviconIndex.file_name(domain))
+
+    def request(self, url: str, callback: Optional[Callable[[str, str], None]] = None,
+                visible: bool = False) -> Optional[str]:
+        """Запрашивает иконку для url
+
+        Если результат уже известен, возвращает путь ("" - иконки нет) и
+        callback не вызывается. Иначе возвращает None, а callback(домен,
+        путь) будет вызван в потоке интерфейса после загрузки. Методы
+        объектов хранятся по слабой ссылке, поэтому удаленный виджет не
+        удерживается очередью.
+        """
+        domain = extract_domain(url) if url else ""
+        if not domain:
+            return ""
+        if domain in self._results:
+            return self._results[domain]
+        if domain not in self.index and self.index.retry_at(domain) > time.time():
+            # Недавно выяснилось, что иконки нет: сеть не трогаем
+            return ""
+
+        self._add_waiter(domain, callback)
+        self._enqueue(domain, self.VISIBLE if visible else self.BACKGROUND)
+        return None
+
+    def _add_waiter(self, domain: str, callback: Optional[Callable[[str, str], None]]):
+        if callback is None:
+            return
+        try:
+            ref = weakref.WeakMethod(callback)
+        except TypeError:
+            ref = lambda callback=callback: callback
+        self._waiters.setdefault(domain, []).append(ref)
+
+    def prioritize(self, url: str):
+        """Поднимает в очереди иконку, которая стала видимой"""
+        domain = extract_domain(url) if url else ""
+        if domain:
+            with self._lock:
+                if self._queued.get(domain) == self.BACKGROUND:
+                    self._push(domain, self.VISIBLE)
+
+    def _push(self, domain: str, priority: int):
+        # Вызывается под self._lock; старая запись домена в куче
+        # пропускается при извлечении, так как приоритет не совпадет
+        self._queued[domain] = priority
+        self._seq += 1
+        heapq.heappush(self._heap, (-priority, self._seq, domain))
+
+    def _enqueue(self, domain: str, priority: int):
+        with self._lock:
+            if self._closed:
+                return
+            if domain in self._queued:
+                if priority > self._queued[domain]:
+                    self._push(domain, priority)
+                return
+            if domain in self._loading:
+                return
+            self._push(domain, priority)
+            if self._running < self.MAX_WORKERS:
+                self._running += 1
+                self._pool.start(_FaviconWorker(self))
+
+    def _next_domain(self) -> Optional[str]:
+        """Следующий домен для загрузки (вызывается из потоков пула)"""
+        with self._lock:
+            while self._heap and not self._closed:
+                priority, _, domain = heapq.heappop(self._heap)
+                if self._queued.get(domain) == -priority:
+                    del self._queued[domain]
+                    self._loading.add(domain)
+                    return domain
+            self._running -= 1
+            return None
+
+    def _fetch(self, domain: str) -> Tuple[str, bool]:
+        """Загружает или перепроверяет иконку домена
+
+        Возвращает путь ("" - иконки нет) и признак того, что файл на диске
+        изменился.
+        """
+        cache_path = self.cache_path(domain)
+        entry = self.index.peek(domain)
+        known_path = cache_path if entry is not None else ""
+        now = time.time()
+        if entry is not None and now - entry.get("fetched_at", entry.get("atime", 0)) <= self.ttl:
+            return cache_path, False
+        if self.index.retry_at(domain) > now:
+            return known_path, False
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self._session.get(
+                self.endpoint.format(domain=domain, size=self.ICON_SIZE),
+                headers=headers,
+                timeout=self.TIMEOUT
+            )
+            if response.status_code == 304 and entry is not None:
+                self.index.mark_fetched(domain)
+                return cache_path, False
+
+            if response.status_code == 200 and response.content:
+                with open(cache_path, 'wb') as f:
+                    f.write(response.content)
+                self.index.record(domain, len(response.content), response.headers.get("ETag"),
+                                  response.headers.get("Last-Modified"))
+                if self.atlas is not None:
+                    self.atlas.add(FaviconIndex.file_name(domain), response.content)
+                with self._lock:
+                    self._downloads += 1
+                return cache_path, True
+
+            # Сервер ответил, но иконки нет: запоминаем между запусками
+            self.index.record_failure(domain, self.NEGATIVE_DELAY, self.NEGATIVE_MAX_DELAY)
+        except Exception as e:
+            # Сетевые ошибки не сохраняются: домен повторится при следующем запуске
+            print(f"Error loading favicon: {str(e)}")
+        return known_path, False
+
+    def _after_batch(self):
+        """Обслуживание кэша, когда очередь опустела (в потоке пула)"""
+        self._run_cleanup()
+        self._flush_atlas()
+        self.index.save()
+
+    def _flush_atlas(self):
+        """Записывает новые иконки в атлас и убирает вытесненные из индекса"""
+        atlas = self.atlas
+        if atlas is None:
+            return
+        live = self.index.names()
+        for name in atlas.names():
+            if name not in live:
+                atlas.discard(name)
+        atlas.flush()
+
+    def _run_cleanup(self):
+        """Очищает кэш после серии загрузок (вызывается из потоков пула)"""
+        with self._lock:
+            if not self._downloads or self._cleanup is None or self._cleaning or self._closed:
+                return
+            self._downloads = 0
+            self._cleaning = True
+        try:
+            self._cleanup()
+        except Exception as e:
+            print(f"Ошибка при очистке кэша фавиконок: {str(e)}")
+        finally:
+            with self._lock:
+                self._cleaning = False
+
+    def _on_fetched(self, domain: str, path: str, changed: bool):
+        """Раздает результат всем ожидающим (в потоке интерфейса)"""
+        with self._lock:
+            self._loading.discard(domain)
+        if changed:
+            # Старые масштабированные варианты иконки больше не годятся
+            PixmapCache.instance().discard(domain)
+        self._results[domain] = path
+        for ref in self._waiters.pop(domain, []):
+            callback = ref()
+            if callback is None:
+                continue
+            try:
+                callback(domain, path)
+            except RuntimeError:
+                # Виджет уже удален Qt
+                continue
+        self.icon_ready.emit(domain, path)
+
+    def shutdown(self):
+        """Отменяет очередь и дожидается завершения загрузок"""
+        with self._lock:
+            self._closed = True
+            self._heap.clear()
+            self._queued.clear()
+        self._waiters.clear()
+        self._pool.waitForDone()
+        self._session.close()
+        self.index.save(touched=True)
+        if self.atlas is not None:
+            self._flush_atlas()
+            self.atlas.close()
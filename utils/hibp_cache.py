@@ -0,0 +1,134 @@
+import hmac
+import zlib
+import time
+import sqlite3
+import hashlib
+import secrets
+import struct
+import threading
+from typing import List, Optional, Tuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+
+
+class HIBPRangeCache:
+    """Зашифрованный кэш ответов HIBP /range/{prefix}
+
+    Ответ на префикс SHA-1 из 5 символов хранится как отсортированный
+    массив записей фиксированной длины (хвост хэша и число утечек), сжатый
+    и зашифрованный AES-GCM с префиксом в качестве AAD. Строки таблицы
+    ищутся по HMAC префикса, поэтому по файлу нельзя узнать, какие
+    префиксы проверялись. Проверка пароля с уже загруженным префиксом -
+    расшифровка и двоичный поиск без обращения к сети.
+
+    Ключ выдает сессия хранилища (CryptoManagerV2.derive_subkey), поэтому
+    кэш читается только после разблокировки.
+    """
+    TTL = 7 * 86400
+    MAX_RANGES = 1000
+    # Хвост хэша - 35 hex-символов; с ведущим нулем это 18 байт
+    RECORD = struct.Struct(">18sI")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ranges (
+            tag BLOB PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ranges_fetched ON ranges(fetched_at);
+    """
+
+    def __init__(self, path: str, key: bytes, ttl: Optional[float] = None,
+                 max_ranges: Optional[int] = None):
+        self.path = path
+        self.ttl = self.TTL if ttl is None else ttl
+        self.max_ranges = max_ranges or self.MAX_RANGES
+        self._tag_key = hmac.new(key, b"tag", hashlib.sha256).digest()
+        self._aead = AESGCM(hmac.new(key, b"enc", hashlib.sha256).digest())
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+            self._conn.execute("DELETE FROM ranges WHERE fetched_at < ?", (time.time() - self.ttl,))
+
+    def _tag(self, prefix: str) -> bytes:
+        return hmac.new(self._tag_key, prefix.upper().encode(), hashlib.sha256).digest()[:16]
+
+    @classmethod
+    def pack(cls, records: List[Tuple[str, int]]) -> bytes:
+        """Упаковывает пары (хвост хэша, число) в отсортированный массив"""
+        packed = [cls.RECORD.pack(bytes.fromhex(suffix.rjust(36, "0")), count) for suffix, count in records]
+        packed.sort()
+        return b"".join(packed)
+
+    @staticmethod
+    def parse_range(text: str) -> List[Tuple[str, int]]:
+        """Разбирает ответ /range: строки вида SUFFIX:COUNT"""
+        records = []
+        for line in text.splitlines():
+            suffix, _, count = line.strip().partition(":")
+            if len(suffix) == 35 and count.isdigit():
+                records.append((suffix, int(count)))
+        return records
+
+    @classmethod
+    def search(cls, blob: bytes, suffix: str) -> int:
+        """Двоичный поиск хвоста в упакованном массиве; 0, если не найден"""
+        target = bytes.fromhex(suffix.rjust(36, "0"))
+        size = cls.RECORD.size
+        low, high = 0, len(blob) // size
+        while low < high:
+            middle = (low + high) // 2
+            key = blob[middle * size:middle * size + 18]
+            if key < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(blob) // size and blob[low * size:low * size + 18] == target:
+            return cls.RECORD.unpack_from(blob, low * size)[1]
+        return 0
+
+    def get(self, prefix: str) -> Optional[bytes]:
+        """Упакованный диапазон префикса или None, если его нет или он устарел"""
+        with self._lock:
+            if self._conn is None:
+                return None
+            aead = self._aead
+            row = self._conn.execute(
+                "SELECT fetched_at, data FROM ranges WHERE tag = ?", (self._tag(prefix),)
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None
+        data = bytes(row[1])
+        try:
+            return zlib.decompress(aead.decrypt(data[:12], data[12:], prefix.upper().encode()))
+        except (InvalidTag, zlib.error):
+            return None
+
+    def put(self, prefix: str, records: List[Tuple[str, int]]) -> bytes:
+        """Сохраняет диапазон префикса; возвращает упакованные данные"""
+        blob = self.pack(records)
+        with self._lock:
+            if self._conn is None:
+                return blob
+            nonce = secrets.token_bytes(12)
+            data = nonce + self._aead.encrypt(nonce, zlib.compress(blob), prefix.upper().encode())
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ranges (tag, fetched_at, data) VALUES (?, ?, ?)",
+                    (self._tag(prefix), time.time(), data)
+                )
+                # Ограничение размера: вытесняем самые старые диапазоны
+                self._conn.execute(
+                    "DELETE FROM ranges WHERE tag IN "
+                    "(SELECT tag FROM ranges ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_ranges,)
+                )
+        return blob
+
+    def close(self):
+        """Закрывает базу; ключи кэша больше не используются"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._aead = None
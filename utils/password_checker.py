@@ -1,129 +1,285 @@
+import hmac
+import time
+import asyncio
 import hashlib
+import secrets
 import requests
-from typing import Dict, Optional
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
 from PyQt6.QtCore import QObject, pyqtSignal, QTimer
-import time
-import queue
-from threading import Thread, Lock, Event
+from threading import Thread, Lock
+from utils.hibp_cache import HIBPRangeCache
+from utils.breach_db import BreachDatabase
+from utils.password_utils import analyze_password, STRENGTH_SEVERITY
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket)
+
+    Ведро вмещает capacity жетонов и пополняется со скоростью rate жетонов
+    в секунду: короткий всплеск до capacity запросов проходит сразу,
+    остальные запросы распределяются равномерно. Жетон резервируется в
+    момент вызова, поэтому ожидающие обслуживаются по очереди, а ожидание -
+    asyncio.sleep, который не занимает поток. rate=None - без ограничения.
+    Используется только из цикла событий.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        """Дожидается и забирает один жетон"""
+        if self.rate is None:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            try:
+                await asyncio.sleep(-self._tokens / self.rate)
+            except asyncio.CancelledError:
+                # Отмененный запрос возвращает зарезервированный жетон
+                self._tokens += 1
+                raise
+
+
+class BreachCountCache:
+    """LRU-кэш результатов проверки по числу утечек
+
+    Ключ - HMAC-SHA256 от SHA-1 пароля на случайном ключе сессии,
+    обрезанный до TAG_SIZE байт, поэтому ни пароль, ни его SHA-1 в кэше не
+    хранятся, а по ключам нельзя проверить догадку о пароле. Значение -
+    число утечек в слоте фиксированного размера (массив uint32), так что
+    память ограничена max_entries записями. Порядок вытеснения ведет
+    OrderedDict: поиск, обновление и вытеснение - O(1). clear() одним шагом
+    меняет ключ и сбрасывает все слоты.
+    """
+    TAG_SIZE = 16
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        """Удаляет все записи; старые ключи больше не совпадут"""
+        with self._lock:
+            self._key = secrets.token_bytes(32)
+            self._slots = array("I", bytes(4 * self.max_entries))
+            self._index: "OrderedDict[bytes, int]" = OrderedDict()  # метка -> номер слота
+
+    def _tag(self, sha1_hex: str) -> bytes:
+        return hmac.new(self._key, bytes.fromhex(sha1_hex), hashlib.sha256).digest()[:self.TAG_SIZE]
+
+    def get(self, sha1_hex: str) -> Optional[int]:
+        """Число утечек для SHA-1 пароля или None, если его нет в кэше"""
+        with self._lock:
+            tag = self._tag(sha1_hex)
+            slot = self._index.get(tag)
+            if slot is None:
+                return None
+            self._index.move_to_end(tag)
+            return self._slots[slot]
+
+    def put(self, sha1_hex: str, count: int):
+        """Запоминает число утечек; при переполнении вытесняет самую старую запись"""
+        with self._lock:
+            tag = self._tag(sha1_hex)
+            slot = self._index.get(tag)
+            if slot is not None:
+                self._index.move_to_end(tag)
+            elif len(self._index) < self.max_entries:
+                slot = len(self._index)
+                self._index[tag] = slot
+            else:
+                _, slot = self._index.popitem(last=False)
+                self._index[tag] = slot
+            self._slots[slot] = min(count, 0xFFFFFFFF)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
 
 class HIBPChecker(QObject):
+    """Проверка паролей по базе утечек Have I Been Pwned
+
+    Сетевая часть работает в собственном цикле asyncio в отдельном потоке:
+    пока проверок нет, поток спит в ожидании событий и не просыпается.
+    Частоту запросов ограничивает TokenBucket, одновременные запросы
+    одного префикса объединяются в один, а проверка пароля, который уже
+    сменился, отменяется вместе с ожиданием жетона.
+    """
     status_ready = pyqtSignal(dict)  # Сигнал с результатом проверки
     MAX_CACHE_SIZE = 1000
     CHECK_DELAY = 300  # мс
     REQUEST_TIMEOUT = 2  # секунды
-    MIN_REQUEST_INTERVAL = 1.5  # секунды
+    MIN_REQUEST_INTERVAL = 1.5  # секунды, средний интервал между запросами
+    REQUEST_BURST = 3  # запросов подряд без ожидания
+    MAX_CONCURRENT_REQUESTS = 4
+    RANGE_ENDPOINT = "https://api.pwnedpasswords.com/range/{prefix}"
 
-    def __init__(self):
+    def __init__(self, range_endpoint: Optional[str] = None):
         super().__init__()
+        self.range_endpoint = range_endpoint or self.RANGE_ENDPOINT
+        self._range_cache: Optional[HIBPRangeCache] = None
+        self._breach_db: Optional[BreachDatabase] = None
         self._check_timer = QTimer()
         self._check_timer.setSingleShot(True)
         self._check_timer.timeout.connect(self._delayed_check)
-        self._current_password: Optional[str] = None
-        self._cache = {}
-        self._cache_lock = Lock()
-        self._last_request_time = 0
-        self._request_lock = Lock()
-        self._request_queue = queue.Queue()
-        self._stop_event = Event()
-        
-        # Запускаем поток обработки
-        self._worker_thread = Thread(target=self._process_requests, daemon=True)
-        self._worker_thread.start()
+        # Ожидающая проверка хранит только SHA-1 и офлайн-статус пароля
+        self._pending: Optional[tuple] = None
+        self._cache = BreachCountCache(self.MAX_CACHE_SIZE)
+
+        # Токен отмены: проверка выдает результат, только если ее номер
+        # совпадает с текущим
+        self._check_id = 0
+        self._pending_check = None
+
+        rate = 1 / self.MIN_REQUEST_INTERVAL if self.MIN_REQUEST_INTERVAL > 0 else None
+        self._bucket = TokenBucket(rate, self.REQUEST_BURST)
+        self._inflight: Dict[str, asyncio.Task] = {}  # префикс -> загрузка диапазона
+        self._waiters: Dict[str, int] = {}  # префикс -> число ожидающих
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS,
+                                            thread_name_prefix="hibp")
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = Thread(target=self._run_loop, daemon=True)
+        self._loop_thread.start()
+
+    def _run_loop(self):
+        """Цикл событий сетевой части; при остановке отменяет незавершенные задачи"""
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    def set_range_cache(self, range_cache: Optional[HIBPRangeCache]):
+        """Подключает кэш диапазонов HIBP (None - отключить при блокировке)"""
+        previous, self._range_cache = self._range_cache, range_cache
+        if previous is not None and previous is not range_cache:
+            previous.close()
+
+    def set_breach_db(self, breach_db: Optional[BreachDatabase]):
+        """Включает офлайн-режим: проверка по локальной базе утечек без сети"""
+        previous, self._breach_db = self._breach_db, breach_db
+        if previous is not None and previous is not breach_db:
+            previous.close()
 
     def check_password(self, password: str):
         """Запускает проверку пароля"""
+        # Результат начатой проверки прежнего пароля больше не нужен
+        self._check_timer.stop()
+        self._cancel_pending()
+
         # Немедленная проверка на пустой пароль
         if not password:
             self.status_ready.emit({'severity': 'empty'})
             return
 
+        # Слабый пароль отклоняется без обращения к сети
+        offline_status = self._get_offline_status(password)
+        if offline_status['severity'] == 'danger':
+            self.status_ready.emit(offline_status)
+            return
+
+        # Дальше пароль нужен только в виде SHA-1
+        password_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
         # Проверка кэша
-        with self._cache_lock:
-            if password in self._cache:
-                self.status_ready.emit(self._cache[password])
-                return
+        count = self._cache.get(password_hash)
+        if count is not None:
+            self.status_ready.emit(self._combined_status(offline_status, count))
+            return
 
-        # Отмена предыдущей отложенной проверки
-        self._check_timer.stop()
-        self._current_password = password
+        # Отложенная проверка: следующий ввод ее отменит
+        self._pending = (password_hash, offline_status)
         self._check_timer.start(self.CHECK_DELAY)
 
+    def _cancel_pending(self):
+        """Отменяет текущую проверку: ее результат уже не будет показан"""
+        self._check_id += 1
+        self._pending = None
+        if self._pending_check is not None:
+            self._pending_check.cancel()
+            self._pending_check = None
+
+    def clear_cache(self):
+        """Отменяет проверки и очищает кэш результатов (при блокировке)"""
+        self._check_timer.stop()
+        self._cancel_pending()
+        self._cache.clear()
+
     def _delayed_check(self):
         """Отложенная проверка пароля"""
-        if not self._current_password:
+        pending = self._pending
+        if pending is None or not self._loop_thread.is_alive():
             return
 
+        self._cancel_pending()
+        self._pending_check = asyncio.run_coroutine_threadsafe(
+            self._check(*pending, self._check_id), self._loop
+        )
+
+    async def _check(self, password_hash: str, offline_status: dict, check_id: int):
+        """Проверяет хэш по базе утечек и отправляет статус, если проверка не устарела"""
+        prefix, suffix = password_hash[:5], password_hash[5:]
         try:
-            # Добавляем запрос в очередь
-            self._request_queue.put(self._current_password, timeout=1)
-        except queue.Full:
-            # Если очередь переполнена, пропускаем запрос
-            pass
-
-    def _process_requests(self):
-        """Обработка запросов в отдельном потоке"""
-        while not self._stop_event.is_set():
-            try:
-                # Ждем новый пароль не более 0.5 секунд
-                password = self._request_queue.get(timeout=0.5)
-                
-                # Пропускаем, если это не текущий пароль
-                if password != self._current_password:
-                    continue
-
-                # Получаем статус пароля
-                try:
-                    status = self._get_password_status(password)
-                    
-                    # Кэшируем результат
-                    with self._cache_lock:
-                        self._cache[password] = status
-                        # Очистка кэша при превышении размера
-                        while len(self._cache) > self.MAX_CACHE_SIZE:
-                            self._cache.pop(next(iter(self._cache)))
-
-                    # Отправляем результат только если это все еще текущий пароль
-                    if password == self._current_password:
-                        self.status_ready.emit(status)
-                        
-                except Exception as e:
-                    # В случае ошибки отправляем статус офлайн-проверки
-                    if password == self._current_password:
-                        offline_status = self._get_offline_status(password)
-                        self.status_ready.emit(offline_status)
-
-            except queue.Empty:
-                # Таймаут очереди - это нормально
-                continue
-            except Exception:
-                # Любые другие ошибки не должны прерывать поток
-                continue
+            count = (await self._breach_counts(prefix, [suffix]))[suffix]
+        except Exception:
+            # В случае ошибки возвращаем результат офлайн проверки
+            status = offline_status
+        else:
+            self._cache.put(password_hash, count)
+            status = self._combined_status(offline_status, count)
+
+        if check_id == self._check_id:
+            self.status_ready.emit(status)
+
+    # Пояснение к слабому паролю по главному найденному шаблону
+    WEAKNESS_MESSAGES = {
+        'dictionary': 'Password is based on a common word',
+        'keyboard': 'Password is a keyboard pattern',
+        'sequence': 'Password contains an obvious sequence',
+        'repeat': 'Password contains repeated characters',
+        'date': 'Password contains a date',
+    }
 
     def _get_offline_status(self, password: str) -> dict:
-        """Проверяет пароль локально без обращения к API"""
+        """Проверяет пароль локально без обращения к API
+
+        Уровень берется из общей оценки надежности (analyze_password), так
+        что статус совпадает с индикатором чипа и шкалой генератора.
+        """
         if not password:
             return {'severity': 'empty'}
 
-        # Проверка сложности
-        has_upper = any(c.isupper() for c in password)
-        has_lower = any(c.islower() for c in password)
-        has_digit = any(c.isdigit() for c in password)
-        has_special = any(not c.isalnum() for c in password)
-        strength_score = sum([has_upper, has_lower, has_digit, has_special])
-
-        if len(password) < 8:
-            return {
-                'status': 'Too Short',
-                'message': 'Password is too short',
-                'severity': 'danger'
-            }
-        elif strength_score < 3:
+        _, score, pattern = analyze_password(password)
+        severity = STRENGTH_SEVERITY[score]
+        if severity == 'danger':
+            if len(password) < 8 and not pattern:
+                return {
+                    'status': 'Too Short',
+                    'message': 'Password is too short',
+                    'severity': 'danger'
+                }
             return {
                 'status': 'Weak',
-                'message': 'Password is too weak',
+                'message': self.WEAKNESS_MESSAGES.get(pattern, 'Password is too weak'),
                 'severity': 'danger'
             }
-        elif strength_score >= 3 and len(password) >= 12:
+        elif severity == 'safe':
             return {
                 'status': 'Potentially Safe',
                 'message': 'Strong password (offline check)',
@@ -136,69 +292,109 @@ class HIBPChecker(QObject):
                 'severity': 'warning'
             }
 
-    def _get_password_status(self, password: str) -> dict:
-        """Проверяет безопасность пароля через API"""
-        # Сначала делаем офлайн проверку
-        offline_status = self._get_offline_status(password)
-        if offline_status['severity'] == 'danger':
-            return offline_status
+    def _combined_status(self, offline_status: dict, count: int) -> dict:
+        """Итоговый статус по офлайн-оценке и числу утечек"""
+        # Утечка важнее оценки, но ее отсутствие не делает средний пароль надежным
+        if count or offline_status['severity'] == 'safe':
+            return self.status_for_count(count)
+        return offline_status
 
-        try:
-            # Получаем хэш пароля
-            password_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
-            prefix, suffix = password_hash[:5], password_hash[5:].lower()
-            
-            # Проверяем интервал между запросами
-            with self._request_lock:
-                current_time = time.time()
-                time_since_last_request = current_time - self._last_request_time
-                if time_since_last_request < self.MIN_REQUEST_INTERVAL:
-                    time.sleep(self.MIN_REQUEST_INTERVAL - time_since_last_request)
-
-                # Делаем запрос
-                response = requests.get(
-                    f"https://api.pwnedpasswords.com/range/{prefix}",
-                    timeout=self.REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
-                self._last_request_time = time.time()
-
-            # Проверяем наличие пароля в базе
-            for line in response.text.splitlines():
-                if line.lower().startswith(suffix):
-                    count = int(line.split(':')[1])
-                    if count > 10:
-                        return {
-                            'status': 'Compromised',
-                            'message': f'Found in {count} data breaches',
-                            'severity': 'danger'
-                        }
-                    elif count > 0:
-                        return {
-                            'status': 'Warning',
-                            'message': f'Found in {count} data breaches',
-                            'severity': 'warning'
-                        }
-
-            # Если пароль не найден в базе и достаточно сложный
+    @staticmethod
+    def status_for_count(count: int) -> dict:
+        """Статус пароля по числу найденных утечек"""
+        if count > 10:
             return {
-                'status': 'Safe',
-                'message': 'Strong and unique password',
-                'severity': 'safe'
+                'status': 'Compromised',
+                'message': f'Found in {count} data breaches',
+                'severity': 'danger'
+            }
+        elif count > 0:
+            return {
+                'status': 'Warning',
+                'message': f'Found in {count} data breaches',
+                'severity': 'warning'
             }
 
-        except Exception:
-            # В случае ошибки возвращаем результат офлайн проверки
-            return offline_status
+        # Если пароль не найден в базе и достаточно сложный
+        return {
+            'status': 'Safe',
+            'message': 'Strong and unique password',
+            'severity': 'safe'
+        }
+
+    def submit_breach_counts(self, prefix: str, suffixes: List[str]) -> Future:
+        """Запускает подсчет утечек для нескольких хэшей с одним префиксом
+
+        Диапазон префикса берется из локальной базы, кэша или одним
+        запросом к API, так что хэши с общим префиксом стоят один запрос.
+        Для фоновых потоков (аудит хранилища): запросы проходят через общий
+        ограничитель частоты и объединяются с проверками из интерфейса.
+        Возвращает Future с {хвост: число утечек}; ошибки сети приходят
+        через него, а cancel() прерывает запрос и ожидание жетона.
+        """
+        return asyncio.run_coroutine_threadsafe(self._breach_counts(prefix, suffixes), self._loop)
+
+    async def _breach_counts(self, prefix: str, suffixes: List[str]) -> Dict[str, int]:
+        breach_db = self._breach_db
+        if breach_db is not None:
+            return {suffix: breach_db.count(prefix + suffix) for suffix in suffixes}
+
+        blob = await self._range_blob(prefix)
+        return {suffix: HIBPRangeCache.search(blob, suffix) for suffix in suffixes}
+
+    async def _range_blob(self, prefix: str) -> bytes:
+        """Упакованный диапазон префикса; одновременные запросы объединяются
+
+        Загрузка диапазона общая для всех, кто ждет этот префикс. Отмена
+        одного ожидающего ее не прерывает; загрузка отменяется, только
+        когда ее больше никто не ждет.
+        """
+        fetch = self._inflight.get(prefix)
+        if fetch is None:
+            fetch = self._loop.create_task(self._fetch_range(prefix))
+            self._inflight[prefix] = fetch
+        self._waiters[prefix] = self._waiters.get(prefix, 0) + 1
+        try:
+            return await asyncio.shield(fetch)
+        finally:
+            self._waiters[prefix] -= 1
+            if not self._waiters[prefix]:
+                del self._waiters[prefix]
+                del self._inflight[prefix]
+                fetch.cancel()
+
+    async def _fetch_range(self, prefix: str) -> bytes:
+        """Диапазон префикса: из кэша или запросом к API"""
+        range_cache = self._range_cache
+        if range_cache is not None:
+            blob = await self._loop.run_in_executor(self._executor, range_cache.get, prefix)
+            if blob is not None:
+                return blob
+
+        await self._bucket.acquire()
+        text = await self._loop.run_in_executor(self._executor, self._request_range, prefix)
+        records = HIBPRangeCache.parse_range(text)
+        if range_cache is not None:
+            return await self._loop.run_in_executor(self._executor, range_cache.put, prefix, records)
+        return HIBPRangeCache.pack(records)
+
+    def _request_range(self, prefix: str) -> str:
+        """Запрос диапазона к API (выполняется в пуле потоков)"""
+        response = self._session.get(
+            self.range_endpoint.format(prefix=prefix),
+            timeout=self.REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.text
 
     def cleanup(self):
         """Очистка ресурсов при закрытии"""
-        self._stop_event.set()  # Сигнал потоку о завершении
-        if self._worker_thread.is_alive():
-            try:
-                # Добавляем пустой элемент в очередь, чтобы разблокировать поток
-                self._request_queue.put(None, timeout=0.1)
-            except queue.Full:
-                pass
-            # Ждем завершения потока не более 1 секунды
-            self._worker_thread.join(timeout=1.0) 
\ No newline at end of file
+        self.clear_cache()
+        if self._loop_thread.is_alive():
+            # Незавершенные проверки отменяются при остановке цикла
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=1.0)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+        self.set_range_cache(None)
+        self.set_breach_db(None)
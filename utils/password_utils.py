@@ -1,45 +1,450 @@
 import re
+import math
+import operator
+import hashlib
+import secrets
+import threading
+from itertools import repeat
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 
-def password_strength(password: str) -> int:
+# Оценка надежности пароля по энтропии подбора
+#
+# Пароль разбивается на фрагменты так, чтобы суммарное число бит на их
+# подбор было минимальным: словарное слово стоит log2 его номера в
+# словаре, дата - log2 числа возможных дат, клавиатурная дорожка и
+# последовательность - log2 числа начальных символов и длины, повтор -
+# стоимость повторяемой части и числа повторов, остальные символы -
+# полный перебор по алфавиту пароля. Итог переводится в шкалу 0-4, общую
+# для индикатора чипа, статуса пароля и генератора.
+
+# Частые пароли и слова в порядке популярности (номер в списке = ранг)
+_COMMON_WORDS = """
+password 123456 qwerty 12345678 111111 123456789 1234567 dragon baseball
+abc123 football monkey letmein shadow master 666666 qwertyuiop 123321
+mustang 1234567890 michael 654321 superman 1qaz2wsx 7777777 121212 000000
+qazwsx 123qwe killer trustno1 jordan jennifer zxcvbnm asdfgh hunter buster
+soccer harley batman andrew tigger sunshine iloveyou 2000 charlie robert
+thomas hockey ranger daniel starwars 112233 george computer michelle
+jessica pepper zxcvbn 555555 131313 freedom 777777 pass maggie 159753
+aaaaaa ginger princess joshua cheese amanda summer love ashley nicole
+chelsea matthew access yankees 987654321 dallas austin thunder taylor
+matrix minecraft william corvette hello martin heather secret merlin
+diamond 1234qwer gfhjkm hammer silver 222222 88888888 anthony justin test
+bailey q1w2e3r4t5 patrick internet scooter orange 11111 golfer cookie
+richard samantha bigdog guitar jackson whatever mickey chicken sparky
+snoopy maverick phoenix camaro peanut morgan welcome falcon cowboy ferrari
+samsung andrea smokey steelers joseph mercedes dakota arsenal eagles
+melissa boomer booboo spider nascar monster tigers yellow xxxxxx 123123123
+gateway marina diablo bulldog qwer1234 compaq purple banana junior hannah
+123654 porsche lakers iceman money cowboys 987654 london tennis 999999
+coffee scooby 0000 miller boston q1w2e3r4 brandon yamaha chester mother
+forever johnny edward 333333 oliver redsox player nikita knight fender
+barney midnight please brandy chicago badboy slayer rangers charles angel
+flower bigdaddy rabbit wizard jasper enter rachel chris steven winner
+adidas victoria natasha 1q2w3e4r jasmine winter prince marine ghbdtn
+fishing cocacola casper james 232323 raiders 888888 marlboro gandalf
+asdfasdf crystal 87654321 12344321 golden panther lauren angela spanky
+madison winston shannon mike toyota canada sophie apples tiger 123abc
+pokemon qazxsw 55555 qwaszx muffin johnson murphy cooper jonathan
+liverpool david danielle 159357 jackie 1990 123456a 789456 turtle
+abcd1234 scorpion qazwsxedc 101010 butter carlos password1 dennis slipknot
+qwerty123 asdf 1991 black startrek 12341234 cameron newyork rainbow nathan
+john 1992 rocket viking 1212 sierra peaches gemini doctor wilson sandra
+helpme qwertyui victor florida dolphin captain tucker blue theman bandit
+dolphins packers jaguar lovers nicholas united tiffany maxwell zzzzzz
+nirvana jeremy elephant giants hotdog rosebud success mountain 444444
+xxxxxxxx warrior 1q2w3e4r5t q1w2e3 123456q albert lucky azerty 7777 alex
+bond007 alexis 1111111 samson scorpio bonnie benjamin voodoo driver dexter
+jason calvin freddy 212121 creative 12345a sydney 1989 asdfghjk trouble
+gunner happy gordon legend jessie stella qwert eminem arthur apple nissan
+bear america 1qazxsw2 nothing parker 4444 rebecca qweqwe garfield beavis
+jack asdasd december 2222 102030 252525 11223344 magic apollo skippy
+kitten golf copper braves shelby godzilla beaver fred tomcat august buddy
+airborne 1993 1988 brooklyn animal platinum phantom online xavier darkness
+blink182 power fish green 789456123 voyager police travis 12qwaszx heaven
+snowball lover abcdef 00000 walter blazer cricket sniper donkey willow
+loveme saturn therock redwings bigboy pumpkin trinity williams nintendo
+digital destiny topgun runner marvin chance bubbles testing fire november
+minnie hello123 admin admin123 root toor user login changeme default guest
+qwe123 zaq12wsx 1q2w3e parol parola privet lubov solnce kotik zaraza
+natali ytrewq word pass123 letmein1 iloveyou1 monkey123 welcome1
+""".split()
+
+# Слово -> (ранг, записано задом наперед); перевернутые слова ищутся тем же
+# выражением, что и прямые
+_WORD_RANKS: Dict[str, Tuple[int, bool]] = {}
+for _rank, _word in enumerate(_COMMON_WORDS, 1):
+    if len(_word) >= 3:
+        _WORD_RANKS.setdefault(_word, (_rank, False))
+for _rank, _word in enumerate(_COMMON_WORDS, 1):
+    if len(_word) >= 3:
+        _WORD_RANKS.setdefault(_word[::-1], (_rank, True))
+
+
+def _trie_pattern(words) -> str:
+    """Регулярное выражение-дерево: общий префикс слов проверяется один раз"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Жадная необязательная часть: находится самое длинное слово
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+# Все словарные слова, начинающиеся в каждой позиции (самое длинное)
+_WORD_PATTERN = re.compile("(?=(" + _trie_pattern(_WORD_RANKS) + "))")
+
+# Замены "leet": 1 и | могут означать и i, и l
+_LEET_BASE = {"4": "a", "@": "a", "8": "b", "(": "c", "3": "e", "6": "g", "9": "g",
+              "!": "i", "0": "o", "$": "s", "5": "s", "+": "t", "7": "t", "2": "z", "%": "x"}
+_LEET_I = str.maketrans(dict(_LEET_BASE, **{"1": "i", "|": "i"}))
+_LEET_L = str.maketrans({"1": "l", "|": "l"})  # применяется перед _LEET_I
+
+_REPEAT_PATTERN = re.compile(r"(.+?)\1+", re.DOTALL)
+_YEAR_PATTERN = re.compile(r"(?<!\d)(?:19|20)\d\d(?!\d)")
+_SEPARATED_DATE_PATTERN = re.compile(r"(?<!\d)(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})(?!\d)")
+_DIGITS_PATTERN = re.compile(r"\d{4,}")
+# Классы символов для полного перебора: печатные ASCII переводятся в код
+# класса, прочие символы остаются как есть и считаются отдельным классом
+_CHAR_CLASS_TABLE = str.maketrans({
+    chr(code): "l" if chr(code).islower() else "u" if chr(code).isupper() else
+    "d" if chr(code).isdigit() else "s" for code in range(0x20, 0x7f)
+})
+_CHAR_CLASS_SIZES = {"l": 26, "u": 26, "d": 10, "s": 33}
+_OTHER_CLASS_SIZE = 100
+
+# Клавиатура QWERTY: строки без Shift и с Shift, сдвиг строки в клавишах
+_KEYBOARD_ROWS = (
+    ("`1234567890-=", "~!@#$%^&*()_+", 0.0),
+    ("qwertyuiop[]\\", "QWERTYUIOP{}|", 0.5),
+    ("asdfghjkl;'", "ASDFGHJKL:\"", 0.75),
+    ("zxcvbnm,./", "ZXCVBNM<>?", 1.25),
+)
+
+
+def _keyboard_graph() -> Tuple[Dict[str, Dict[str, Tuple[int, int]]], set]:
+    """Соседние клавиши: символ -> {сосед: направление}, и символы с Shift"""
+    positions = {}
+    shifted = set()
+    for row, (plain, upper, offset) in enumerate(_KEYBOARD_ROWS):
+        for column, (char, shift_char) in enumerate(zip(plain, upper)):
+            positions[char] = positions[shift_char] = (row, column + offset)
+            shifted.add(shift_char)
+    graph: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    for char, (row, x) in positions.items():
+        neighbours = graph.setdefault(char, {})
+        for other, (other_row, other_x) in positions.items():
+            dx = other_x - x
+            if abs(other_row - row) <= 1 and 0 < abs(dx) + abs(other_row - row) and abs(dx) < 1.01 \
+                    and not (other_row == row and abs(dx) < 0.5):
+                neighbours[other] = (other_row - row, 1 if dx > 0 else -1 if dx < 0 else 0)
+    return graph, shifted
+
+
+_KEYBOARD, _SHIFTED = _keyboard_graph()
+
+
+# Соседние клавиши: пара символов -> направление шага по клавиатуре
+_KEYBOARD_STEPS = {char + other: step for char, neighbours in _KEYBOARD.items()
+                   for other, step in neighbours.items()}
+_KEYBOARD_STARTS = math.log2(sum(len(plain) for plain, _, _ in _KEYBOARD_ROWS))
+_KEYBOARD_TURN = math.log2(sum(map(len, _KEYBOARD.values())) / len(_KEYBOARD))
+# Последовательности: пара соседних символов алфавита -> шаг +1 или -1
+_SEQUENCE_STEPS = {
+    alphabet[i:i + 2]: step
+    for base in ("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "0123456789")
+    for alphabet, step in ((base, 1), (base[::-1], -1))
+    for i in range(len(alphabet) - 1)
+}
+
+# Коды пар соседних символов: k - соседние клавиши, + и - - шаг
+# последовательности, K и J - то и другое сразу. Отрезок из 3+ символов -
+# это 2+ подходящих кода подряд
+_PAIR_CODES = dict.fromkeys(_KEYBOARD_STEPS, "k")
+for _pair, _step in _SEQUENCE_STEPS.items():
+    _PAIR_CODES[_pair] = ("K" if _step > 0 else "J") if _pair in _KEYBOARD_STEPS else ("+" if _step > 0 else "-")
+_KEYBOARD_RUN = re.compile(r"[kKJ]{2,}")
+_SEQUENCE_RUN = re.compile(r"[+K]{2,}|[-J]{2,}")
+
+DATE_YEARS = 120  # правдоподобных лет в датах
+STRONG_ENTROPY = 80  # бит: шкала генератора заполняется до конца
+# Нижние границы оценок 1-4 шкалы в битах энтропии подбора
+SCORE_THRESHOLDS = (28, 36, 50, 64)
+# Уровень статуса для каждой оценки шкалы
+STRENGTH_SEVERITY = ('danger', 'danger', 'warning', 'safe', 'safe')
+# Версия оценки: растет при изменении алгоритма или SCORE_THRESHOLDS,
+# и оценки прежней версии, сохраненные в записях хранилища, пересчитываются
+STRENGTH_VERSION = 1
+STRENGTH_CACHE_SIZE = 4096
+
+# Совпадение: начало, конец, бит энтропии, тип
+Match = Tuple[int, int, float, str]
+
+
+def _log2_combinations(n: int, k: int) -> float:
+    return math.log2(sum(math.comb(n, i) for i in range(1, k + 1))) if k else 0.0
+
+
+def _case_entropy(word: str) -> float:
+    """Дополнительные биты за регистр букв в словарном слове"""
+    if word.islower() or not any(c.isalpha() for c in word):
+        return 0.0
+    if word.isupper() or (word[0].isupper() and (word[1:].islower() or not word[1:].isalpha())):
+        return 1.0
+    upper = sum(1 for c in word if c.isupper())
+    lower = sum(1 for c in word if c.islower())
+    return _log2_combinations(upper + lower, min(upper, lower))
+
+
+def _dictionary_matches(password: str, lower: str) -> List[Match]:
+    matches = []
+    variants = [lower]
+    translated = lower.translate(_LEET_I)
+    if translated != lower:
+        variants.append(translated)
+        # Второе прочтение 1 и | нужно, только если они есть в пароле
+        if "1" in lower or "|" in lower:
+            variants.append(lower.translate(_LEET_L).translate(_LEET_I))
+
+    for text in variants:
+        for found in _WORD_PATTERN.finditer(text):
+            word = found.group(1)
+            start, end = found.start(), found.start() + len(word)
+            substituted = 0
+            if text is not lower:
+                substituted = sum(1 for i in range(start, end) if lower[i] != text[i])
+                if not substituted:
+                    continue
+            rank, reversed_word = _WORD_RANKS[word]
+            bits = math.log2(rank + 1) + reversed_word + substituted + _case_entropy(password[start:end])
+            matches.append((start, end, bits, "dictionary"))
+    return matches
+
+
+def _chains(password: str) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Клавиатурные дорожки и последовательности из 3+ символов
+
+    Каждая пара соседних символов заменяется кодом из _PAIR_CODES, и
+    отрезки ищутся готовыми выражениями по строке кодов, без цикла по
+    символам.
     """
-    Оценивает сложность пароля по шкале от 0 до 5.
-    
-    Критерии:
-    1. Длина >= 8 символов
-    2. Наличие цифр
-    3. Наличие букв в нижнем регистре
-    4. Наличие букв в верхнем регистре
-    5. Наличие специальных символов
-    
+    codes = "".join(map(_PAIR_CODES.get, map(operator.add, password, password[1:]), repeat(".")))
+    walks = [(found.start(), found.end() + 1) for found in _KEYBOARD_RUN.finditer(codes)]
+    sequences = [(found.start(), found.end() + 1) for found in _SEQUENCE_RUN.finditer(codes)]
+    return walks, sequences
+
+
+def _keyboard_matches(password: str, walks: List[Tuple[int, int]]) -> List[Match]:
+    matches = []
+    for start, end in walks:
+        walk = password[start:end]
+        turns = 0
+        direction = None
+        for i in range(len(walk) - 1):
+            step = _KEYBOARD_STEPS[walk[i:i + 2]]
+            if direction is not None and step != direction:
+                turns += 1
+            direction = step
+        bits = _KEYBOARD_STARTS + math.log2(len(walk)) + turns * _KEYBOARD_TURN
+        shifted = sum(1 for c in walk if c in _SHIFTED)
+        if shifted:
+            bits += 1.0 if shifted == len(walk) else _log2_combinations(len(walk), min(shifted, len(walk) - shifted))
+        matches.append((start, end, bits, "keyboard"))
+    return matches
+
+
+def _sequence_matches(password: str, sequences: List[Tuple[int, int]]) -> List[Match]:
+    matches = []
+    for start, end in sequences:
+        first = password[start]
+        base = 2.0 if first in "aAzZ019" else math.log2(10 if first.isdigit() else 26)
+        descending = _SEQUENCE_STEPS[password[start:start + 2]] < 0
+        bits = base + math.log2(end - start) + (1.0 if descending else 0.0)
+        matches.append((start, end, bits, "sequence"))
+    return matches
+
+
+def _is_day_month(first: str, second: str) -> bool:
+    a, b = int(first), int(second)
+    return (1 <= a <= 31 and 1 <= b <= 12) or (1 <= a <= 12 and 1 <= b <= 31)
+
+
+def _is_year(digits: str) -> bool:
+    return len(digits) == 2 or (len(digits) == 4 and 1900 <= int(digits) < 1900 + DATE_YEARS)
+
+
+def _digits_date_entropy(digits: str) -> float:
+    """Биты для строки цифр, похожей на дату; 0, если это не дата"""
+    if len(digits) == 4:
+        return math.log2(366) if _is_day_month(digits[:2], digits[2:]) else 0.0
+    for year_length in (4, 2):
+        for year, rest in ((digits[:year_length], digits[year_length:]),
+                           (digits[-year_length:], digits[:-year_length])):
+            if not 2 <= len(rest) <= 4 or not _is_year(year):
+                continue
+            for split in range(max(1, len(rest) - 2), min(2, len(rest) - 1) + 1):
+                if _is_day_month(rest[:split], rest[split:]):
+                    return math.log2(366 * DATE_YEARS)
+    return 0.0
+
+
+def _date_matches(password: str) -> List[Match]:
+    matches = []
+    for found in _YEAR_PATTERN.finditer(password):
+        matches.append((found.start(), found.end(), math.log2(DATE_YEARS), "date"))
+    for found in _SEPARATED_DATE_PATTERN.finditer(password):
+        first, _, second, third = found.groups()
+        if (_is_year(third) and _is_day_month(first, second)) or \
+                (len(first) == 4 and _is_year(first) and _is_day_month(second, third)):
+            matches.append((found.start(), found.end(), math.log2(366 * DATE_YEARS) + 2, "date"))
+    for found in _DIGITS_PATTERN.finditer(password):
+        run = found.group()
+        for start in range(len(run) - 3):
+            for end in range(start + 4, min(start + 8, len(run)) + 1):
+                bits = _digits_date_entropy(run[start:end])
+                if bits:
+                    matches.append((found.start() + start, found.start() + end, bits, "date"))
+    return matches
+
+
+def _repeat_matches(password: str) -> List[Match]:
+    matches = []
+    if len(set(password)) == len(password):
+        return matches
+    for found in _REPEAT_PATTERN.finditer(password):
+        base = found.group(1)
+        count = len(found.group()) // len(base)
+        bits = _min_entropy(base)[0] + math.log2(count)
+        matches.append((found.start(), found.end(), bits, "repeat"))
+    return matches
+
+
+def _cardinality(password: str) -> int:
+    classes = set(password.translate(_CHAR_CLASS_TABLE))
+    size = sum(_CHAR_CLASS_SIZES.get(cls, 0) for cls in classes)
+    if not classes.issubset(_CHAR_CLASS_SIZES):
+        size += _OTHER_CLASS_SIZE
+    return size
+
+
+def _min_entropy(password: str) -> Tuple[float, str]:
+    """Минимальная энтропия разбиения пароля и тип самого длинного шаблона"""
+    n = len(password)
+    brute = math.log2(_cardinality(password))
+    if n < 3:
+        # Все шаблоны длиннее двух символов
+        return n * brute, ""
+    walks, sequences = _chains(password)
+    matches = (_dictionary_matches(password, password.lower()) + _keyboard_matches(password, walks) +
+               _sequence_matches(password, sequences) + _date_matches(password) + _repeat_matches(password))
+    if not matches:
+        return n * brute, ""
+
+    by_end: List[List[Match]] = [[] for _ in range(n + 1)]
+    for match in matches:
+        by_end[match[1]].append(match)
+
+    best = [0.0] * (n + 1)
+    chosen: List[Match] = [(0, 0, 0.0, "")] * (n + 1)
+    for end in range(1, n + 1):
+        best[end] = best[end - 1] + brute
+        chosen[end] = (end - 1, end, brute, "bruteforce")
+        for match in by_end[end]:
+            bits = best[match[0]] + match[2]
+            if bits < best[end]:
+                best[end] = bits
+                chosen[end] = match
+
+    # Шаблон, покрывающий больше всего символов, - главная слабость
+    pattern, covered = "", 0
+    end = n
+    while end > 0:
+        start, _, _, kind = chosen[end]
+        if kind != "bruteforce" and end - start > covered:
+            pattern, covered = kind, end - start
+        end = start
+    return best[n], pattern
+
+
+def _score(entropy: float) -> int:
+    return sum(1 for threshold in SCORE_THRESHOLDS if entropy >= threshold)
+
+
+_memo: "OrderedDict[bytes, Tuple[float, int, str]]" = OrderedDict()
+_memo_key = secrets.token_bytes(32)
+_memo_lock = threading.Lock()
+
+
+def analyze_password(password: str) -> Tuple[float, int, str]:
+    """
+    Оценивает пароль по энтропии подбора.
+
+    Результаты запоминаются в LRU-кэше на STRENGTH_CACHE_SIZE паролей.
+    Ключ кэша - хэш пароля на случайном ключе, поэтому сами пароли в нем
+    не хранятся; clear_strength_cache() сбрасывает кэш при блокировке.
+
     Args:
         password (str): Пароль для проверки
-        
+
     Returns:
-        int: Оценка сложности от 0 до 5
+        tuple: (энтропия в битах, оценка 0-4, тип главной слабости:
+            'dictionary', 'keyboard', 'sequence', 'repeat', 'date' или '')
     """
-    score = 0
-    
     if not password:
-        return score
-        
-    # Длина
-    if len(password) >= 8:
-        score += 1
-        
-    # Цифры
-    if re.search(r"\d", password):
-        score += 1
-        
-    # Буквы в нижнем регистре
-    if re.search(r"[a-z]", password):
-        score += 1
-        
-    # Буквы в верхнем регистре
-    if re.search(r"[A-Z]", password):
-        score += 1
-        
-    # Специальные символы
-    if re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-        score += 1
-        
-    return score 
\ No newline at end of file
+        return 0.0, 0, ""
+
+    with _memo_lock:
+        key = hashlib.blake2b(password.encode("utf-8"), key=_memo_key, digest_size=16).digest()
+        result = _memo.get(key)
+        if result is not None:
+            _memo.move_to_end(key)
+            return result
+
+    entropy, pattern = _min_entropy(password)
+    result = (entropy, _score(entropy), pattern)
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > STRENGTH_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def password_strength(password: str) -> int:
+    """
+    Оценивает сложность пароля по шкале от 0 до 4.
+
+    Оценка считается по энтропии подбора (см. analyze_password) с учетом
+    словарных слов, клавиатурных дорожек, повторов, последовательностей
+    и дат; границы шкалы - SCORE_THRESHOLDS.
+
+    Args:
+        password (str): Пароль для проверки
+
+    Returns:
+        int: Оценка сложности от 0 до 4
+    """
+    return analyze_password(password)[1]
+
+
+def strength_percent(password: str) -> int:
+    """Заполнение шкалы надежности в процентах (STRONG_ENTROPY бит = 100)"""
+    return min(100, round(analyze_password(password)[0] * 100 / STRONG_ENTROPY))
+
+
+def clear_strength_cache():
+    """Сбрасывает кэш оценок и меняет его ключ"""
+    global _memo_key
+    with _memo_lock:
+        _memo.clear()
+        _memo_key = secrets.token_bytes(32)
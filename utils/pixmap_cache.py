@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtCore import Qt
+
+
+class PixmapCache:
+    """Общий для процесса кэш готовых QPixmap иконок
+
+    Ключ - (домен, размер, devicePixelRatio), значение - уже
+    масштабированная иконка, поэтому чипы одного домена и пересоздание
+    списка не декодируют PNG повторно. Объем ограничен BUDGET_BYTES:
+    при превышении вытесняются давно не использованные иконки.
+    Используется только из потока интерфейса (QPixmap вне его недоступен).
+    """
+    BUDGET_BYTES = 8 * 1024 * 1024
+
+    _instance = None
+
+    @classmethod
+    def instance(cls) -> "PixmapCache":
+        """Общий кэш процесса"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self.budget_bytes = budget_bytes or self.BUDGET_BYTES
+        self._pixmaps = OrderedDict()  # ключ -> QPixmap
+        self._bytes = 0
+
+    @staticmethod
+    def _key(domain: str, size: int, dpr: float) -> Tuple[str, int, float]:
+        return (domain, size, round(dpr, 2))
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, domain: str, size: int, dpr: float = 1.0) -> Optional[QPixmap]:
+        """Иконка из кэша или None"""
+        key = self._key(domain, size, dpr)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, domain: str, size: int, dpr: float, pixmap: QPixmap):
+        """Кладет готовую иконку в кэш"""
+        key = self._key(domain, size, dpr)
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self._bytes -= self._cost(old)
+        self._pixmaps[key] = pixmap
+        self._bytes += self._cost(pixmap)
+        while self._bytes > self.budget_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self._bytes -= self._cost(evicted)
+
+    def load(self, domain: str, path: str, size: int, dpr: float = 1.0,
+             data: Optional[bytes] = None) -> Optional[QPixmap]:
+        """Иконка домена размером не больше size x size логических пикселей
+
+        Файл (или уже прочитанные данные data) декодируется только при
+        промахе. Иконки меньше size не растягиваются, как и в QIcon.pixmap().
+        """
+        pixmap = self.get(domain, size, dpr)
+        if pixmap is not None:
+            return pixmap
+
+        image = QImage.fromData(data) if data is not None else QImage(path)
+        if image.isNull():
+            return None
+        limit = round(size * dpr)
+        if image.width() > limit or image.height() > limit:
+            image = image.scaled(limit, limit, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+            image.setDevicePixelRatio(dpr)
+        pixmap = QPixmap.fromImage(image)
+        self.put(domain, size, dpr, pixmap)
+        return pixmap
+
+    def discard(self, domain: str):
+        """Убирает все варианты иконки домена (иконка обновилась на диске)"""
+        for key in [key for key in self._pixmaps if key[0] == domain]:
+            self._bytes -= self._cost(self._pixmaps.pop(key))
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
@@ -0,0 +1,107 @@
+from typing import Optional
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+
+class _SearchSignals(QObject):
+    """Сигналы фоновой задачи поиска (QRunnable сам не может их иметь)"""
+    finished = pyqtSignal(int, list)  # номер запроса, результаты
+
+
+class _SearchTask(QRunnable):
+    """Один запрос к сессии поиска в пуле потоков"""
+
+    def __init__(self, worker: "SearchWorker", request_id: int, session, text: str, limit: Optional[int]):
+        super().__init__()
+        self.worker = worker
+        self.request_id = request_id
+        self.session = session
+        self.text = text
+        self.limit = limit
+        self.signals = _SearchSignals()
+
+    def run(self):
+        # Запрос мог устареть, пока задача ждала в очереди
+        if self.worker.is_stale(self.request_id):
+            return
+        try:
+            results = self.session.search(self.text, limit=self.limit)
+        except Exception as e:
+            print(f"Ошибка поиска: {str(e)}")
+            results = []
+        if not self.worker.is_stale(self.request_id):
+            self.signals.finished.emit(self.request_id, results)
+
+
+class SearchWorker(QObject):
+    """Поиск по хранилищу вне потока интерфейса
+
+    Ввод откладывается на DEBOUNCE_MS, запрос выполняется в отдельном
+    пуле из одного потока. Каждый новый запрос отменяет предыдущие: еще не
+    начатые убираются из очереди, а результаты уже начатых отбрасываются.
+    Готовые результаты приходят в поток интерфейса сигналом results_ready.
+    """
+    results_ready = pyqtSignal(str, list)  # текст запроса, результаты
+    DEBOUNCE_MS = 150
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.timeout.connect(self._start)
+        self._session = None
+        self._pending = ("", None)
+        self._request_id = 0
+        self._texts = {}
+
+    def set_session(self, session):
+        """Задает сессию поиска (при смене пользователя или разблокировке)"""
+        if session is not self._session:
+            self.cancel()
+            self._session = session
+
+    def search(self, text: str, limit: Optional[int] = None):
+        """Запускает поиск после паузы во вводе"""
+        self._pending = (text, limit)
+        self._debounce_timer.start(self.DEBOUNCE_MS)
+
+    def search_now(self, text: str, limit: Optional[int] = None):
+        """Запускает поиск без задержки (например, после сохранения записи)"""
+        self._debounce_timer.stop()
+        self._pending = (text, limit)
+        self._start()
+
+    def cancel(self):
+        """Отменяет отложенный и выполняющийся поиск"""
+        self._debounce_timer.stop()
+        self._request_id += 1
+        self._texts.clear()
+        self._pool.clear()
+
+    def is_stale(self, request_id: int) -> bool:
+        """Проверяет, что запрос уже вытеснен более новым"""
+        return request_id != self._request_id
+
+    def _start(self):
+        if self._session is None:
+            return
+        self.cancel()
+        text, limit = self._pending
+        self._texts[self._request_id] = text
+
+        task = _SearchTask(self, self._request_id, self._session, text, limit)
+        task.signals.finished.connect(self._on_finished)
+        self._pool.start(task)
+
+    def _on_finished(self, request_id: int, results: list):
+        """Принимает результаты в потоке интерфейса"""
+        if self.is_stale(request_id):
+            return
+        self.results_ready.emit(self._texts.pop(request_id, ""), results)
+
+    def shutdown(self):
+        """Отменяет поиск и дожидается завершения потока"""
+        self.cancel()
+        self._session = None
+        self._pool.waitForDone()
@@ -22,13 +22,19 @@ class SettingsManager:
                 "autolock_minutes": 15,
                 "min_password_length": 8,
                 "require_special_chars": True,
-                "backup_count": 5
+                "backup_count": 5,
+                "storage_backend": "vault",
+                "hibp_range_endpoint": "https://api.pwnedpasswords.com/range/{prefix}",
+                "breach_db_path": ""
             },
             "interface": {
                 "language": "ru",
                 "show_password_strength": True,
                 "show_favicons": True,
-                "compact_mode": False
+                "compact_mode": False,
+                "virtual_list": True,
+                "favicon_atlas": True,
+                "favicon_endpoint": "https://www.google.com/s2/favicons?domain={domain}&sz={size}"
             },
             "version": {
                 "current": self.CURRENT_VERSION,
@@ -93,12 +99,23 @@ class SettingsManager:
                     return isinstance(value, int) and 1 <= value <= 100
                 elif key == "require_special_chars":
                     return isinstance(value, bool)
+                elif key == "storage_backend":
+                    return value in ["vault", "sqlite"]
+                elif key == "hibp_range_endpoint":
+                    return (isinstance(value, str) and value.startswith(("https://", "http://"))
+                            and "{prefix}" in value)
+                elif key == "breach_db_path":
+                    return isinstance(value, str)
                     
             elif category == "interface":
-                if key in ["show_password_strength", "show_favicons", "compact_mode"]:
+                if key in ["show_password_strength", "show_favicons", "compact_mode", "virtual_list",
+                           "favicon_atlas"]:
                     return isinstance(value, bool)
                 elif key == "language":
                     return value in ["ru", "en"]
+                elif key == "favicon_endpoint":
+                    return (isinstance(value, str) and value.startswith(("https://", "http://"))
+                            and "{domain}" in value)
                     
             elif category == "appearance":
                 if key == "theme":
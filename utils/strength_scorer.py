@@ -0,0 +1,70 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _ScorerSignals(QObject):
+    """Сигналы фоновой задачи оценки (QRunnable сам не может их иметь)"""
+    scored = pyqtSignal(int, object)  # номер запуска, {id: оценка}
+
+
+class _ScoreTask(QRunnable):
+    """Оценивает надежность паролей всех записей хранилища"""
+
+    def __init__(self, scorer: "StrengthScorer", run_id: int, password_manager):
+        super().__init__()
+        self.scorer = scorer
+        self.run_id = run_id
+        self.password_manager = password_manager
+
+    def run(self):
+        if self.scorer.is_stale(self.run_id):
+            return
+        try:
+            changed = self.password_manager.score_strengths()
+        except Exception as e:
+            print(f"Ошибка оценки надежности паролей: {str(e)}")
+            changed = {}
+        self.scorer._signals.scored.emit(self.run_id, changed)
+
+
+class StrengthScorer(QObject):
+    """Оценка надежности паролей всего хранилища в фоне
+
+    Запускается один раз после открытия хранилища: PasswordManager
+    расшифровывает и оценивает пароли в пуле потоков и сохраняет оценки в
+    своей таблице, а в поток интерфейса приходят только записи, чья
+    оценка изменилась. Перестроение списка и смена темы берут готовые
+    оценки из записей и пароли не оценивают.
+    """
+    finished = pyqtSignal(dict)  # id записи -> новая оценка
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _ScorerSignals(self)
+        self._signals.scored.connect(self._on_scored)
+        self._run_id = 0
+
+    def is_stale(self, run_id: int) -> bool:
+        """Проверяет, что оценка отменена или заменена новой"""
+        return run_id != self._run_id
+
+    def start(self, password_manager):
+        """Запускает оценку хранилища (предыдущая отменяется)"""
+        self.cancel()
+        self._pool.start(_ScoreTask(self, self._run_id, password_manager))
+
+    def cancel(self):
+        """Отменяет оценку: ее результат не будет отправлен"""
+        self._run_id += 1
+        self._pool.clear()
+
+    def _on_scored(self, run_id: int, changed: dict):
+        if self.is_stale(run_id):
+            return
+        self.finished.emit(changed)
+
+    def shutdown(self):
+        """Отменяет оценку и дожидается завершения потока"""
+        self.cancel()
+        self._pool.waitForDone()
@@ -0,0 +1,194 @@
+from threading import Lock
+from concurrent.futures import CancelledError
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _AuditSignals(QObject):
+    """Сигналы фоновых задач аудита (QRunnable сам не может их иметь)"""
+    hashed = pyqtSignal(int, object)  # номер аудита, [(id, сервис, SHA-1)]
+    prefix_checked = pyqtSignal(int, str, object)  # номер аудита, префикс, {хвост: число} или None
+
+
+class _HashTask(QRunnable):
+    """Хэширует пароли всех записей хранилища"""
+
+    def __init__(self, audit: "VaultAudit", audit_id: int, password_manager):
+        super().__init__()
+        self.audit = audit
+        self.audit_id = audit_id
+        self.password_manager = password_manager
+
+    def run(self):
+        if self.audit.is_stale(self.audit_id):
+            return
+        try:
+            rows = self.password_manager.password_hashes()
+        except Exception as e:
+            print(f"Ошибка подготовки аудита: {str(e)}")
+            rows = []
+        self.audit._signals.hashed.emit(self.audit_id, rows)
+
+
+class _PrefixTask(QRunnable):
+    """Проверяет все хэши одного префикса одним диапазоном HIBP"""
+
+    def __init__(self, audit: "VaultAudit", audit_id: int, prefix: str, suffixes: List[str]):
+        super().__init__()
+        self.audit = audit
+        self.audit_id = audit_id
+        self.prefix = prefix
+        self.suffixes = suffixes
+
+    def run(self):
+        if self.audit.is_stale(self.audit_id):
+            return
+        future = self.audit.checker.submit_breach_counts(self.prefix, self.suffixes)
+        if not self.audit._track(self.audit_id, future):
+            return
+        try:
+            counts = future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            print(f"Ошибка проверки диапазона {self.prefix}: {str(e)}")
+            counts = None
+        finally:
+            self.audit._untrack(future)
+        self.audit._signals.prefix_checked.emit(self.audit_id, self.prefix, counts)
+
+
+class VaultAudit(QObject):
+    """Проверка всего хранилища на утечки паролей
+
+    Пароли хэшируются один раз в фоне и группируются по префиксу SHA-1 из
+    5 символов, поэтому каждый диапазон HIBP запрашивается не больше
+    одного раза, сколько бы записей его ни разделяли. Диапазоны
+    проверяются не более чем MAX_CONCURRENCY потоками; ограничение
+    частоты запросов остается за HIBPChecker. Результаты по записям и
+    прогресс приходят в поток интерфейса сигналами.
+    """
+    progress = pyqtSignal(int, int)  # проверено записей, всего
+    entry_checked = pyqtSignal(str, dict)  # id записи, статус
+    finished = pyqtSignal(dict)  # сводка
+
+    MAX_CONCURRENCY = 3
+
+    def __init__(self, checker, parent=None):
+        super().__init__(parent)
+        self.checker = checker
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.MAX_CONCURRENCY)
+        self._signals = _AuditSignals(self)
+        self._signals.hashed.connect(self._on_hashed)
+        self._signals.prefix_checked.connect(self._on_prefix_checked)
+        self._audit_id = 0
+        # Запросы диапазонов, которые выполняются сейчас (отменяются вместе с аудитом)
+        self._futures = set()
+        self._futures_lock = Lock()
+        self._groups: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        self._total = 0
+        self._done = 0
+        self._summary = {}
+
+    def is_stale(self, audit_id: int) -> bool:
+        """Проверяет, что аудит отменен или заменен новым"""
+        return audit_id != self._audit_id
+
+    def start(self, password_manager):
+        """Запускает аудит хранилища (предыдущий отменяется)"""
+        self.cancel()
+        self._pool.start(_HashTask(self, self._audit_id, password_manager))
+
+    def cancel(self):
+        """Отменяет аудит: еще не начатые проверки убираются из очереди,
+        а уже отправленные запросы диапазонов прерываются"""
+        with self._futures_lock:
+            self._audit_id += 1
+            futures, self._futures = self._futures, set()
+        self._pool.clear()
+        for future in futures:
+            future.cancel()
+        self._groups = {}
+
+    def _track(self, audit_id: int, future) -> bool:
+        """Запоминает запрос аудита; запрос отмененного аудита сразу отменяется"""
+        with self._futures_lock:
+            if not self.is_stale(audit_id):
+                self._futures.add(future)
+                return True
+        future.cancel()
+        return False
+
+    def _untrack(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def _on_hashed(self, audit_id: int, rows: list):
+        if self.is_stale(audit_id):
+            return
+
+        # Группы: префикс -> хвост хэша -> записи с этим паролем
+        groups: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for entry_id, service, digest in rows:
+            groups.setdefault(digest[:5], {}).setdefault(digest[5:], []).append((entry_id, service))
+        self._groups = groups
+        self._total = len(rows)
+        self._done = 0
+        self._summary = {
+            "total": self._total, "compromised": 0, "warning": 0, "reused": 0,
+            "failed": 0, "ranges": len(groups)
+        }
+        self.progress.emit(0, self._total)
+        if not groups:
+            self._finish()
+            return
+
+        for prefix, suffixes in groups.items():
+            self._pool.start(_PrefixTask(self, audit_id, prefix, list(suffixes)))
+
+    def _on_prefix_checked(self, audit_id: int, prefix: str, counts: Optional[dict]):
+        if self.is_stale(audit_id):
+            return
+
+        for suffix, entries in self._groups.pop(prefix, {}).items():
+            if counts is None:
+                status = {
+                    'status': 'Unknown',
+                    'message': 'Breach check failed',
+                    'severity': 'unknown'
+                }
+                self._summary["failed"] += len(entries)
+            else:
+                status = dict(self.checker.status_for_count(counts.get(suffix, 0)))
+                status['count'] = counts.get(suffix, 0)
+                if status['severity'] == 'danger':
+                    self._summary["compromised"] += len(entries)
+                elif status['severity'] == 'warning':
+                    self._summary["warning"] += len(entries)
+
+            if len(entries) > 1:
+                # Один пароль у нескольких записей - тоже повод его сменить
+                status['reused'] = len(entries)
+                self._summary["reused"] += len(entries)
+                if status['severity'] == 'safe':
+                    status.update({
+                        'status': 'Reused',
+                        'message': f'Password is used in {len(entries)} entries',
+                        'severity': 'warning'
+                    })
+            for entry_id, service in entries:
+                self.entry_checked.emit(entry_id, dict(status, service=service))
+            self._done += len(entries)
+
+        self.progress.emit(self._done, self._total)
+        if not self._groups:
+            self._finish()
+
+    def _finish(self):
+        self.finished.emit(dict(self._summary))
+
+    def shutdown(self):
+        """Отменяет аудит и дожидается завершения потоков"""
+        self.cancel()
+        self._pool.waitForDone()
@@ -1,56 +1,18 @@
 from PyQt6.QtWidgets import QLabel
-from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-import requests
-import os
+from PyQt6.QtCore import Qt
 from utils.url_utils import extract_domain
-from utils.hash_utils import md5_hash
+from utils.favicon_service import FaviconService
 from styles.themes import THEMES
 
-class IconLoader(QThread):
-    icon_loaded = pyqtSignal(str, str)  # url, path
-
-    def __init__(self, url, cache_dir):
-        super().__init__()
-        self.url = url
-        self.cache_dir = cache_dir
-
-    def run(self):
-        try:
-            domain = extract_domain(self.url)
-            if not domain:
-                self.icon_loaded.emit(self.url, "")
-                return
-
-            hash_name = md5_hash(domain)
-            cache_path = os.path.join(self.cache_dir, f"{hash_name}.png")
-
-            # Если иконка уже в кэше, просто возвращаем путь
-            if os.path.exists(cache_path):
-                self.icon_loaded.emit(self.url, cache_path)
-                return
-
-            # Загружаем иконку
-            response = requests.get(
-                f"https://www.google.com/s2/favicons?domain={domain}&sz=40",
-                timeout=3
-            )
-            if response.status_code == 200:
-                with open(cache_path, 'wb') as f:
-                    f.write(response.content)
-                self.icon_loaded.emit(self.url, cache_path)
-            else:
-                self.icon_loaded.emit(self.url, "")
-        except Exception as e:
-            print(f"Error loading favicon: {str(e)}")
-            self.icon_loaded.emit(self.url, "")
-
 class LazyIconLabel(QLabel):
+    ICON_SIZE = 40
+
     def __init__(self, cache_dir, theme="default", parent=None):
         super().__init__(parent)
         self.cache_dir = cache_dir
         self.url = None
-        self.loader = None
+        self._waiting = False  # иконка ждет загрузки в FaviconService
+        self._retried = False  # битый файл иконки уже запрошен заново
         self.default_text = "?"
         self.theme = theme
         self.setFixedSize(70, 50)
@@ -70,6 +32,9 @@ class LazyIconLabel(QLabel):
 
     def set_url(self, url, service_name=""):
         if not url:
+            # Метка могла показывать иконку предыдущей записи
+            self.url = None
+            self.clear()
             self._set_no_url_icon()
             return
 
@@ -77,38 +42,58 @@ class LazyIconLabel(QLabel):
             return
 
         self.url = url
+        self._waiting = False
+        self._retried = False
         self.setText(service_name[0].upper() if service_name else "?")
 
-        # Проверяем кэш
+        # Проверяем кэш: индекс FaviconService, без обращения к диску
         domain = extract_domain(url)
-        if domain:
-            hash_name = md5_hash(domain)
-            cache_path = os.path.join(self.cache_dir, f"{hash_name}.png")
+        cache_path = FaviconService.instance().cached_path(url, self._on_icon_loaded) if domain else None
+        if cache_path:
+            self._set_icon(domain, cache_path)
+            return
 
-            if os.path.exists(cache_path):
-                self._set_icon(cache_path)
-                return
+        self._request(url)
 
-        # Запускаем загрузку в фоне
-        if self.loader:
-            self.loader.quit()
+    def _request(self, url):
+        # Загрузка в общем пуле; видимые метки поднимаются в paintEvent
+        path = FaviconService.instance().request(url, self._on_icon_loaded)
+        if path is None:
+            self._waiting = True
+        elif path:
+            self._set_icon(extract_domain(url), path)
+        else:
+            self._set_no_url_icon()
 
-        self.loader = IconLoader(url, self.cache_dir)
-        self.loader.icon_loaded.connect(self._on_icon_loaded)
-        self.loader.start()
+    def paintEvent(self, event):
+        # paintEvent приходит только меткам в видимой части списка
+        if self._waiting:
+            self._waiting = False
+            FaviconService.instance().prioritize(self.url)
+        super().paintEvent(event)
 
-    def _on_icon_loaded(self, url, path):
-        if url != self.url:  # Проверяем, что URL не изменился
+    def _on_icon_loaded(self, domain, path):
+        if not self.url or extract_domain(self.url) != domain:  # URL успел смениться
             return
 
+        self._waiting = False
         if path:
-            self._set_icon(path)
+            self._set_icon(domain, path)
         else:
             self._set_no_url_icon()
 
-    def _set_icon(self, path):
-        icon = QIcon(path)
-        self.setPixmap(icon.pixmap(40, 40))
+    def _set_icon(self, domain, path):
+        # Иконка декодируется один раз на домен и размер, дальше берется из кэша
+        pixmap = FaviconService.instance().pixmap(domain, path, self.ICON_SIZE, self.devicePixelRatioF())
+        if pixmap is not None:
+            self.setPixmap(pixmap)
+        else:
+            # Файла уже нет или он поврежден: забываем его и загружаем заново,
+            # но только один раз, чтобы битый ответ сервера не зациклил загрузку
+            FaviconService.instance().forget(domain)
+            if not self._retried and self.url:
+                self._retried = True
+                self._request(self.url)
 
     def _set_no_url_icon(self):
         theme_styles = THEMES[self.theme]["LAZY_ICON_STYLES"]
@@ -0,0 +1,316 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QListView, QStyledItemDelegate, QStyle,
+    QAbstractItemView, QFrame, QSizePolicy
+)
+from PyQt6.QtGui import QColor, QPainter, QPen, QPixmap, QFont
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QSize, QRect, QAbstractListModel, QModelIndex
+)
+from utils.favicon_service import FaviconService
+from utils.url_utils import extract_domain
+from styles.themes import THEMES
+from datetime import datetime
+import re
+
+
+_RGBA = re.compile(r"rgba\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*([\d.]+)\s*\)")
+
+
+def _color(value):
+    """QColor из строки темы, включая CSS-запись rgba(r, g, b, a)"""
+    match = _RGBA.fullmatch(value.strip())
+    if match:
+        r, g, b, a = match.groups()
+        return QColor(int(r), int(g), int(b), round(float(a) * 255))
+    return QColor(value)
+
+
+class PasswordListModel(QAbstractListModel):
+    """Модель списка записей для виртуального списка"""
+    EntryRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.get('service', '')
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    def entry(self, row):
+        """Запись в строке row"""
+        return self._entries[row] if 0 <= row < len(self._entries) else None
+
+    def set_entries(self, entries):
+        """Заменяет все записи модели"""
+        self.beginResetModel()
+        self._entries = list(entries)
+        self.endResetModel()
+
+    def append(self, entry):
+        """Добавляет запись в конец списка"""
+        row = len(self._entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.append(entry)
+        self.endInsertRows()
+
+
+class ChipDelegate(QStyledItemDelegate):
+    """Рисует чип записи вместо отдельного ChipWidget
+
+    Геометрия повторяет ChipWidget: полоса надежности, иконка 70x50,
+    название сервиса с доменом, логин и время изменения справа.
+    Иконки загружаются только для строк, которые реально отрисовываются.
+    """
+    ROW_HEIGHT = 66
+    STRENGTH_WIDTH = 4
+    ICON_SIZE = QSize(70, 50)
+    FAVICON_SIZE = 40
+    MARGIN_V = 8
+    MARGIN_RIGHT = 12
+    SPACING = 12
+
+    def __init__(self, theme="default", parent=None):
+        super().__init__(parent)
+        self._icons = {}  # домен -> путь к иконке ("" - иконки нет, None - идет загрузка)
+        self._images = {}
+        self.set_theme(theme)
+
+    def set_theme(self, theme):
+        """Применяет цвета темы"""
+        self.theme = theme if theme in THEMES else "default"
+        self.colors = THEMES[self.theme]["CHIP_DELEGATE_STYLES"]
+        self.strength_colors = THEMES[self.theme]["PASSWORD_STRENGTH_COLORS"]
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def _image(self, path):
+        """Фоновое изображение чипа (загружается один раз)"""
+        if not path:
+            return None
+        if path not in self._images:
+            pixmap = QPixmap(path)
+            self._images[path] = pixmap if not pixmap.isNull() else None
+        return self._images[path]
+
+    def _font(self, base, size, bold=False):
+        font = QFont(base)
+        if self.colors.get("font_family"):
+            font.setFamily(self.colors["font_family"])
+        font.setPixelSize(size)
+        font.setBold(bold)
+        return font
+
+    def _favicon(self, url, dpr=1.0):
+        """Иконка домена из кэша; при отсутствии запускает фоновую загрузку"""
+        domain = extract_domain(url) if url else ""
+        if not domain:
+            return None
+        if domain not in self._icons:
+            cache_path = FaviconService.instance().cached_path(url, self._on_icon_loaded)
+            if cache_path:
+                self._icons[domain] = cache_path
+            else:
+                # Отрисовываемая строка видима, поэтому идет в начало очереди
+                # None - загрузка уже запущена: следующие перерисовки ее не
+                # запрашивают, пока _on_icon_loaded не запишет путь
+                self._icons[domain] = FaviconService.instance().request(
+                    url, self._on_icon_loaded, visible=True)
+
+        path = self._icons[domain]
+        if not path:
+            return None
+        pixmap = FaviconService.instance().pixmap(domain, path, self.FAVICON_SIZE, dpr)
+        if pixmap is None:
+            # Файла уже нет или он поврежден: загрузим заново
+            del self._icons[domain]
+            FaviconService.instance().forget(domain)
+        return pixmap
+
+    def _on_icon_loaded(self, domain, path):
+        self._icons[domain] = path
+        view = self.parent()
+        if view is not None:
+            view.viewport().update()
+
+    def paint(self, painter, option, index):
+        entry = index.data(PasswordListModel.EntryRole)
+        if not entry:
+            return
+
+        rect = option.rect
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Фон чипа
+        image = self._image(
+            self.colors["selected_image"] if selected else
+            self.colors["hover_image"] if hovered else
+            self.colors["background_image"]
+        )
+        if image is not None:
+            painter.drawPixmap(rect.right() - image.width() + 1,
+                               rect.top() + (rect.height() - image.height()) // 2, image)
+        else:
+            background = (self.colors["selected_background"] if selected else
+                          self.colors["hover_background"] if hovered else None)
+            if background:
+                painter.setPen(QPen(QColor(self.colors["selected_border"])) if selected else Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(background))
+                radius = self.colors["radius"]
+                painter.drawRoundedRect(rect.adjusted(0, 0, -1, -1), radius, radius)
+
+        # Полоса надежности
+        strength = min(max(entry.get('strength') or 0, 0), 4)
+        painter.fillRect(QRect(rect.left(), rect.top(), self.STRENGTH_WIDTH, rect.height()),
+                         _color(self.strength_colors[strength]))
+
+        # Иконка или первая буква сервиса
+        service = entry.get('service', '')
+        url = entry.get('url', '')
+        icon_rect = QRect(rect.left() + self.STRENGTH_WIDTH,
+                          rect.top() + (rect.height() - self.ICON_SIZE.height()) // 2,
+                          self.ICON_SIZE.width(), self.ICON_SIZE.height())
+        favicon = self._favicon(url, painter.device().devicePixelRatioF())
+        if favicon is not None and not favicon.isNull():
+            # Размер иконки в логических пикселях: на HiDPI у pixmap их больше
+            size = favicon.deviceIndependentSize()
+            painter.drawPixmap(round(icon_rect.center().x() - size.width() / 2) + 1,
+                               round(icon_rect.center().y() - size.height() / 2) + 1, favicon)
+        elif url:
+            painter.setFont(self._font(option.font, 14))
+            painter.setPen(QColor(self.colors["letter"]))
+            painter.drawText(icon_rect, Qt.AlignmentFlag.AlignCenter, service[:1].upper() or "?")
+
+        # Дата и время изменения справа
+        right = rect.right() - self.MARGIN_RIGHT
+        small_font = self._font(option.font, 14)
+        painter.setFont(small_font)
+        date_width = 0
+        timestamp = entry.get('modified_at', entry.get('created_at'))
+        if timestamp:
+            dt = datetime.fromtimestamp(timestamp)
+            date_str = dt.strftime("%d/%m/%Y")
+            time_str = dt.strftime("%H:%M")
+            metrics = painter.fontMetrics()
+            date_width = metrics.horizontalAdvance(date_str)
+            line = metrics.height()
+            bottom = rect.bottom() - self.MARGIN_V
+            painter.setPen(QColor(self.colors["url"]))
+            painter.drawText(QRect(right - date_width, bottom - line + 1, date_width, line),
+                             Qt.AlignmentFlag.AlignRight, date_str)
+            painter.drawText(QRect(right - date_width, bottom - 2 * line + 1, date_width, line),
+                             Qt.AlignmentFlag.AlignRight, time_str)
+
+        # Сервис, домен и логин
+        text_left = icon_rect.right() + 1 + self.SPACING
+        text_width = max(0, right - date_width - self.SPACING - text_left)
+        metrics = painter.fontMetrics()
+        line = metrics.height()
+        top = rect.top() + (rect.height() - 2 * line - 2) // 2
+
+        service_text = metrics.elidedText(service, Qt.TextElideMode.ElideRight, text_width)
+        painter.setPen(QColor(self.colors["service"]))
+        painter.drawText(QRect(text_left, top, text_width, line), Qt.AlignmentFlag.AlignLeft, service_text)
+        if url:
+            offset = metrics.horizontalAdvance(service_text)
+            url_text = extract_domain(url)
+            if service:
+                url_text = f" • {url_text}"
+            url_text = metrics.elidedText(url_text, Qt.TextElideMode.ElideRight, max(0, text_width - offset))
+            painter.setPen(QColor(self.colors["url"]))
+            painter.drawText(QRect(text_left + offset, top, text_width - offset, line),
+                             Qt.AlignmentFlag.AlignLeft, url_text)
+
+        painter.setFont(self._font(option.font, 14, bold=True))
+        metrics = painter.fontMetrics()
+        login = metrics.elidedText(entry.get('login', ''), Qt.TextElideMode.ElideRight, text_width)
+        painter.setPen(QColor(self.colors["login"]))
+        painter.drawText(QRect(text_left, top + line + 2, text_width, metrics.height()),
+                         Qt.AlignmentFlag.AlignLeft, login)
+
+        painter.restore()
+
+    def cleanup(self):
+        """Забывает пути иконок (загрузками владеет FaviconService, а
+        готовыми QPixmap - общий PixmapCache)"""
+        self._icons.clear()
+
+
+class PasswordListView(QWidget):
+    """Виртуальный список записей с тем же интерфейсом, что и TagsContainer
+
+    Вместо виджета на каждую запись используется модель и делегат, поэтому
+    стоимость отрисовки и памяти зависит только от числа видимых строк.
+    """
+    tag_clicked = pyqtSignal(dict)
+
+    def __init__(self, parent=None, theme="default"):
+        super().__init__(parent)
+        self.setObjectName("TagsContainer")
+        self.theme = theme
+
+        self.model = PasswordListModel(self)
+        self.view = QListView()
+        self.view.setObjectName("TagsInnerContainer")
+        self.delegate = ChipDelegate(theme, self.view)
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(self.delegate)
+        self.view.setUniformItemSizes(True)
+        self.view.setMouseTracking(True)
+        self.view.setSpacing(0)
+        self.view.setFrameShape(QFrame.Shape.NoFrame)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.view.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        self.view.clicked.connect(self._on_index_clicked)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(5, 0, 5, 0)
+        main_layout.addWidget(self.view)
+
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.update_theme(theme)
+
+    def update_theme(self, theme):
+        """Обновляет тему списка"""
+        self.theme = theme
+        self.setStyleSheet(THEMES[theme]["TAGS_CONTAINER_STYLES"])
+        self.delegate.set_theme(theme)
+        self.view.viewport().update()
+
+    def set_entries(self, entries):
+        """Показывает новый список записей"""
+        self.model.set_entries(entries)
+
+    def add_tag(self, entry_data):
+        """Добавляет запись в конец списка"""
+        self.model.append(entry_data)
+
+    def clear(self):
+        """Очищает список"""
+        self.model.set_entries([])
+
+    def _on_index_clicked(self, index):
+        entry = index.data(PasswordListModel.EntryRole)
+        if entry:
+            self.tag_clicked.emit(entry)
+
+    def cleanup(self):
+        """Освобождает фоновые ресурсы"""
+        self.delegate.cleanup()
@@ -4,10 +4,9 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QColor, QPainter, QPen, QBrush, QIcon
 from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from .base_widgets import VerticalFlowLayout
+from .vertical_flow_layout import VerticalFlowLayout
 from .lazy_icon import LazyIconLabel
 from utils.url_utils import extract_domain
-from utils.password_utils import password_strength
 import os
 from styles.themes import THEMES
 from styles.widgets import CHIP_LABEL_STYLES
@@ -16,7 +15,15 @@ from datetime import datetime
 
 
 class TagsContainer(QWidget):
+    """Список чипов записей
+
+    Чипы привязаны к id записей: при обновлении списка существующие чипы
+    переиспользуются и обновляются на месте, а лишние уходят в пул и
+    достаются оттуда при следующем добавлении.
+    """
     tag_clicked = pyqtSignal(dict)
+    # Сколько скрытых чипов держать для повторного использования
+    POOL_SIZE = 50
 
     def __init__(self, parent=None, theme="default"):
         super().__init__(parent)
@@ -24,6 +31,8 @@ class TagsContainer(QWidget):
         self.setObjectName("TagsContainer")
         self.theme = theme
         self.selected_chip = None
+        self._chips = {}  # ключ записи -> чип в порядке отображения
+        self._pool = []
         
         # Создаем QScrollArea
         self.scroll = QScrollArea()
@@ -61,32 +70,84 @@ class TagsContainer(QWidget):
         # Применяем стили к основному контейнеру
         self.setStyleSheet(theme_styles)
         
-        # Обновляем стили всех чипов
-        for i in range(self.flow_layout.count()):
-            item = self.flow_layout.itemAt(i)
-            if item and item.widget():
-                chip = item.widget()
-                if hasattr(chip, 'update_theme'):
-                    chip.update_theme(theme)
+        # Обновляем стили всех чипов, включая ожидающие в пуле
+        for chip in list(self._chips.values()) + self._pool:
+            chip.update_theme(theme)
 
-    def add_tag(self, entry_data):
-        """Добавляет тег в контейнер"""
-        print(f"Adding tag for {entry_data.get('service', 'unknown')}")
+    @staticmethod
+    def _entry_key(entry_data):
+        """Ключ чипа: id записи (для старых записей без id - сервис)"""
+        return entry_data.get('id') or entry_data.get('service', '')
+
+    def _take_chip(self, entry_data):
+        """Чип из пула с новыми данными или новый чип"""
+        if self._pool:
+            chip = self._pool.pop()
+            chip.set_entry(entry_data)
+            if chip.theme != self.theme:
+                chip.update_theme(self.theme)
+            return chip
         chip = ChipWidget(entry_data, theme=self.theme)
-        chip.clicked.connect(lambda data=entry_data: self._on_chip_clicked(data))
+        chip.clicked.connect(self._on_chip_clicked)
+        return chip
+
+    def _release_chip(self, chip):
+        """Убирает чип из списка в пул (или удаляет, если пул полон)"""
+        if chip is self.selected_chip:
+            self.selected_chip = None
+        chip.set_selected(False)
+        chip.hide()
+        if len(self._pool) < self.POOL_SIZE:
+            self._pool.append(chip)
+        else:
+            chip.deleteLater()
+
+    def set_entries(self, entries):
+        """Показывает новый список записей, меняя только отличающиеся чипы"""
+        old_chips = self._chips
+        old_order = list(old_chips)
+        self._chips = {}
+
+        for entry in entries:
+            key = self._entry_key(entry)
+            if key in self._chips:
+                continue
+            chip = old_chips.pop(key, None)
+            if chip is None:
+                chip = self._take_chip(entry)
+            elif chip.entry_data != entry:
+                chip.set_entry(entry)
+            self._chips[key] = chip
+
+        # Чипы записей, которых больше нет в списке
+        for chip in old_chips.values():
+            self._release_chip(chip)
+
+        # Layout перестраивается, только если изменился состав или порядок
+        if list(self._chips) != old_order:
+            self.flow_layout.set_widgets(list(self._chips.values()))
+            for chip in self._chips.values():
+                chip.show()
+
+    def add_tag(self, entry_data):
+        """Добавляет тег в конец контейнера"""
+        key = self._entry_key(entry_data)
+        chip = self._chips.pop(key, None)
+        if chip is not None:
+            self.flow_layout.removeWidget(chip)
+            chip.set_entry(entry_data)
+        else:
+            chip = self._take_chip(entry_data)
+        self._chips[key] = chip
         self.flow_layout.addWidget(chip)
+        chip.show()
         
     def _on_chip_clicked(self, data):
         """Обработчик клика по чипу"""
         print(f"Chip clicked: {data.get('service', 'unknown')}")
         
         # Находим чип, по которому кликнули
-        clicked_chip = None
-        for i in range(self.flow_layout.count()):
-            chip = self.flow_layout.itemAt(i).widget()
-            if chip.entry_data == data:
-                clicked_chip = chip
-                break
+        clicked_chip = self._chips.get(self._entry_key(data))
         
         # Если нашли чип
         if clicked_chip:
@@ -100,13 +161,13 @@ class TagsContainer(QWidget):
         self.tag_clicked.emit(data)
 
     def clear(self):
-        """Очищает все теги из контейнера"""
+        """Очищает все теги из контейнера (чипы уходят в пул)"""
         self.selected_chip = None
-        while self.flow_layout.count():
-            item = self.flow_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        self.flow_layout.update()
+        chips = list(self._chips.values())
+        self._chips = {}
+        self.flow_layout.set_widgets([])
+        for chip in chips:
+            self._release_chip(chip)
 
 
 class ChipWidget(QWidget):
@@ -162,96 +223,71 @@ class ChipWidget(QWidget):
             raise
             
     def _create_widgets(self):
-        """Создает все виджеты"""
+        """Создает все виджеты (тексты заполняет _apply_entry)"""
         try:
             # Индикатор надежности
-            self.strength_indicator = self._create_strength_indicator(self.entry_data.get('password', ''))
+            self.strength_indicator = self._create_strength_indicator(self._entry_strength())
             self.main_layout.addWidget(self.strength_indicator)
             
             # Иконка
             cache_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app_cache", "favicons")
             self.icon_label = LazyIconLabel(cache_dir, theme=self.theme)
-            self.icon_label.set_url(self.entry_data.get('url', ''), self.entry_data.get('service', ''))
             
             # Логин
-            login = self.entry_data.get('login', '')
-            self.login_label = QLabel(login)
+            self.login_label = QLabel()
             self.login_label.setObjectName("loginLabel")
             
-            # URL или сервис
-            url = self.entry_data.get('url', '')
-            service = self.entry_data.get('service', '')
+            # Сервис и URL в одной строке
+            self.service_label = QLabel()
+            self.service_label.setObjectName("serviceLabel")
+            self.url_label = QLabel()
+            self.url_label.setObjectName("urlLabel")
+
+            url_container = QWidget()
+            url_layout = QHBoxLayout(url_container)
+            url_layout.setContentsMargins(0, 0, 0, 0)
+            url_layout.setSpacing(0)
+            url_layout.addWidget(self.service_label)
+            url_layout.addWidget(self.url_label)
+            url_layout.addStretch()
+            self.info_layout.addWidget(url_container)
             
-            # Создаем отдельные метки для сервиса и URL
-            if service:
-                self.service_label = QLabel(service)
-                self.service_label.setObjectName("serviceLabel")
-                self.info_layout.addWidget(self.service_label)
+            # Метки для даты и времени
+            self.date_label = QLabel()
+            self.time_label = QLabel()
             
-            if url:
-                url_text = extract_domain(url)
-                if service:  # Если есть сервис, добавляем разделитель
-                    url_text = f" • {url_text}"
-                self.url_label = QLabel(url_text)
-                self.url_label.setObjectName("urlLabel")
-                
-                # Если есть сервис, добавляем URL в тот же layout по горизонтали
-                if service:
-                    url_container = QWidget()
-                    url_layout = QHBoxLayout(url_container)
-                    url_layout.setContentsMargins(0, 0, 0, 0)
-                    url_layout.setSpacing(0)
-                    if hasattr(self, 'service_label'):
-                        url_layout.addWidget(self.service_label)
-                    url_layout.addWidget(self.url_label)
-                    url_layout.addStretch()
-                    self.info_layout.addWidget(url_container)
-                else:
-                    self.info_layout.addWidget(self.url_label)
+            self.date_label.setObjectName("urlLabel")  # Используем тот же стиль, что и для URL
+            self.time_label.setObjectName("urlLabel")  # Используем тот же стиль, что и для URL
             
-            # Добавляем дату и время
-            timestamp = self.entry_data.get('modified_at', self.entry_data.get('created_at'))
-            if timestamp:
-                dt = datetime.fromtimestamp(timestamp)
-                date_str = dt.strftime("%d/%m/%Y")
-                time_str = dt.strftime("%H:%M")
-                
-                # Создаем метки для даты и времени
-                self.date_label = QLabel(date_str)
-                self.time_label = QLabel(time_str)
-                
-                self.date_label.setObjectName("urlLabel")  # Используем тот же стиль, что и для URL
-                self.time_label.setObjectName("urlLabel")  # Используем тот же стиль, что и для URL
-                
-                # Устанавливаем выравнивание и размер
-                self.date_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-                self.time_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-                
-                # Создаем контейнер для даты и времени
-                datetime_container = QWidget()
-                datetime_container.setObjectName("datetimeContainer")
-                datetime_layout = QVBoxLayout(datetime_container)
-                datetime_layout.setContentsMargins(0, 0, 0, 0)
-                datetime_layout.setSpacing(0)
-                datetime_layout.addWidget(self.time_label)
-                datetime_layout.addWidget(self.date_label)
-                
-                # Устанавливаем трансформацию для поворота
-                datetime_container.setStyleSheet("""
-                    #datetimeContainer {
-                        background: transparent;
-                    }
-                    #timeLabel {
-                        color: #FF0000;
-                        font-family: 'Rajdhani Medium';
-                        font-size: 14px;
-                    }
-                    #dateLabel {
-                        color: #FF0000;
-                        font-family: 'Rajdhani Medium';
-                        font-size: 14px;
-                    }
-                """)
+            # Устанавливаем выравнивание и размер
+            self.date_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+            self.time_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+            
+            # Создаем контейнер для даты и времени
+            self.datetime_container = QWidget()
+            self.datetime_container.setObjectName("datetimeContainer")
+            datetime_layout = QVBoxLayout(self.datetime_container)
+            datetime_layout.setContentsMargins(0, 0, 0, 0)
+            datetime_layout.setSpacing(0)
+            datetime_layout.addWidget(self.time_label)
+            datetime_layout.addWidget(self.date_label)
+            
+            # Устанавливаем трансформацию для поворота
+            self.datetime_container.setStyleSheet("""
+                #datetimeContainer {
+                    background: transparent;
+                }
+                #timeLabel {
+                    color: #FF0000;
+                    font-family: 'Rajdhani Medium';
+                    font-size: 14px;
+                }
+                #dateLabel {
+                    color: #FF0000;
+                    font-family: 'Rajdhani Medium';
+                    font-size: 14px;
+                }
+            """)
             
             # Собираем все вместе
             self.info_layout.addWidget(self.login_label)
@@ -262,37 +298,77 @@ class ChipWidget(QWidget):
             right_layout.setContentsMargins(0, 0, 0, 0)
             right_layout.setSpacing(0)
             right_layout.addStretch()
-            if hasattr(self, 'date_label'):
-                right_layout.addWidget(datetime_container)
+            right_layout.addWidget(self.datetime_container)
             
             # Добавляем контейнеры в основной layout
             self.content_layout.addWidget(self.icon_label)
             self.content_layout.addWidget(self.info_container)
             self.content_layout.addWidget(right_container)
             self.main_layout.addWidget(self.content_container)
+
+            self._apply_entry()
             
         except Exception as e:
             print(f"Ошибка создания widgets: {str(e)}")
             raise
 
-    def _create_strength_indicator(self, password):
+    def _entry_strength(self):
+        """Оценка приходит готовой в записи (таблица оценок PasswordManager), пароль не оценивается"""
+        return self.entry_data.get('strength') or 0
+
+    def _apply_entry(self):
+        """Заполняет виджеты данными текущей записи"""
+        self._set_strength(self._entry_strength())
+
+        url = self.entry_data.get('url', '')
+        service = self.entry_data.get('service', '')
+        self.icon_label.set_url(url, service)
+
+        self.service_label.setText(service)
+        self.service_label.setVisible(bool(service))
+
+        url_text = extract_domain(url) if url else ""
+        if url_text and service:  # Если есть сервис, добавляем разделитель
+            url_text = f" • {url_text}"
+        self.url_label.setText(url_text)
+        self.url_label.setVisible(bool(url))
+
+        self.login_label.setText(self.entry_data.get('login', ''))
+
+        # Дата и время
+        timestamp = self.entry_data.get('modified_at', self.entry_data.get('created_at'))
+        if timestamp:
+            dt = datetime.fromtimestamp(timestamp)
+            self.date_label.setText(dt.strftime("%d/%m/%Y"))
+            self.time_label.setText(dt.strftime("%H:%M"))
+        self.datetime_container.setVisible(bool(timestamp))
+
+    def set_entry(self, entry_data):
+        """Обновляет чип данными другой (или измененной) записи без пересоздания"""
+        self.entry_data = entry_data
+        self._apply_entry()
+
+    def _create_strength_indicator(self, strength):
         """Создает индикатор надежности пароля"""
         try:
             indicator = QWidget()
             indicator.setFixedWidth(4)
-            strength = min(max(password_strength(password), 0), 4)
-            color = THEMES[self.theme]["PASSWORD_STRENGTH_COLORS"][strength]
+            indicator.color = None
             
             def paintEvent(e):
                 try:
+                    if indicator.color is None:
+                        return
                     painter = QPainter(indicator)
                     painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                    brush = QBrush(QColor(color))
+                    brush = QBrush(QColor(indicator.color))
                     painter.fillRect(indicator.rect(), brush)
                 except Exception as pe:
                     print(f"Ошибка отрисовки индикатора: {str(pe)}")
                 
             indicator.paintEvent = paintEvent
+            self.strength_indicator = indicator
+            self._set_strength(strength)
             return indicator
             
         except Exception as e:
@@ -300,8 +376,17 @@ class ChipWidget(QWidget):
             # Возвращаем пустой виджет в случае ошибки
             fallback = QWidget()
             fallback.setFixedWidth(4)
+            fallback.color = None
             return fallback
 
+    def _set_strength(self, strength):
+        """Меняет цвет индикатора надежности"""
+        strength = min(max(strength, 0), 4)
+        color = THEMES[self.theme]["PASSWORD_STRENGTH_COLORS"][strength]
+        if getattr(self.strength_indicator, 'color', None) != color:
+            self.strength_indicator.color = color
+            self.strength_indicator.update()
+
     def update_theme(self, theme):
         """Обновляет тему чипа"""
         self.theme = theme
@@ -1,17 +1,53 @@
-from PyQt6.QtWidgets import QLayout, QLayoutItem, QSizePolicy
-from PyQt6.QtCore import QSize, QRect
+from PyQt6.QtWidgets import QLayout, QWidgetItem
+from PyQt6.QtCore import QEvent, QSize, QRect, QTimer
 
 
 class VerticalFlowLayout(QLayout):
+    """Раскладка элементов по колонкам: каждый следующий идет в самую короткую
+
+    Размеры элементов и их места (колонка, y) кэшируются. sizeHint()
+    запрашивается только у "грязных" элементов: новых и тех, чей виджет
+    сообщил об изменении (фильтр событий ловит LayoutRequest, смену шрифта
+    или стиля, показ и скрытие). Виджеты без собственного layout'а таких
+    событий не шлют и перемеряются при каждом invalidate(). Если размер
+    изменился, места пересчитываются начиная с этого элемента по
+    кэшированным размерам; добавление в конец размещает только новые
+    элементы. Изменение ширины не требует sizeHint() вовсе, а для длинных
+    списков откладывается до следующего прохода цикла событий, чтобы
+    серия resize при перетаскивании сплиттера давала один проход.
+    """
+    # С какого числа элементов раскладку после смены ширины откладывать
+    DEFER_THRESHOLD = 200
+    # События виджета, после которых его sizeHint() мог измениться
+    SIZE_EVENTS = frozenset((
+        QEvent.Type.LayoutRequest, QEvent.Type.FontChange, QEvent.Type.StyleChange,
+        QEvent.Type.ShowToParent, QEvent.Type.HideToParent
+    ))
+
     def __init__(self, parent=None, margin=0, spacing=0, column_count=1):
         super().__init__(parent)
         self._items = []
         self.column_count = column_count
         self.spacing = spacing
+
+        self._sizes = []  # кэш sizeHint() элементов (None - еще не измерен)
+        self._slots = []  # (колонка, y) элементов
+        self._column_heights = [0] * max(1, column_count)
+        self._max_width = 0
+        self._dirty = set()  # элементы, которые нужно перемерить
+        self._watched = {}  # виджет -> его элемент
+        self._unwatched = set()  # элементы, чьи виджеты не сообщают об изменениях
+        self._rect = QRect()
+        self._apply_from = 0  # с какого элемента заново выставлять геометрию
+        self._arrange_timer = QTimer(self)
+        self._arrange_timer.setSingleShot(True)
+        self._arrange_timer.timeout.connect(self._arrange_pending)
         self.setContentsMargins(margin, margin, margin, margin)
 
     def addItem(self, item):
+        self._watch(item)
         self._items.append(item)
+        self._sizes.append(None)
 
     def count(self):
         return len(self._items)
@@ -20,7 +56,72 @@ class VerticalFlowLayout(QLayout):
         return self._items[index] if 0 <= index < len(self._items) else None
 
     def takeAt(self, index):
-        return self._items.pop(index) if 0 <= index < len(self._items) else None
+        if not 0 <= index < len(self._items):
+            return None
+        self._place_from(index)
+        del self._sizes[index]
+        item = self._items.pop(index)
+        self._unwatch(item)
+        return item
+
+    def set_widgets(self, widgets):
+        """Заменяет элементы layout'а виджетами в заданном порядке
+
+        Элементы уже добавленных виджетов переиспользуются вместе с
+        кэшированными размерами, поэтому смена порядка не пересоздает ни
+        виджеты, ни их QWidgetItem и не запрашивает sizeHint().
+        """
+        items = {item.widget(): item for item in self._items if item.widget() is not None}
+        sizes = dict(zip(self._items, self._sizes))
+        new_items = []
+        for widget in widgets:
+            item = items.pop(widget, None)
+            if item is None:
+                self.addChildWidget(widget)
+                item = QWidgetItem(widget)
+                self._watch(item)
+            new_items.append(item)
+        for item in items.values():
+            self._unwatch(item)
+
+        # Места остаются верными для совпадающего начала списка
+        common = 0
+        for old, new in zip(self._items, new_items):
+            if old is not new:
+                break
+            common += 1
+        self._place_from(common)
+        self._items = new_items
+        self._sizes = [sizes.get(item) for item in new_items]
+        self.invalidate()
+
+    def _watch(self, item):
+        """Новый элемент: помечается для измерения, его виджет - для наблюдения"""
+        self._dirty.add(item)
+        widget = item.widget()
+        if widget is not None and widget.layout() is not None:
+            self._watched[widget] = item
+            widget.installEventFilter(self)
+        else:
+            self._unwatched.add(item)
+
+    def _unwatch(self, item):
+        self._dirty.discard(item)
+        self._unwatched.discard(item)
+        widget = item.widget()
+        if widget is not None and self._watched.pop(widget, None) is not None:
+            widget.removeEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.SIZE_EVENTS:
+            item = self._watched.get(obj)
+            if item is not None:
+                self._dirty.add(item)
+        return False
+
+    def invalidate(self):
+        self._dirty.update(self._unwatched)
+        super().invalidate()
 
     def sizeHint(self):
         return self._calculate_size()
@@ -30,31 +131,70 @@ class VerticalFlowLayout(QLayout):
 
     def setGeometry(self, rect):
         super().setGeometry(rect)
-        self._arrange(rect)
+        width_changed = rect.width() != self._rect.width()
+        if rect != self._rect:
+            self._apply_from = 0
+        deferred = width_changed and self._rect.isValid() and len(self._items) > self.DEFER_THRESHOLD
+        self._rect = QRect(rect)
+        if deferred:
+            self._arrange_timer.start(0)
+        else:
+            self._arrange_timer.stop()
+            self._arrange(rect)
+
+    def _arrange_pending(self):
+        self._arrange(self._rect)
+
+    def _place_from(self, index):
+        """Отбрасывает места элементов начиная с index (размеры остаются)"""
+        if index >= len(self._slots):
+            return
+        del self._slots[index:]
+        self._apply_from = min(self._apply_from, index)
+
+        # Восстанавливаем высоты колонок и ширину по оставшимся элементам
+        self._column_heights = [0] * max(1, self.column_count)
+        self._max_width = 0
+        for size, (column, y) in zip(self._sizes, self._slots):
+            self._column_heights[column] = max(self._column_heights[column], y + size.height() + self.spacing)
+            self._max_width = max(self._max_width, size.width())
+
+    def _update_cache(self):
+        """Перемеряет грязные элементы и досчитывает места тех, что не размещены"""
+        if self._dirty:
+            changed = len(self._slots)
+            for index, item in enumerate(self._items):
+                if item in self._dirty:
+                    size = item.sizeHint()
+                    if size != self._sizes[index]:
+                        self._sizes[index] = size
+                        changed = min(changed, index)
+            self._dirty.clear()
+            self._place_from(changed)
+
+        if len(self._column_heights) != max(1, self.column_count):
+            self._place_from(0)
+
+        for index in range(len(self._slots), len(self._items)):
+            size = self._sizes[index]
+            column = self._column_heights.index(min(self._column_heights))
+            self._slots.append((column, self._column_heights[column]))
+            self._column_heights[column] += size.height() + self.spacing
+            self._max_width = max(self._max_width, size.width())
 
     def _calculate_size(self):
-        total_height = 0
-        max_width = 0
-        for item in self._items:
-            size = item.sizeHint()
-            total_height += size.height() + self.spacing
-            max_width = max(max_width, size.width())
-        return QSize(max_width * self.column_count, total_height)
+        self._update_cache()
+        return QSize(self._max_width * self.column_count, max(self._column_heights))
 
     def _arrange(self, rect):
+        self._update_cache()
         column_width = (rect.width() - (self.column_count - 1) * self.spacing) // max(1, self.column_count)
-        columns = [[] for _ in range(self.column_count)]
-        column_heights = [0] * self.column_count
-
-        for item in self._items:
-            min_col = column_heights.index(min(column_heights))
-            columns[min_col].append(item)
-            column_heights[min_col] += item.sizeHint().height() + self.spacing
-
-        for col_index, col in enumerate(columns):
-            x = rect.x() + col_index * (column_width + self.spacing)
-            y = rect.y()
-            for item in col:
-                item_geom = QRect(x, y, column_width, item.sizeHint().height())
+
+        for index in range(self._apply_from, len(self._items)):
+            column, y = self._slots[index]
+            x = rect.x() + column * (column_width + self.spacing)
+            item_geom = QRect(x, rect.y() + y, column_width, self._sizes[index].height())
+            item = self._items[index]
+            if item.geometry() != item_geom:
                 item.setGeometry(item_geom)
-                y += item.sizeHint().height() + self.spacing 
\ No newline at end of file
+        self._apply_from = len(self._items)